@@ -1,15 +1,31 @@
 from rsa_api_h cimport *
+from libc.string cimport memcpy, memset
 import numpy as np
 cimport numpy as np
 
 class RSAError(Exception):
     pass
 
-def err_check(rs):
-    errMessage = DEVICE_GetErrorString(rs).decode()
-    if errMessage != 'No Error':
-        # print(errMessage)
-        raise RSAError(errMessage)
+# Last settings sent by SPECTRUM_SetSettings_py, None when unknown
+_spectrumSettings = None
+# Sample type set by IQSTREAM_SetOutputConfiguration_py, None when unknown
+_iqStreamDtype = None
+
+
+cdef _clear_cached_settings():
+    # The cached settings describe the connected device only
+    global _spectrumSettings, _iqStreamDtype
+    _spectrumSettings = None
+    _iqStreamDtype = None
+
+
+# cpdef keeps err_check callable from Python, while calls within the module
+# go straight to the inline C function
+cpdef inline int err_check(ReturnStatus rs) except -1:
+    # The error string is only looked up when a call has failed
+    if rs != noError:
+        raise RSAError(DEVICE_GetErrorString(rs).decode())
+    return 0
 
 
 ##########################################################
@@ -69,14 +85,10 @@ cpdef enum VerticalUnitType:
     VerticalUnit_Volt = 2
     VerticalUnit_Amp = 3
 
-# NB: Due to the inability of Cython to convert C pointers to Python objects,
-# it was necessary to preallocate the spectrumBitmap, spectrumTraces, and
-# sogramBitmap struct members. Due also to some inability of Cython to pass
-# a struct containing preallocated multidimensional arrays correctly to
-# external functions, it is necessary to "reformat" certain complex struct
-# members and feed them to a Python class for the DPX_FrameBuffer IN THE
-# FUNCTION THAT CALLS DPX_GetFrameBuffer() ITSELF. Passing the
-# DPX_FrameBuffer object to another function DOES NOT result in correct passing
+# NB: The DPX_FrameBuffer members point into memory owned by the API that is
+# only valid until DPX_FinishFrameBuffer(), so DPX_GetFrameBuffer_py() copies
+# them into NumPy arrays (one memcpy each) and feeds those, along with the
+# scalar members in a dict, to a Python class for the DPX_FrameBuffer.
 
 class DPX_FrameBuffer_py():
     def __init__(self, fb, spectrumBitmap, spectrumTraces, sogramBitmap):
@@ -204,22 +216,33 @@ def DEVICE_Search_py():
     cdef int deviceIDs[20]
     cdef char deviceSerial[20][100]
     cdef char deviceType[20][20]
-    err_check(DEVICE_Search(&numDevicesFound, deviceIDs,
-              deviceSerial, deviceType))
+    cdef ReturnStatus rs
+    with nogil:
+        rs = DEVICE_Search(&numDevicesFound, deviceIDs, deviceSerial, deviceType)
+    err_check(rs)
     devs = np.asarray(deviceIDs)
     return numDevicesFound, devs, deviceSerial, deviceType
 
 
 def DEVICE_Connect_py(deviceID=0):
+    _clear_cached_settings()
     cdef int _deviceID = deviceID
-    err_check(DEVICE_Connect(_deviceID))
+    cdef ReturnStatus rs
+    with nogil:
+        rs = DEVICE_Connect(_deviceID)
+    err_check(rs)
 
 
 def DEVICE_Disconnect_py():
-    err_check(DEVICE_Disconnect())
+    _clear_cached_settings()
+    cdef ReturnStatus rs
+    with nogil:
+        rs = DEVICE_Disconnect()
+    err_check(rs)
     
     
 def DEVICE_Reset_py(deviceID):
+    _clear_cached_settings()
     cdef int _deviceID = deviceID
     err_check(DEVICE_Reset(_deviceID))
     
@@ -278,7 +301,12 @@ def DEVICE_GetInfo_py():
 
 
 def CONFIG_Preset_py():
-    err_check(CONFIG_Preset())
+    global _spectrumSettings
+    _spectrumSettings = None
+    cdef ReturnStatus rs
+    with nogil:
+        rs = CONFIG_Preset()
+    err_check(rs)
 
 
 def CONFIG_SetReferenceLevel_py(refLevel=0):
@@ -442,7 +470,10 @@ def ALIGN_GetAlignmentNeeded_py():
 
 
 def ALIGN_RunAlignment_py():
-    err_check(ALIGN_RunAlignment())
+    cdef ReturnStatus rs
+    with nogil:
+        rs = ALIGN_RunAlignment()
+    err_check(rs)
 
 
 ##########################################################
@@ -455,7 +486,10 @@ def DEVICE_PrepareForRun_py():
 
 
 def DEVICE_Run_py():
-    err_check(DEVICE_Run())
+    cdef ReturnStatus rs
+    with nogil:
+        rs = DEVICE_Run()
+    err_check(rs)
 
 
 def DEVICE_GetEnable_py():
@@ -469,7 +503,10 @@ def DEVICE_StartFrameTransfer_py():
     
     
 def DEVICE_Stop_py():
-    err_check(DEVICE_Stop())
+    cdef ReturnStatus rs
+    with nogil:
+        rs = DEVICE_Stop()
+    err_check(rs)
     
 
 def DEVICE_GetEventStatus_py(eventID=DEVEVENT_OVERRANGE):
@@ -592,43 +629,80 @@ def IQBLK_AcquireIQData_py():
 def IQBLK_WaitForIQDataReady_py(timeoutMsec=100):
     cdef int _timeoutMsec = timeoutMsec
     cdef bint ready
-    err_check(IQBLK_WaitForIQDataReady(_timeoutMsec, &ready))
+    cdef ReturnStatus rs
+    with nogil:
+        rs = IQBLK_WaitForIQDataReady(_timeoutMsec, &ready)
+    err_check(rs)
     return ready
 
 
-def IQBLK_GetIQData_py(reqLength=1000):
+def _check_buffer(np.ndarray buf, dtype, int length):
+    if buf.dtype != dtype or not buf.flags['C_CONTIGUOUS'] or not buf.flags['WRITEABLE']:
+        raise ValueError('Buffers must be writeable, C-contiguous {} arrays'.format(
+            np.dtype(dtype).name))
+    if buf.size < length:
+        raise ValueError('Buffer holds {} points, {} requested'.format(buf.size, length))
+
+
+# The IQBLK getters write straight into caller-owned NumPy arrays when they
+# are passed in, so repeated acquisitions can reuse the same memory.
+def IQBLK_GetIQData_py(reqLength=1000, np.ndarray iqData=None):
     cdef int _reqLength = reqLength
     cdef int outLength
-    cdef np.ndarray iqData = np.empty(shape=(reqLength*2), dtype=np.float32, order='c')
-    err_check(IQBLK_GetIQData(<float*> iqData.data, &outLength, _reqLength))
-    return np.asarray(iqData, dtype=np.float32)
-
-    
-def IQBLK_GetIQDataDeinterleaved_py(reqLength=1000):
+    if iqData is None:
+        iqData = np.empty(shape=(reqLength*2), dtype=np.float32, order='c')
+    _check_buffer(iqData, np.float32, 2 * reqLength)
+    cdef float* iqPtr = <float*> iqData.data
+    cdef ReturnStatus rs
+    with nogil:
+        rs = IQBLK_GetIQData(iqPtr, &outLength, _reqLength)
+    err_check(rs)
+    return iqData[:2 * outLength]
+
+    
+def IQBLK_GetIQDataDeinterleaved_py(reqLength=1000, np.ndarray iData=None,
+                                    np.ndarray qData=None):
+    cdef int _reqLength = reqLength
+    cdef int outLength
+    if iData is None:
+        iData = np.empty(shape=(reqLength), dtype=np.float32, order='c')
+    if qData is None:
+        qData = np.empty(shape=(reqLength), dtype=np.float32, order='c')
+    _check_buffer(iData, np.float32, reqLength)
+    _check_buffer(qData, np.float32, reqLength)
+    cdef float* iPtr = <float*> iData.data
+    cdef float* qPtr = <float*> qData.data
+    cdef ReturnStatus rs
+    with nogil:
+        rs = IQBLK_GetIQDataDeinterleaved(iPtr, qPtr, &outLength, _reqLength)
+    err_check(rs)
+    return iData[:outLength], qData[:outLength]
+
+
+# A complex64 array has the same memory layout as an array of Cplx32 structs
+def IQBLK_GetIQDataCplx_py(reqLength=1000, np.ndarray iqData=None):
     cdef int _reqLength = reqLength
     cdef int outLength
-    cdef np.ndarray iData = np.empty(shape=(reqLength), dtype=np.float32, order='c')
-    cdef np.ndarray qData = np.empty(shape=(reqLength), dtype=np.float32, order='c')
-    err_check(IQBLK_GetIQDataDeinterleaved(<float*> iData.data, <float*> qData.data, &outLength, _reqLength))
-    return np.asarray(iData, dtype=np.float32), np.asarray(qData, dtype=np.float32)
-
-# Not worth the trouble to convert the Cplx32 struct to a Pythonic data type
-# The commented function below does not work
-# def IQBLK_GetIQDataCplx_py(reqLength):
-#     cdef int req = reqLength
-#     cdef int outLength
-#     cdef Cplx32 iqDataCplx[reqLength]
-#     err_check(IQBLK_GetIQDataCplx(iqDataCplx, &outLength, reqLength))
-#     return [(d['i'] + 1j * d['q']) for d in np.asarray(iqDataCplx)]
+    if iqData is None:
+        iqData = np.empty(shape=(reqLength), dtype=np.complex64, order='c')
+    _check_buffer(iqData, np.complex64, reqLength)
+    cdef Cplx32* iqPtr = <Cplx32*> iqData.data
+    cdef ReturnStatus rs
+    with nogil:
+        rs = IQBLK_GetIQDataCplx(iqPtr, &outLength, _reqLength)
+    err_check(rs)
+    return iqData[:outLength]
 
 # Helper function
+# Extra keyword arguments (e.g. preallocated iData/qData or iqData arrays)
+# are passed on to get_function
 def IQBLK_Acquire_py(get_function=IQBLK_GetIQDataDeinterleaved_py,
-                     recordLength=1000, timeoutMsec=100):
+                     recordLength=1000, timeoutMsec=100, **kwargs):
     DEVICE_Run_py()
     IQBLK_AcquireIQData_py()
     while not IQBLK_WaitForIQDataReady_py(timeoutMsec):
         pass
-    return get_function(recordLength)
+    return get_function(recordLength, **kwargs)
 
 
 def IQBLK_GetIQAcqInfo_py():
@@ -654,6 +728,8 @@ def SPECTRUM_GetEnable_py():
 
 
 def SPECTRUM_SetDefault_py():
+    global _spectrumSettings
+    _spectrumSettings = None
     err_check(SPECTRUM_SetDefault())
 
 
@@ -666,15 +742,24 @@ def SPECTRUM_GetSettings_py():
 def SPECTRUM_SetSettings_py(span=40e6, rbw=300e3, enableVBW=False, vbw=300e3,
                             traceLength=801, window=SpectrumWindows.SpectrumWindow_Kaiser,
                             verticalUnit=SpectrumVerticalUnits.SpectrumVerticalUnit_dBm):
-    # Grab fully-populated Spectrum_Settings struct for safety reasons
-    settings = SPECTRUM_GetSettings_py()
-    settings['span'] = span
-    settings['rbw'] = rbw
-    settings['enableVBW'] = enableVBW
-    settings['vbw'] = vbw
-    settings['traceLength'] = traceLength
-    settings['verticalUnit'] = verticalUnit
+    # SPECTRUM_SetSettings only reads the input fields, so there is no need
+    # to read the current settings first. Unchanged settings are not resent.
+    global _spectrumSettings
+    newSettings = (span, rbw, enableVBW, vbw, traceLength, window, verticalUnit)
+    if newSettings == _spectrumSettings:
+        return
+    cdef Spectrum_Settings settings
+    memset(&settings, 0, sizeof(settings))
+    settings.span = span
+    settings.rbw = rbw
+    settings.enableVBW = enableVBW
+    settings.vbw = vbw
+    settings.traceLength = traceLength
+    settings.window = window
+    settings.verticalUnit = verticalUnit
+    _spectrumSettings = None
     err_check(SPECTRUM_SetSettings(settings))
+    _spectrumSettings = newSettings
 
     
 def SPECTRUM_SetTraceType_py(trace=SpectrumTraces.SpectrumTrace1, enable=True,
@@ -705,17 +790,27 @@ def SPECTRUM_AcquireTrace_py():
 def SPECTRUM_WaitForTraceReady_py(timeoutMsec=100):
     cdef int _timeoutMsec = timeoutMsec
     cdef bint ready
-    err_check(SPECTRUM_WaitForTraceReady(_timeoutMsec, &ready))
+    cdef ReturnStatus rs
+    with nogil:
+        rs = SPECTRUM_WaitForTraceReady(_timeoutMsec, &ready)
+    err_check(rs)
     return ready
     
 
-def SPECTRUM_GetTrace_py(trace=SpectrumTraces.SpectrumTrace1, tracePoints=801):
+def SPECTRUM_GetTrace_py(trace=SpectrumTraces.SpectrumTrace1, tracePoints=801,
+                         np.ndarray traceData=None):
+    cdef int _trace = trace
     cdef int _tracePoints = tracePoints
-    cdef np.ndarray traceData = np.empty(shape=(tracePoints), dtype=np.float32,
-                                     order='c')
+    if traceData is None:
+        traceData = np.empty(shape=(tracePoints), dtype=np.float32, order='c')
+    _check_buffer(traceData, np.float32, tracePoints)
+    cdef float* tracePtr = <float*> traceData.data
     cdef int outTracePoints
-    err_check(SPECTRUM_GetTrace(trace, _tracePoints, <float *> traceData.data, &outTracePoints))
-    return np.asarray(traceData, dtype=np.float32)
+    cdef ReturnStatus rs
+    with nogil:
+        rs = SPECTRUM_GetTrace(_trace, _tracePoints, tracePtr, &outTracePoints)
+    err_check(rs)
+    return traceData[:outTracePoints]
 
 
 def SPECTRUM_GetTraceInfo_py():
@@ -734,6 +829,28 @@ def SPECTRUM_Acquire_py(trace=SpectrumTraces.SpectrumTrace1, tracePoints=801,
     return SPECTRUM_GetTrace_py(trace, tracePoints)
 
 
+# Helper generator for continuous monitoring
+# Runs the device once and re-arms SPECTRUM_AcquireTrace for every trace.
+# Yields (trace, traceInfo) with traces written into numBuffers rotating
+# buffers, so a trace is overwritten numBuffers traces after it is yielded.
+def SPECTRUM_AcquireContinuous_py(trace=SpectrumTraces.SpectrumTrace1, tracePoints=801,
+                                  numBuffers=4, count=None, timeoutMsec=100):
+    cdef np.ndarray buffers = np.empty(shape=(numBuffers, tracePoints), dtype=np.float32,
+                                       order='c')
+    cdef int n = 0
+    DEVICE_Run_py()
+    try:
+        while count is None or n < count:
+            SPECTRUM_AcquireTrace_py()
+            while not SPECTRUM_WaitForTraceReady_py(timeoutMsec):
+                pass
+            traceData = SPECTRUM_GetTrace_py(trace, tracePoints, buffers[n % numBuffers])
+            yield traceData, SPECTRUM_GetTraceInfo_py()
+            n += 1
+    finally:
+        DEVICE_Stop_py()
+
+
 ##########################################################
 # DPX Bitmap, Trace, and Spectrogram
 ##########################################################
@@ -830,48 +947,101 @@ def DPX_IsFrameBufferAvailable_py():
 
 
 def DPX_WaitForDataReady_py(timeoutMsec=50):
+    cdef int _timeoutMsec = timeoutMsec
     cdef bint ready
-    err_check(DPX_WaitForDataReady(timeoutMsec, &ready))
+    cdef ReturnStatus rs
+    with nogil:
+        rs = DPX_WaitForDataReady(_timeoutMsec, &ready)
+    err_check(rs)
     return ready
 
 
-def DPX_GetFrameBuffer_py():
-    cpdef DPX_FrameBuffer fb
-    err_check(DPX_GetFrameBuffer(&fb))
-    err_check(DPX_FinishFrameBuffer())
-
-    spectrumBitmap = np.asarray(fb.spectrumBitmap)
-    spectrumBitmap = spectrumBitmap.reshape((fb.spectrumBitmapHeight,
-                                        fb.spectrumBitmapWidth))
-
-    spectrumTraces = []
-    for i in range(3):
-        spectrumTraces.append(10 * np.log10(1000 * np.asarray(
-            fb.spectrumTraces[i])[:fb.spectrumTraceLength]) + 30)
-
-    """The Cython typedef of uint8_t is an unsigned char. Because
-    DPX_FrameBuffer.sogramBitmap is defined as a uint8_t*
-    Python interprets, the returned value as a string. Fortunately
-    Numpy has the .fromstring() method that interprets the string as
-    numerical values."""
-    sogramBitmap = np.fromstring(fb.sogramBitmap, dtype=np.uint8)
-    sogramBitmap = sogramBitmap.reshape((
-        fb.sogramBitmapHeight, fb.sogramBitmapWidth))[
-               :fb.sogramBitmapNumValidLines]
-
-    fb_py = DPX_FrameBuffer_py(fb, spectrumBitmap, spectrumTraces,
+def DPX_GetFrameBuffer_py(np.ndarray spectrumBitmap=None, np.ndarray spectrumTraces=None,
+                          np.ndarray sogramBitmap=None):
+    # Preallocated float32 spectrumBitmap/spectrumTraces and uint8
+    # sogramBitmap arrays can be passed in and are filled in place.
+    # Trace data is converted from W to dBm in place.
+    cdef DPX_FrameBuffer fb
+    cdef ReturnStatus rs
+    cdef int i
+    with nogil:
+        rs = DPX_GetFrameBuffer(&fb)
+    err_check(rs)
+    cdef int traceLength = fb.spectrumTraceLength
+    cdef int numTraces = fb.numSpectrumTraces
+    cdef int numValidLines = fb.sogramBitmapNumValidLines
+    try:
+        if spectrumBitmap is None:
+            spectrumBitmap = np.empty(fb.spectrumBitmapSize, dtype=np.float32)
+        _check_buffer(spectrumBitmap, np.float32, fb.spectrumBitmapSize)
+        memcpy(spectrumBitmap.data, fb.spectrumBitmap, fb.spectrumBitmapSize * sizeof(float))
+
+        if spectrumTraces is None:
+            spectrumTraces = np.empty(numTraces * traceLength, dtype=np.float32)
+        _check_buffer(spectrumTraces, np.float32, numTraces * traceLength)
+        for i in range(numTraces):
+            memcpy(spectrumTraces.data + i * traceLength * sizeof(float),
+                   fb.spectrumTraces[i], traceLength * sizeof(float))
+
+        # Only the valid spectrogram lines are copied
+        if sogramBitmap is None:
+            sogramBitmap = np.empty(fb.sogramBitmapSize, dtype=np.uint8)
+        _check_buffer(sogramBitmap, np.uint8, numValidLines * fb.sogramBitmapWidth)
+        memcpy(sogramBitmap.data, fb.sogramBitmap,
+               numValidLines * fb.sogramBitmapWidth * sizeof(uint8_t))
+        timestamps = np.empty(numValidLines, dtype=np.float64)
+        memcpy(np.PyArray_DATA(timestamps), fb.sogramBitmapTimestampArray,
+               numValidLines * sizeof(double))
+        triggers = np.empty(numValidLines, dtype=np.int16)
+        memcpy(np.PyArray_DATA(triggers), fb.sogramBitmapContainTriggerArray,
+               numValidLines * sizeof(int16_t))
+    finally:
+        # Checked only once the copies succeeded, so their errors propagate
+        rs = DPX_FinishFrameBuffer()
+    err_check(rs)
+
+    spectrumBitmap = spectrumBitmap.reshape(-1)[:fb.spectrumBitmapSize].reshape(
+        (fb.spectrumBitmapHeight, fb.spectrumBitmapWidth))
+    spectrumTraces = spectrumTraces.reshape(-1)[:numTraces * traceLength].reshape(
+        (numTraces, traceLength))
+    # 10 * log10(1000 * W) + 30
+    np.log10(spectrumTraces, out=spectrumTraces)
+    spectrumTraces *= 10
+    spectrumTraces += 60
+    sogramBitmap = sogramBitmap.reshape(-1)[:numValidLines * fb.sogramBitmapWidth].reshape(
+        (numValidLines, fb.sogramBitmapWidth))
+
+    fbInfo = {'fftPerFrame': fb.fftPerFrame, 'fftCount': fb.fftCount,
+              'frameCount': fb.frameCount, 'timestamp': fb.timestamp,
+              'acqDataStatus': fb.acqDataStatus, 'minSigDuration': fb.minSigDuration,
+              'minSigDurOutOfRange': fb.minSigDurOutOfRange,
+              'spectrumBitmapWidth': fb.spectrumBitmapWidth,
+              'spectrumBitmapHeight': fb.spectrumBitmapHeight,
+              'spectrumBitmapSize': fb.spectrumBitmapSize,
+              'spectrumTraceLength': fb.spectrumTraceLength,
+              'numSpectrumTraces': fb.numSpectrumTraces,
+              'spectrumEnabled': fb.spectrumEnabled,
+              'spectrogramEnabled': fb.spectrogramEnabled,
+              'sogramBitmapWidth': fb.sogramBitmapWidth,
+              'sogramBitmapHeight': fb.sogramBitmapHeight,
+              'sogramBitmapSize': fb.sogramBitmapSize,
+              'sogramBitmapNumValidLines': numValidLines,
+              'sogramBitmapTimestampArray': timestamps,
+              'sogramBitmapContainTriggerArray': triggers}
+    fb_py = DPX_FrameBuffer_py(fbInfo, spectrumBitmap, spectrumTraces,
                                sogramBitmap)
     return fb_py
 
 
 # Helper Function for DPX Acquisition
-def DPX_AcquireFB_py():
+# Extra keyword arguments (preallocated arrays) are passed on to
+# DPX_GetFrameBuffer_py
+def DPX_AcquireFB_py(timeoutMsec=50, **kwargs):
     DEVICE_Run_py()
+    # Block in DPX_WaitForDataReady rather than spinning on availability
     while not DPX_IsFrameBufferAvailable_py():
-        pass
-    while not DPX_WaitForDataReady_py():
-        pass
-    fb_py = DPX_GetFrameBuffer_py()
+        DPX_WaitForDataReady_py(timeoutMsec)
+    fb_py = DPX_GetFrameBuffer_py(**kwargs)
     return fb_py
 
 
@@ -916,7 +1086,10 @@ def DPX_GetSogramHiResLine_py(lineIndex=0):
     cdef double dataSF
     cdef int32_t tracePoints = 267
     cdef int32_t firstValidPoint = 0
-    err_check(DPX_GetSogramHiResLine(vData, &vDataSize, _lineIndex, &dataSF, tracePoints, firstValidPoint))
+    cdef ReturnStatus rs
+    with nogil:
+        rs = DPX_GetSogramHiResLine(vData, &vDataSize, _lineIndex, &dataSF, tracePoints, firstValidPoint)
+    err_check(rs)
     return vData
 
 
@@ -977,17 +1150,23 @@ def AUDIO_GetEnable_py():
     err_check(AUDIO_GetEnable(&enable))
     return enable
 
-# Error checking not working
-def AUDIO_GetData_py(inSize):
+def AUDIO_GetData_py(inSize, out=None):
+    # Returns the samples actually delivered, which may be fewer than
+    # inSize, as a view of out (a C-contiguous int16 array) if given
     cdef uint16_t _inSize = inSize
-    cdef uint16_t outSize
-    cdef np.ndarray data = np.empty(shape=(inSize), dtype=np.int16, order='c')
-    err_check(AUDIO_GetData(<int16_t *> data.data, _inSize, &outSize))
-    # print(_inSize)
-    # print(outSize)
-    # if _inSize != outSize:
-    #     raise RSAError('# samples requested != # samples returned')
-    return data
+    cdef uint16_t outSize = 0
+    cdef np.ndarray data
+    if out is None:
+        data = np.empty(shape=(inSize), dtype=np.int16, order='c')
+    else:
+        data = out
+        _check_buffer(data, np.int16, inSize)
+    cdef int16_t* dataPtr = <int16_t*> data.data
+    cdef ReturnStatus rs
+    with nogil:
+        rs = AUDIO_GetData(dataPtr, _inSize, &outSize)
+    err_check(rs)
+    return data[:outSize]
 
 
 def AUDIO_Stop_py():
@@ -1070,11 +1249,18 @@ def IQSTREAM_GetAcqParameters_py():
     return bwHz_act, srSps
 
 
+_IQSTREAM_DTYPES = {IQSODT_SINGLE: np.float32, IQSODT_INT32: np.int32,
+                    IQSODT_INT16: np.int16}
+
+
 def IQSTREAM_SetOutputConfiguration_py(dest=IQSOUTDEST.IQSOD_FILE_SIQ,
                                        dtype=IQSOUTDTYPE.IQSODT_INT16):
+    global _iqStreamDtype
     cdef IQSOUTDEST _dest = dest
     cdef IQSOUTDTYPE _dtype = dtype
+    _iqStreamDtype = None
     err_check(IQSTREAM_SetOutputConfiguration(_dest, _dtype))
+    _iqStreamDtype = _IQSTREAM_DTYPES[_dtype]
     
 
 def IQSTREAM_SetIQDataBufferSize_py(reqSize):
@@ -1124,13 +1310,31 @@ def IQSTREAM_Stop_py():
     err_check(IQSTREAM_Stop())
     
 
-# Can't be done with C pointers in Cython
-# def IQSTREAM_GetIQData_py():
-#     cdef void* iqData
-#     cdef int iqlen
-#     cdef IQSTRMIQINFO iqinfo
-#     err_check(IQSTREAM_GetIQData(iqData, &iqlen, &iqinfo))
-#     return iqData
+# iqData must be a C-contiguous array of the type selected with
+# IQSTREAM_SetOutputConfiguration_py() (float32, int32 or int16) with room for
+# 2 * IQSTREAM_GetIQDataBufferSize_py() values. It is filled in place and can
+# be reused on every call. Returns the number of IQ pairs written and the
+# IQSTRMIQINFO fields.
+def IQSTREAM_GetIQData_py(np.ndarray iqData):
+    cdef int iqlen
+    cdef int bufferSize
+    cdef IQSTRMIQINFO iqinfo
+    # The DLL fills a whole buffer, so the array is checked against the
+    # configured sample type and buffer size before it is handed over
+    if _iqStreamDtype is None:
+        raise RSAError('Call IQSTREAM_SetOutputConfiguration_py() before IQSTREAM_GetIQData_py()')
+    err_check(IQSTREAM_GetIQDataBufferSize(&bufferSize))
+    _check_buffer(iqData, _iqStreamDtype, 2 * bufferSize)
+    cdef void* iqPtr = <void*> iqData.data
+    cdef ReturnStatus rs
+    with nogil:
+        rs = IQSTREAM_GetIQData(iqPtr, &iqlen, &iqinfo)
+    err_check(rs)
+    triggerIndices = [iqinfo.triggerIndices[i] for i in range(iqinfo.triggerCount)]
+    iqInfo = {'timestamp': iqinfo.timestamp, 'triggerCount': iqinfo.triggerCount,
+              'triggerIndices': triggerIndices, 'scaleFactor': iqinfo.scaleFactor,
+              'acqStatus': iqinfo.acqStatus}
+    return iqlen, iqInfo
 
 
 # def IQSTREAM_GetDiskFileInfo_py():
@@ -1140,7 +1344,8 @@ def IQSTREAM_Stop_py():
 
 
 def IQSTREAM_ClearAcqStatus_py():
-    err_check(IQSTREAM_ClearAcqStatus())
+    # Returns void, there is no status to check
+    IQSTREAM_ClearAcqStatus()
 
 
 ###########################################################
@@ -1,4 +1,6 @@
-cdef extern from 'RSA_API.h':
+# Every API function is declared nogil so the wrappers in rsa_api.pyx can
+# release the GIL while the DLL blocks or copies data
+cdef extern from 'RSA_API.h' nogil:
 
     ##########################################################
     # Status and Error Reporting
@@ -487,16 +489,16 @@ cdef extern from 'RSA_API.h':
         bint spectrumEnabled
         bint spectrogramEnabled
 
-        float spectrumBitmap[161001]
-        float spectrumTraces[3][4005]
+        float* spectrumBitmap
+        float** spectrumTraces
 
         int32_t sogramBitmapWidth
         int32_t sogramBitmapHeight
         int32_t sogramBitmapSize
         int32_t sogramBitmapNumValidLines
-        uint8_t sogramBitmap[133500]
-        double sogramBitmapTimestampArray[500]
-        int16_t sogramBitmapContainTriggerArray[500]
+        uint8_t* sogramBitmap
+        double* sogramBitmapTimestampArray
+        int16_t* sogramBitmapContainTriggerArray
 
 
     ctypedef struct DPX_SogramSettingsStruct:
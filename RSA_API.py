@@ -118,7 +118,7 @@ class ReturnStatus(Enum):
     errorCalConfigInvalid = 3309
 
     # flash
-    errorFlashFileSystemUnexpectedSize = 3401,
+    errorFlashFileSystemUnexpectedSize = 3401
     errorFlashFileSystemNotMounted = 3402
     errorFlashFileSystemOutOfRange = 3403
     errorFlashFileSystemIndexNotFound = 3404
@@ -176,6 +176,15 @@ class ReturnStatus(Enum):
     notImplemented = -1
 
 
+# ReturnStatus names by value, so err_check() does no Enum lookups
+STATUS_NAMES = {status.value: status.name for status in ReturnStatus}
+
+
+def err_check(rs):
+    if rs:
+        raise RSAError(STATUS_NAMES.get(rs, 'ReturnStatus {}'.format(rs)))
+
+
 class Cplx32(Structure):
     _fields_ = [('i', c_float), ('q', c_float)]
 
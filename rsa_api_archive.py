@@ -0,0 +1,309 @@
+"""
+Tektronix RSA_API Capture Archive
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+A chunked, time-indexed archive for long monitoring runs: spectrum traces
+with their Spectrum_Settings, IQ blocks with their IQBLK_ACQINFO and
+DPXogram lines. Each kind and record shape is a series in its own
+directory, holding:
+
+    series.json         record dtype and shape, index fields, chunk size
+    index.bin           one fixed-size index record per data record, in
+                        time order: time (ns since the epoch), start and
+                        stop frequency, chunk and row, plus the acquisition
+                        info of the kind
+    chunk-00000.bin...  chunkRecords records each, preallocated and
+                        memory-mapped
+
+Queries binary-search the time column, filter the frequency columns of
+that slice and read only the matching rows from the chunks:
+
+    archive = CaptureArchive('monitor')
+    archive.append_spectrum(trace, specSet, timeBase.to_datetime64(traceInfo.timestamp))
+    ...
+    for index, traces in archive.query('spectrum', '2026-10-18T14:00', '2026-10-18T14:05',
+                                       2.40e9, 2.48e9):
+        ...
+
+A record's data are written before its index record, and readers only
+use whole index records, so other processes can query an archive while it
+is being appended to; they see new records on their next query.
+"""
+
+from collections import OrderedDict
+import json
+import os
+import numpy as np
+from RSA_API import *
+
+
+INDEX_FIELDS = [('time', '<i8'), ('startFreq', '<f8'), ('stopFreq', '<f8'),
+                ('chunk', '<u4'), ('row', '<u4')]
+
+# Acquisition info stored in the index for each kind
+KIND_FIELDS = {
+    'spectrum': [('freqStep', '<f8'), ('rbw', '<f8'), ('vbw', '<f8'), ('window', '<i4'),
+                 ('verticalUnit', '<i4')],
+    'iq': [('sampleRate', '<f8'), ('sample0Timestamp', '<u8'),
+           ('triggerSampleIndex', '<u8'), ('triggerTimestamp', '<u8'), ('acqStatus', '<u4')],
+    'dpxogram': [('lineTime', '<f8')],
+}
+
+
+def to_ns(t):
+    # ns since the epoch of an int, datetime64 or ISO 8601 string
+    if isinstance(t, (int, np.integer)):
+        return int(t)
+    return int(np.datetime64(t, 'ns').astype(np.int64))
+
+
+class ArchiveSeries:
+    # One directory of fixed-shape records. Created when recordDtype and
+    # recordShape are given and the directory has no series yet. Only the
+    # chunk being appended to and the maxOpenChunks most recently read
+    # chunks stay memory-mapped.
+    def __init__(self, path, recordDtype=None, recordShape=None, kind='', extraFields=(),
+                 chunkRecords=1024, maxOpenChunks=4):
+        self.path = path
+        self.maxOpenChunks = maxOpenChunks
+        meta = os.path.join(path, 'series.json')
+        if not os.path.exists(meta):
+            if recordDtype is None:
+                raise ValueError('{} is not an archive series'.format(path))
+            os.makedirs(path, exist_ok=True)
+            info = {'kind': kind, 'recordDtype': np.dtype(recordDtype).str,
+                    'recordShape': list(recordShape), 'chunkRecords': chunkRecords,
+                    'indexFields': INDEX_FIELDS + list(extraFields)}
+            with open(meta + '.tmp', 'w') as f:
+                json.dump(info, f, indent=1)
+            os.replace(meta + '.tmp', meta)
+            open(os.path.join(path, 'index.bin'), 'ab').close()
+        with open(meta) as f:
+            info = json.load(f)
+        self.kind = info['kind']
+        self.recordDtype = np.dtype(info['recordDtype'])
+        self.recordShape = tuple(info['recordShape'])
+        self.chunkRecords = info['chunkRecords']
+        self.indexDtype = np.dtype([tuple(field) for field in info['indexFields']])
+        self.indexFile = os.path.join(path, 'index.bin')
+        self.index = np.zeros(0, dtype=self.indexDtype)
+        self.indexBytes = -1
+        # Read-only chunk maps, least recently used first
+        self.chunks = OrderedDict()
+        self.writeChunk = None
+        self.writeMap = None
+        self.writer = None
+        self.refresh()
+        # Records and last time as written by this process
+        self.count = len(self.index)
+        self.lastTime = int(self.index['time'][-1]) if self.count else None
+
+    def __len__(self):
+        return len(self.index)
+
+    def _chunk_file(self, chunk):
+        return os.path.join(self.path, 'chunk-{:05d}.bin'.format(chunk))
+
+    def _map(self, chunk, mode):
+        return np.memmap(self._chunk_file(chunk), self.recordDtype, mode,
+                         shape=(self.chunkRecords,) + self.recordShape)
+
+    def _chunk(self, chunk):
+        # Read-only map of a whole chunk from the LRU cache
+        mm = self.chunks.pop(chunk, None)
+        if mm is None:
+            mm = self._map(chunk, 'r')
+            while len(self.chunks) >= self.maxOpenChunks:
+                self.chunks.popitem(last=False)
+        self.chunks[chunk] = mm
+        return mm
+
+    def _write_chunk(self, chunk):
+        # Writable map of the chunk being appended to; the previous one is
+        # flushed and unmapped
+        if chunk != self.writeChunk:
+            self._close_write_chunk()
+            # Preallocates the whole chunk when it is new
+            mode = 'r+' if os.path.exists(self._chunk_file(chunk)) else 'w+'
+            self.writeMap = self._map(chunk, mode)
+            self.writeChunk = chunk
+        return self.writeMap
+
+    def _close_write_chunk(self):
+        if self.writeMap is not None:
+            self.writeMap.flush()
+            self.writeMap = None
+            self.writeChunk = None
+
+    def refresh(self):
+        # Maps any index records appended since the last call
+        size = os.path.getsize(self.indexFile)
+        size -= size % self.indexDtype.itemsize
+        if size != self.indexBytes:
+            self.indexBytes = size
+            self.index = (np.memmap(self.indexFile, self.indexDtype, 'r',
+                                    shape=(size // self.indexDtype.itemsize,))
+                          if size else np.zeros(0, dtype=self.indexDtype))
+        return len(self.index)
+
+    def append(self, data, time, startFreq, stopFreq, **extra):
+        # Adds one record. time is in ns since the epoch (or a datetime64
+        # or string) and may not go back in time.
+        data = np.asarray(data)
+        if data.shape != self.recordShape:
+            raise ValueError('Record shape {} does not match the series shape {}'.format(
+                data.shape, self.recordShape))
+        time = to_ns(time)
+        if self.writer is None:
+            self.count = self.refresh()
+            # Drops a partial record left by an interrupted append
+            os.truncate(self.indexFile, self.indexBytes)
+            self.writer = open(self.indexFile, 'ab')
+            self.lastTime = int(self.index['time'][-1]) if self.count else None
+        if self.lastTime is not None and time < self.lastTime:
+            raise ValueError('Records must be appended in time order')
+        chunk, row = divmod(self.count, self.chunkRecords)
+        self._write_chunk(chunk)[row] = data
+        record = np.zeros(1, dtype=self.indexDtype)
+        record['time'] = time
+        record['startFreq'] = startFreq
+        record['stopFreq'] = stopFreq
+        record['chunk'] = chunk
+        record['row'] = row
+        for name, value in extra.items():
+            record[name] = value
+        self.writer.write(record.tobytes())
+        self.writer.flush()
+        self.count += 1
+        self.lastTime = time
+
+    def flush(self):
+        if self.writeMap is not None:
+            self.writeMap.flush()
+
+    def close(self):
+        self._close_write_chunk()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        self.chunks.clear()
+        self.index = np.zeros(0, dtype=self.indexDtype)
+        self.indexBytes = -1
+
+    def select(self, start=None, stop=None, startFreq=None, stopFreq=None):
+        # Positions of the records with start <= time < stop that overlap
+        # startFreq..stopFreq
+        self.refresh()
+        times = self.index['time']
+        first = 0 if start is None else np.searchsorted(times, to_ns(start), 'left')
+        last = len(times) if stop is None else np.searchsorted(times, to_ns(stop), 'left')
+        positions = np.arange(first, last)
+        if startFreq is not None or stopFreq is not None:
+            window = self.index[first:last]
+            keep = np.ones(len(window), dtype=bool)
+            if startFreq is not None:
+                keep &= window['stopFreq'] >= startFreq
+            if stopFreq is not None:
+                keep &= window['startFreq'] <= stopFreq
+            positions = positions[keep]
+        return positions
+
+    def read(self, positions):
+        # Records at the given index positions, copied out of the chunks
+        index = self.index[positions]
+        out = np.empty((len(index),) + self.recordShape, dtype=self.recordDtype)
+        chunks = index['chunk']
+        for chunk in np.unique(chunks):
+            mask = chunks == chunk
+            out[mask] = self._chunk(int(chunk))[index['row'][mask]]
+        return out
+
+    def query(self, start=None, stop=None, startFreq=None, stopFreq=None):
+        # Returns (index records, data) of the matching records
+        positions = self.select(start, stop, startFreq, stopFreq)
+        return np.array(self.index[positions]), self.read(positions)
+
+
+class CaptureArchive:
+    # Series named kind-shape under one directory, created as data arrive
+    def __init__(self, path, chunkRecords=1024, maxOpenChunks=4):
+        self.path = path
+        self.chunkRecords = chunkRecords
+        self.maxOpenChunks = maxOpenChunks
+        self.series = {}
+        os.makedirs(path, exist_ok=True)
+
+    def _series(self, kind, dtype, shape):
+        name = '{}-{}'.format(kind, 'x'.join(str(n) for n in shape))
+        if name not in self.series:
+            self.series[name] = ArchiveSeries(os.path.join(self.path, name), dtype, shape, kind,
+                                              KIND_FIELDS[kind], self.chunkRecords,
+                                              self.maxOpenChunks)
+        return self.series[name]
+
+    def open_series(self, kind):
+        # Every series of a kind on disk, including ones other processes add
+        prefix = kind + '-'
+        for name in sorted(os.listdir(self.path)):
+            if name.startswith(prefix) and name not in self.series and os.path.exists(
+                    os.path.join(self.path, name, 'series.json')):
+                self.series[name] = ArchiveSeries(os.path.join(self.path, name),
+                                                  maxOpenChunks=self.maxOpenChunks)
+        return [s for name, s in sorted(self.series.items()) if s.kind == kind]
+
+    def append_spectrum(self, trace, specSet, time):
+        # trace in the units of specSet (a Spectrum_Settings)
+        trace = np.asarray(trace, dtype=np.float32)
+        self._series('spectrum', np.float32, trace.shape).append(
+            trace, time, specSet.actualStartFreq, specSet.actualStopFreq,
+            freqStep=specSet.actualFreqStepSize, rbw=specSet.actualRBW,
+            vbw=specSet.actualVBW if specSet.enableVBW else 0, window=specSet.window,
+            verticalUnit=specSet.verticalUnit)
+
+    def append_iq(self, iq, acqInfo, time, centerFreq, sampleRate, bandwidth=None):
+        # acqInfo is the block's IQBLK_ACQINFO
+        iq = np.asarray(iq, dtype=np.complex64)
+        half = (sampleRate if bandwidth is None else bandwidth) / 2
+        self._series('iq', np.complex64, iq.shape).append(
+            iq, time, centerFreq - half, centerFreq + half, sampleRate=sampleRate,
+            sample0Timestamp=acqInfo.sample0Timestamp,
+            triggerSampleIndex=acqInfo.triggerSampleIndex,
+            triggerTimestamp=acqInfo.triggerTimestamp, acqStatus=acqInfo.acqStatus)
+
+    def append_dpxogram(self, lines, times, startFreq, stopFreq, lineTimes=None):
+        # One record per DPXogram line; times are their ns since the epoch
+        lines = np.asarray(lines)
+        series = self._series('dpxogram', lines.dtype, lines.shape[1:])
+        for k, line in enumerate(lines):
+            series.append(line, times[k], startFreq, stopFreq,
+                          lineTime=0 if lineTimes is None else lineTimes[k])
+
+    def query(self, kind, start=None, stop=None, startFreq=None, stopFreq=None):
+        # (index records, data) of each series of kind with matching records
+        results = []
+        for series in self.open_series(kind):
+            positions = series.select(start, stop, startFreq, stopFreq)
+            if len(positions):
+                results.append((np.array(series.index[positions]), series.read(positions)))
+        return results
+
+    def flush(self):
+        for series in self.series.values():
+            series.flush()
+
+    def close(self):
+        for series in self.series.values():
+            series.close()
+        self.series = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,144 @@
+"""
+Tektronix RSA_API asyncio Acquisition
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+asyncio wrapper around the spectrum, block IQ and DPX acquisitions. The
+blocking API calls, including the *_WaitFor*Ready calls that the examples
+loop on, run on a single worker thread, so the event loop stays free to
+serve network clients or disk writes while the analyzer acquires:
+
+    async def main(rsa):
+        async with AsyncRSA(rsa) as dev:
+            trace = await dev.spectrum()
+            iq = await dev.iq_block(100000)
+            async for frame in dev.dpx_frames(10):
+                plt.imshow(frame.bitmap)
+
+The API is not thread safe, so every call made through one AsyncRSA is
+serialized on its worker thread. Configure the device (CONFIG_, SPECTRUM_,
+IQBLK_, DPX_ settings) before acquiring, either directly or with call().
+Leaving the async with block stops the device and, unless an executor was
+passed in, shuts the worker thread down.
+"""
+
+from ctypes import *
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import numpy as np
+from RSA_API import *
+from rsa_api_dpx import DPXReader
+from rsa_api_iqblock import IQBlockReader, acquire_block_iq_into
+
+
+class AsyncRSA:
+    def __init__(self, rsa, executor=None, timeoutMsec=100):
+        self.rsa = rsa
+        self.ownExecutor = executor is None
+        self.executor = executor if executor is not None else ThreadPoolExecutor(max_workers=1)
+        self.timeoutMsec = timeoutMsec
+
+    def _run(self, func, *args):
+        return asyncio.get_event_loop().run_in_executor(self.executor, func, *args)
+
+    def call(self, name, *args):
+        # Runs any API function on the worker thread and checks its status,
+        # e.g. await dev.call('CONFIG_SetCenterFreq', c_double(1e9))
+        func = getattr(self.rsa, name)
+        return self._run(lambda: err_check(func(*args)))
+
+    async def run(self):
+        await self.call('DEVICE_Run')
+
+    async def stop(self):
+        await self.call('DEVICE_Stop')
+
+    async def __aenter__(self):
+        await self.run()
+        return self
+
+    async def __aexit__(self, *exc):
+        try:
+            await self.stop()
+        finally:
+            if self.ownExecutor:
+                self.close()
+
+    def close(self):
+        self.executor.shutdown()
+
+    """################SPECTRUM################"""
+    def _trace_length(self):
+        specSet = Spectrum_Settings()
+        err_check(self.rsa.SPECTRUM_GetSettings(byref(specSet)))
+        return specSet.traceLength
+
+    def _spectrum(self, trace, out):
+        rsa = self.rsa
+        ready = c_bool(False)
+        outTracePoints = c_int(0)
+        if out is None:
+            out = np.empty(self._trace_length(), dtype=np.float32)
+        err_check(rsa.SPECTRUM_AcquireTrace())
+        while not ready.value:
+            err_check(rsa.SPECTRUM_WaitForTraceReady(c_int(self.timeoutMsec), byref(ready)))
+        err_check(rsa.SPECTRUM_GetTrace(c_int(trace), c_int(out.size),
+                                        out.ctypes.data_as(POINTER(c_float)),
+                                        byref(outTracePoints)))
+        return out[:outTracePoints.value]
+
+    async def spectrum(self, trace=SpectrumTraces.SpectrumTrace1, out=None):
+        # Returns one trace in dBm as float32, written into out if given
+        return await self._run(self._spectrum, getattr(trace, 'value', trace), out)
+
+    async def spectra(self, count=None, trace=SpectrumTraces.SpectrumTrace1):
+        # Yields count traces (forever if count is None), each a new array.
+        # The trace length is read once, so keep the settings unchanged.
+        traceLength = await self._run(self._trace_length)
+        while count is None or count > 0:
+            yield await self.spectrum(trace, np.empty(traceLength, dtype=np.float32))
+            if count is not None:
+                count -= 1
+
+    """################BLOCK IQ################"""
+    async def iq_block(self, recordLength=None, out=None):
+        # Returns one IQ block as complex64, written into out if given
+        if out is None:
+            if recordLength is None:
+                length = c_int(0)
+                await self.call('IQBLK_GetIQRecordLength', byref(length))
+                recordLength = length.value
+            out = np.empty(int(recordLength), dtype=np.complex64)
+        return await self._run(acquire_block_iq_into, self.rsa, out, recordLength,
+                               self.timeoutMsec)
+
+    async def iq_blocks(self, recordLength, count=None, numBuffers=4, split=False):
+        # Yields IQ blocks from a pool of numBuffers preallocated buffers; a
+        # block is overwritten numBuffers iterations after it is yielded
+        reader = IQBlockReader(self.rsa, recordLength, numBuffers, split, self.timeoutMsec)
+        while count is None or count > 0:
+            yield await self._run(reader.acquire)
+            if count is not None:
+                count -= 1
+
+    """################DPX################"""
+    async def dpx_frame(self):
+        # Returns one DPXFrame (rsa_api_dpx) in new arrays. The frame buffer
+        # is copied before DPX_FinishFrameBuffer releases it.
+        return await self._run(DPXReader(self.rsa, 1, self.timeoutMsec).acquire)
+
+    async def dpx_frames(self, count=None, numBuffers=4):
+        # Yields DPXFrames (forever if count is None) from a pool of
+        # numBuffers frames; a frame is overwritten numBuffers iterations
+        # after it is yielded
+        reader = DPXReader(self.rsa, numBuffers, self.timeoutMsec)
+        await self.call('DPX_Reset')
+        while count is None or count > 0:
+            yield await self._run(reader.acquire)
+            if count is not None:
+                count -= 1
@@ -0,0 +1,254 @@
+"""
+Tektronix RSA_API Audio Streaming
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Continuous demodulated audio. A reader thread drains AUDIO_GetData into a
+preallocated ring of fixed-size int16 blocks, using the outSize the API
+reports so partial reads are appended rather than padded. Blocks can go to
+a callback (called in the reader thread), to the consumer iterating over
+the stream, and to a WAV file written behind by its own thread:
+
+    config_audio(rsa, mode=AudioDemodMode.ADM_FM_75KHZ, volume=0.5)
+    with AudioStream(rsa, blockSize=1024, wavFile='audio.wav') as stream:
+        for block in stream:
+            play(block.data)
+
+Block data are views into the ring, valid until the next block is
+requested. When a consumer falls a whole ring behind, new blocks are
+discarded and counted in overruns. Gaps in the audio itself (the device
+delivering less than the audio sample rate) are counted in underruns.
+"""
+
+from ctypes import *
+from collections import namedtuple
+from threading import Condition, Thread
+from time import perf_counter, sleep
+import wave
+import numpy as np
+from RSA_API import *
+
+
+AUDIO_SAMPLE_RATE = 32000
+AUDIO_MAX_BLOCK = 65535
+
+AudioBlock = namedtuple('AudioBlock', ['data', 'sequence'])
+
+
+def config_audio(rsa, mode=AudioDemodMode.ADM_FM_75KHZ, volume=0.5, mute=False,
+                 freqOffset=0):
+    err_check(rsa.AUDIO_SetMode(mode))
+    err_check(rsa.AUDIO_SetVolume(c_float(volume)))
+    err_check(rsa.AUDIO_SetMute(c_bool(mute)))
+    err_check(rsa.AUDIO_SetFrequencyOffset(c_double(freqOffset)))
+
+
+class AudioStream:
+    # blockSize samples per block (at most 65535), numBlocks blocks in the
+    # ring. buffered=False skips the consumer queue for streams that only
+    # feed the callback or the WAV file. A gap of more than underrunSec
+    # behind real time counts as an underrun.
+    def __init__(self, rsa, blockSize=1024, numBlocks=64, callback=None, wavFile=None,
+                 buffered=True, pollSec=None, underrunSec=0.1):
+        if not 0 < blockSize <= AUDIO_MAX_BLOCK:
+            raise ValueError('blockSize must be 1 to {}'.format(AUDIO_MAX_BLOCK))
+        self.rsa = rsa
+        self.blockSize = blockSize
+        self.numBlocks = numBlocks
+        self.callback = callback
+        self.wavFile = wavFile
+        self.buffered = buffered
+        # Poll a few times per block so partial reads stay small
+        self.pollSec = blockSize / AUDIO_SAMPLE_RATE / 4 if pollSec is None else pollSec
+        self.underrunSec = underrunSec
+
+        # One extra slot receives blocks that are discarded on overrun
+        self.ring = np.zeros((numBlocks + 1, blockSize), dtype=np.int16)
+        self.lengths = np.zeros(numBlocks + 1, dtype=np.int32)
+        self.slotAddrs = [self.ring[i].ctypes.data for i in range(numBlocks + 1)]
+        self.slotPtrs = [cast(c_void_p(a), POINTER(c_int16)) for a in self.slotAddrs]
+
+        self.cond = Condition()
+        self.writeSeq = 0
+        # Read position and whether a block is held, per consumer
+        self.readSeqs = {}
+        self.holding = {}
+        self.overruns = 0
+        self.underruns = 0
+        self.samplesRead = 0
+        self.error = None
+        self.running = False
+        self.thread = None
+        self.wavThread = None
+        self.wavBytes = 0
+
+    def start(self):
+        self.writeSeq = self.overruns = self.underruns = self.samplesRead = 0
+        self.error = None
+        self.readSeqs = {}
+        self.holding = {}
+        if self.buffered:
+            self._add_consumer('client')
+        if self.wavFile is not None:
+            self._add_consumer('wav')
+            wav = wave.open(self.wavFile, 'wb')
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(AUDIO_SAMPLE_RATE)
+            self.wavThread = Thread(target=self._writer, args=(wav,), name='AudioWriter',
+                                    daemon=True)
+        err_check(self.rsa.AUDIO_Start())
+        self.running = True
+        self.thread = Thread(target=self._reader, name='AudioReader', daemon=True)
+        self.thread.start()
+        if self.wavThread is not None:
+            self.wavThread.start()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        err_check(self.rsa.AUDIO_Stop())
+        # The writer finishes the blocks it has not written yet
+        if self.wavThread is not None:
+            self.wavThread.join()
+            self.wavThread = None
+        # Errors of the reader (including the callback) and of the writer
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _add_consumer(self, name):
+        self.readSeqs[name] = self.writeSeq
+        self.holding[name] = False
+
+    def _reader(self):
+        getData = self.rsa.AUDIO_GetData
+        outSize = c_uint16(0)
+        outRef = byref(outSize)
+        discardSlot = self.numBlocks
+        fill = 0
+        start = perf_counter()
+        # Samples lost to gaps so far, and whether one is in progress
+        lost = 0
+        inGap = False
+        try:
+            while True:
+                if fill == 0:
+                    with self.cond:
+                        if not self.running:
+                            break
+                        full = bool(self.readSeqs) and (
+                            self.writeSeq - min(self.readSeqs.values()) >= self.numBlocks)
+                    slot = discardSlot if full else self.writeSeq % self.numBlocks
+                    ptr = self.slotPtrs[slot]
+                else:
+                    ptr = cast(c_void_p(self.slotAddrs[slot] + 2 * fill), POINTER(c_int16))
+                err_check(getData(ptr, c_uint16(self.blockSize - fill), outRef))
+                count = outSize.value
+                fill += count
+                self.samplesRead += count
+                if count:
+                    inGap = False
+                if fill == self.blockSize or (fill and not self.running):
+                    self._publish(slot, fill, full)
+                    fill = 0
+                elif count == 0:
+                    if not self.running:
+                        break
+                    behind = ((perf_counter() - start) * AUDIO_SAMPLE_RATE - lost
+                              - self.samplesRead)
+                    if behind > self.underrunSec * AUDIO_SAMPLE_RATE:
+                        # Count each gap once, then measure from its end
+                        self.underruns += not inGap
+                        inGap = True
+                        lost += behind
+                    sleep(self.pollSec)
+        except Exception as e:
+            with self.cond:
+                self.error = e
+        finally:
+            with self.cond:
+                self.running = False
+                self.cond.notify_all()
+
+    def _publish(self, slot, length, full):
+        self.lengths[slot] = length
+        if self.callback is not None:
+            self.callback(self.ring[slot, :length])
+        with self.cond:
+            if full:
+                self.overruns += 1
+            else:
+                self.writeSeq += 1
+                self.cond.notify_all()
+
+    def _get(self, name, timeout):
+        # Next block for consumer name, releasing the one it held
+        with self.cond:
+            if self.holding[name]:
+                self.readSeqs[name] += 1
+                self.holding[name] = False
+                self.cond.notify_all()
+            if not self.cond.wait_for(
+                    lambda: self.writeSeq > self.readSeqs[name] or not self.running, timeout):
+                return None
+            seq = self.readSeqs[name]
+            if self.writeSeq == seq:
+                if self.error is not None:
+                    raise self.error
+                return None
+            self.holding[name] = True
+        slot = seq % self.numBlocks
+        return AudioBlock(self.ring[slot, :self.lengths[slot]], seq)
+
+    def _writer(self, wav):
+        try:
+            while True:
+                block = self._get('wav', None)
+                if block is None:
+                    break
+                wav.writeframesraw(block.data)
+                self.wavBytes += block.data.nbytes
+        except Exception as e:
+            with self.cond:
+                if self.error is None:
+                    self.error = e
+        finally:
+            with self.cond:
+                del self.readSeqs['wav']
+                self.cond.notify_all()
+            wav.close()
+
+    def get(self, timeout=None):
+        # Returns the next AudioBlock, or None on timeout or once the stream
+        # has stopped and every buffered block has been consumed.
+        # Requesting a block releases the previous one back to the reader.
+        if not self.buffered:
+            raise RSAError('AudioStream was created with buffered=False')
+        return self._get('client', timeout)
+
+    def __iter__(self):
+        while True:
+            block = self.get()
+            if block is None:
+                return
+            yield block
+
+    def backlog(self):
+        with self.cond:
+            return self.writeSeq - self.readSeqs.get('client', self.writeSeq)
@@ -0,0 +1,225 @@
+"""
+Tektronix RSA_API Acquisition Benchmark
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit or any OS that runs NumPy
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Measures spectrum traces/s, IQ samples/s, DPX frames/s and per-call overhead
+of the ctypes helpers in rsa_api_full_example.py and of the Cython module in
+"Cython Version". By default the ctypes helpers run against the simulated
+device in rsa_api_sim.py, so the numbers reflect the Python conversion layer
+rather than the USB link. The Cython module links against RSA_API.dll and is
+only benchmarked where it has been built and an analyzer is connected.
+
+usage: python rsa_api_benchmark.py [--duration 2] [--hardware]
+                                   [--save results.json]
+                                   [--compare baseline.json --tolerance 0.1]
+"""
+
+from ctypes import *
+from os import environ, path
+from time import perf_counter
+import argparse
+import json
+import sys
+import numpy as np
+
+
+"""################TIMING################"""
+def time_call(func, duration, itemsPerCall=1):
+    # Call func repeatedly for at least duration seconds.
+    # Returns (items/s, seconds per call)
+    func()
+    count = 0
+    start = perf_counter()
+    elapsed = 0
+    while elapsed < duration:
+        func()
+        count += 1
+        elapsed = perf_counter() - start
+    return count * itemsPerCall / elapsed, elapsed / count
+
+
+def report(results, binding, name, unit, rate, perCall):
+    results['{}: {}'.format(binding, name)] = rate
+    print('{:8} {:34} {:>14.1f} {:10} {:>10.1f} us/call'.format(
+        binding, name, rate, unit, perCall * 1e6))
+
+
+"""################CTYPES################"""
+def bench_ctypes(results, duration, hardware=False):
+    if not hardware:
+        environ['RSA_API_SIM'] = '1'
+    import rsa_api_full_example as ex
+    from rsa_api_dpx import DPXReader
+    from rsa_api_iqblock import IQBlockReader
+    from rsa_api_peaks import find_peaks
+    from rsa_api_spectrogram import Spectrogram
+    from rsa_api_spectrum import SpectrumReader
+    from rsa_api_sweep import SpectrumSweep
+    rsa = ex.rsa
+
+    ex.search_connect()
+    print()
+    centerFreq = c_double(0)
+    report(results, 'ctypes', 'call overhead', 'calls/s',
+           *time_call(lambda: rsa.CONFIG_GetCenterFreq(byref(centerFreq)), duration))
+
+    specSet = ex.config_spectrum(cf=1e9, refLevel=0, span=40e6, rbw=300e3)
+    report(results, 'ctypes', 'spectrum', 'traces/s',
+           *time_call(lambda: ex.acquire_spectrum(specSet), duration))
+    reader = SpectrumReader(rsa)
+    rsa.DEVICE_Run()
+    report(results, 'ctypes', 'spectrum continuous', 'traces/s',
+           *time_call(reader.acquire, duration))
+    rsa.DEVICE_Stop()
+
+    for recordLength in (1000, 100000, 1000000):
+        ex.config_block_iq(cf=1e9, refLevel=0, iqBw=40e6, recordLength=recordLength)
+        report(results, 'ctypes', 'block IQ ({} samples)'.format(recordLength),
+               'samples/s', *time_call(lambda: ex.acquire_block_iq(recordLength),
+                                       duration, recordLength))
+
+    for recordLength in (1000, 100000, 1000000):
+        ex.config_block_iq(cf=1e9, refLevel=0, iqBw=40e6, recordLength=recordLength)
+        reader = IQBlockReader(rsa, recordLength)
+        rsa.DEVICE_Run()
+        report(results, 'ctypes', 'block IQ pool ({} samples)'.format(recordLength),
+               'samples/s', *time_call(reader.acquire, duration, recordLength))
+        iq = reader.acquire()
+        rsa.DEVICE_Stop()
+
+    sampleRate = c_double(0)
+    rsa.IQBLK_GetIQSampleRate(byref(sampleRate))
+    with Spectrogram(1024, sampleRate.value, overlap=0.5, numLines=2048) as sg:
+        report(results, 'ctypes', 'spectrogram (1024 points)', 'samples/s',
+               *time_call(lambda: sg.process(iq), duration, len(iq)))
+        lines = sg.lines()
+        report(results, 'ctypes', 'peak search (1024 points)', 'traces/s',
+               *time_call(lambda: find_peaks(lines, sg.freq, threshold=-80, minSeparation=1e6),
+                          duration, len(lines)))
+
+    sweep = SpectrumSweep(rsa, 9e3, 6.2e9, rbw=300e3)
+    rsa.DEVICE_Run()
+    report(results, 'ctypes', 'sweep 9 kHz-6.2 GHz', 'sweeps/s',
+           *time_call(sweep.sweep, duration))
+    rsa.DEVICE_Stop()
+
+    ex.config_DPX(cf=1e9, refLevel=0, span=40e6, rbw=300e3)
+
+    def dpx_frame():
+        frame = ex.acquire_dpx_frame()
+        ex.extract_dpx_spectrum(frame)
+        ex.extract_dpxogram(frame)
+    report(results, 'ctypes', 'DPX frame + extraction', 'frames/s',
+           *time_call(dpx_frame, duration))
+    reader = DPXReader(rsa)
+    rsa.DEVICE_Run()
+    report(results, 'ctypes', 'DPX frame pool', 'frames/s',
+           *time_call(reader.acquire, duration))
+    rsa.DEVICE_Stop()
+    rsa.DEVICE_Disconnect()
+
+
+"""################CYTHON################"""
+def bench_cython(results, duration):
+    sys.path.insert(0, path.join(path.dirname(path.abspath(__file__)), 'Cython Version'))
+    try:
+        import rsa_api
+    except ImportError as e:
+        print('cython   skipped, module not built or RSA_API.dll not found ({})'.format(e))
+        return
+    try:
+        numFound, deviceIDs, _, _ = rsa_api.DEVICE_Search_py()
+    except rsa_api.RSAError as e:
+        print('cython   skipped, device search failed ({})'.format(e))
+        return
+    if numFound < 1:
+        print('cython   skipped, no analyzer connected')
+        return
+    rsa_api.DEVICE_Connect_py(deviceIDs[0])
+    rsa_api.CONFIG_Preset_py()
+
+    report(results, 'cython', 'call overhead', 'calls/s',
+           *time_call(rsa_api.CONFIG_GetCenterFreq_py, duration))
+
+    rsa_api.SPECTRUM_SetEnable_py(True)
+    rsa_api.CONFIG_SetCenterFreq_py(1e9)
+    rsa_api.SPECTRUM_SetSettings_py(span=40e6, rbw=300e3, traceLength=801)
+    report(results, 'cython', 'spectrum', 'traces/s',
+           *time_call(lambda: rsa_api.SPECTRUM_Acquire_py(tracePoints=801), duration))
+    traces = rsa_api.SPECTRUM_AcquireContinuous_py(tracePoints=801)
+    report(results, 'cython', 'spectrum continuous', 'traces/s',
+           *time_call(lambda: next(traces), duration))
+    traces.close()
+    rsa_api.SPECTRUM_SetEnable_py(False)
+
+    for recordLength in (1000, 100000, 1000000):
+        rsa_api.IQBLK_SetIQBandwidth_py(40e6)
+        rsa_api.IQBLK_SetIQRecordLength_py(recordLength)
+        report(results, 'cython', 'block IQ ({} samples)'.format(recordLength),
+               'samples/s', *time_call(lambda: rsa_api.IQBLK_Acquire_py(
+                   recordLength=recordLength), duration, recordLength))
+        iqData = np.empty(recordLength, dtype=np.complex64)
+        report(results, 'cython', 'block IQ pool ({} samples)'.format(recordLength),
+               'samples/s', *time_call(lambda: rsa_api.IQBLK_Acquire_py(
+                   rsa_api.IQBLK_GetIQDataCplx_py, recordLength, iqData=iqData),
+                   duration, recordLength))
+
+    rsa_api.DPX_SetEnable_py(True)
+    rsa_api.DPX_SetParameters_py(fspan=40e6, rbw=300e3)
+    rsa_api.DPX_SetSogramParameters_py()
+    report(results, 'cython', 'DPX frame + extraction', 'frames/s',
+           *time_call(rsa_api.DPX_AcquireFB_py, duration))
+    rsa_api.DEVICE_Stop_py()
+    rsa_api.DEVICE_Disconnect_py()
+
+
+"""################REGRESSION CHECK################"""
+def compare(results, baselineFile, tolerance):
+    with open(baselineFile) as f:
+        baseline = json.load(f)
+    regressions = 0
+    for name, rate in sorted(results.items()):
+        if name not in baseline:
+            continue
+        change = rate / baseline[name] - 1
+        flag = ''
+        if change < -tolerance:
+            flag = '  REGRESSION'
+            regressions += 1
+        print('{:44} {:>+7.1%}{}'.format(name, change, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RSA_API acquisition benchmark')
+    parser.add_argument('--duration', type=float, default=2,
+                        help='seconds spent on each measurement')
+    parser.add_argument('--hardware', action='store_true',
+                        help='run the ctypes helpers against RSA_API.dll')
+    parser.add_argument('--save', help='write results to a JSON file')
+    parser.add_argument('--compare', help='JSON file from a previous --save')
+    parser.add_argument('--tolerance', type=float, default=0.1,
+                        help='allowed fractional slowdown against --compare')
+    args = parser.parse_args()
+
+    results = {}
+    bench_ctypes(results, args.duration, args.hardware)
+    bench_cython(results, args.duration)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    if args.compare:
+        print()
+        if compare(results, args.compare, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
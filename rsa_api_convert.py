@@ -0,0 +1,126 @@
+"""
+Tektronix RSA_API IQ Stream File Converter
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Batch conversion of recorded IQ stream files (.siq or .siqh/.siqd, any
+number format) to scaled complex64 IQ, optionally frequency shifted and
+decimated. The recording is split into chunks that are converted in
+parallel by a process pool. Each worker reads its chunk (plus the filter
+overlap on either side) from the memory-mapped input and writes straight
+into its slice of the memory-mapped output, so the result is identical to
+converting the whole file in one pass:
+
+    if __name__ == '__main__':
+        convert_siq('C:\\SignalVu-PC Files\\overnight.siq',
+                    'C:\\SignalVu-PC Files\\overnight_dec8.siq',
+                    decimation=8, tuneFreq=2e6)
+
+The output is a SIQ file in IQ-Single format, i.e. complex64 samples, that
+SIQFile reads and np.memmap can map directly. The __main__ guard is needed
+because worker processes re-import the calling script on Windows.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from rsa_api_r3f import lowpass_taps
+from rsa_api_siq import SIQFile, SIQWriter
+
+
+def decimation_taps(decimation, numTaps=None, passband=0.8):
+    # Lowpass for decimation, passing passband of the output sample rate.
+    # numTaps is odd, so the filter delay is a whole number of samples.
+    if numTaps is None:
+        numTaps = 16 * decimation + 1
+    numTaps |= 1
+    return lowpass_taps(numTaps, passband / 2 / decimation)
+
+
+def _shift(x, first, freq):
+    # Multiplies x in place by exp(-2j pi freq n) for absolute sample
+    # indices n from first, so the phase is continuous across chunks
+    n = np.arange(first, first + len(x), dtype=np.float64)
+    x *= np.exp(-2j * np.pi * ((freq * n) % 1.0)).astype(np.complex64)
+
+
+def _convert_chunk(job):
+    # Converts output samples [outStart, outStart + outCount) of a
+    # conversion and writes them into the output file
+    inFile, outFile, outOffset, outStart, outCount, decimation, taps, freq = job
+    numTaps = 1 if taps is None else len(taps)
+    half = (numTaps - 1) // 2
+    first = outStart * decimation - half
+    last = (outStart + outCount - 1) * decimation + half + 1
+    x = np.zeros(last - first, dtype=np.complex64)
+    with SIQFile(inFile) as siq:
+        lo, hi = max(first, 0), min(last, len(siq))
+        if hi > lo:
+            siq.read(lo, hi - lo, x[lo - first:hi - first])
+    if freq:
+        _shift(x, first, freq)
+
+    out = np.memmap(outFile, dtype=np.complex64, mode='r+', offset=outOffset + outStart * 8,
+                    shape=(outCount,))
+    if taps is None:
+        out[:] = x[::decimation]
+    else:
+        # Output sample m is centered on input sample m * decimation
+        tmp = np.empty(outCount, dtype=np.complex64)
+        out[:] = 0
+        stop = (outCount - 1) * decimation + 1
+        for j in range(numTaps):
+            begin = numTaps - 1 - j
+            np.multiply(x[begin:begin + stop:decimation], taps[j], out=tmp)
+            out += tmp
+    out.flush()
+    del out
+    return outCount
+
+
+def convert_siq(inFile, outFile, decimation=1, tuneFreq=0, numTaps=None, taps=None,
+                chunkSize=1 << 22, processes=None):
+    # Converts inFile to complex64 volts in outFile at sampleRate /
+    # decimation. tuneFreq is the offset from the center frequency that is
+    # moved to 0 Hz. Unless taps are given, decimation_taps() is used when
+    # decimating. chunkSize is in input samples per job, processes is the
+    # pool size (default: one per core, 1 converts in this process).
+    # Returns the number of output samples.
+    with SIQFile(inFile) as siq:
+        sampleRate = siq.sampleRate
+        numSamples = len(siq)
+        freq = tuneFreq / sampleRate
+        if taps is None and decimation > 1:
+            taps = decimation_taps(decimation, numTaps)
+        if taps is not None:
+            taps = np.asarray(taps, dtype=np.float32)
+            if len(taps) % 2 == 0:
+                raise ValueError('taps must have an odd length, not {}'.format(len(taps)))
+        bandwidth = siq.bandwidth
+        if decimation > 1:
+            bandwidth = min(bandwidth, 0.8 * sampleRate / decimation)
+        writer = SIQWriter(outFile, sampleRate / decimation,
+                           centerFreq=siq.centerFreq + tuneFreq, bandwidth=bandwidth,
+                           refLevel=siq.refLevel, numberFormat='IQ-Single',
+                           recordUtc=siq.recordUtc,
+                           triggerIndex=siq.triggerIndex // decimation,
+                           acqStatus=siq.acqStatus, hardware=siq.header.get('Hardware', ''))
+
+    outSamples = (numSamples + decimation - 1) // decimation
+    outOffset = writer.reserve(outSamples)
+    dataFile = writer.dataFile
+    writer.close()
+
+    # Chunks are aligned to the decimation so every output sample belongs
+    # to exactly one job
+    outChunk = max(chunkSize // decimation, 1)
+    jobs = [(inFile, dataFile, outOffset, start, min(outChunk, outSamples - start),
+             decimation, taps, freq) for start in range(0, outSamples, outChunk)]
+    if processes == 1 or len(jobs) <= 1:
+        return sum(map(_convert_chunk, jobs))
+    with ProcessPoolExecutor(processes) as pool:
+        return sum(pool.map(_convert_chunk, jobs))
@@ -0,0 +1,117 @@
+"""
+Tektronix RSA_API DPX Frame Extraction
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+DPX frame buffer extraction without Python lists. dpx_views() returns NumPy
+views straight over the frame buffer memory, which are only valid until
+DPX_FinishFrameBuffer. DPXReader copies each frame with one memmove per
+array into pooled arrays before finishing the frame buffer, and converts
+the spectrum traces to dBm in place:
+
+    reader = DPXReader(rsa)
+    rsa.DEVICE_Run()
+    frame = reader.acquire()
+    plt.imshow(frame.bitmap)
+"""
+
+from ctypes import *
+from collections import namedtuple
+import numpy as np
+from RSA_API import *
+
+
+DPXFrame = namedtuple('DPXFrame', ['bitmap', 'traces', 'sogram', 'timestamp',
+                                   'frameCount', 'fftCount', 'acqDataStatus'])
+
+
+def _view(ptr, shape, ctype):
+    # NumPy view over memory owned by the API
+    size = shape[0] * shape[1]
+    if not size or not ptr:
+        return np.ctypeslib.as_array((ctype * 1)())[:0].reshape((0, shape[1]))
+    return np.ctypeslib.as_array(cast(ptr, POINTER(ctype * size)).contents).reshape(shape)
+
+
+def dpx_views(fb):
+    # Zero-copy (bitmap, traces, sogram) views of a DPX_FrameBuffer. The
+    # views are only valid until DPX_FinishFrameBuffer is called and the
+    # traces are not converted to dBm. sogram only holds the valid
+    # spectrogram lines.
+    bitmap = _view(fb.spectrumBitmap, (fb.spectrumBitmapHeight, fb.spectrumBitmapWidth),
+                   c_float)
+    traces = [_view(fb.spectrumTraces[i], (1, fb.spectrumTraceLength), c_float)[0]
+              for i in range(fb.numSpectrumTraces)]
+    sogram = _view(fb.sogramBitmap, (fb.sogramBitmapNumValidLines, fb.sogramBitmapWidth),
+                   c_uint8)
+    return bitmap, traces, sogram
+
+
+def trace_to_dbm(data):
+    # 10 * log10(1000 * x) + 30 as in the examples, computed in place
+    np.log10(data, out=data)
+    data *= 10
+    data += 60
+    return data
+
+
+class DPXReader:
+    # Repeated DPX frame acquisitions into numBuffers pooled frames. A frame
+    # is overwritten numBuffers acquisitions after it was returned.
+    # The device must already be running with DPX configured.
+    def __init__(self, rsa, numBuffers=2, timeoutMsec=100):
+        self.rsa = rsa
+        self.numBuffers = numBuffers
+        self.timeout = c_int(timeoutMsec)
+        self.ready = c_bool(False)
+        self.frameAvailable = c_bool(False)
+        self.fb = DPX_FrameBuffer()
+        self.pool = None
+        self.index = 0
+
+    def _allocate(self, fb):
+        # Pool arrays are sized on the first frame and whenever the frame
+        # geometry changes
+        shapes = ((fb.spectrumBitmapHeight, fb.spectrumBitmapWidth),
+                  (fb.numSpectrumTraces, fb.spectrumTraceLength),
+                  (fb.sogramBitmapHeight, fb.sogramBitmapWidth))
+        if self.pool is None or self.shapes != shapes:
+            self.shapes = shapes
+            self.pool = [(np.empty(shapes[0], dtype=np.float32),
+                          np.empty(shapes[1], dtype=np.float32),
+                          np.empty(shapes[2], dtype=np.uint8))
+                         for i in range(self.numBuffers)]
+            self.index = 0
+
+    def acquire(self):
+        # Returns the next DPXFrame with traces in dBm
+        rsa = self.rsa
+        fb = self.fb
+        err_check(rsa.DPX_IsFrameBufferAvailable(byref(self.frameAvailable)))
+        while not self.frameAvailable.value:
+            err_check(rsa.DPX_WaitForDataReady(self.timeout, byref(self.ready)))
+            err_check(rsa.DPX_IsFrameBufferAvailable(byref(self.frameAvailable)))
+        err_check(rsa.DPX_GetFrameBuffer(byref(fb)))
+        try:
+            self._allocate(fb)
+            bitmap, traces, sogram = self.pool[self.index]
+            memmove(bitmap.ctypes.data, fb.spectrumBitmap, bitmap.nbytes)
+            traceBytes = traces.shape[1] * traces.itemsize
+            for i in range(traces.shape[0]):
+                memmove(traces.ctypes.data + i * traceBytes, fb.spectrumTraces[i], traceBytes)
+            numValidLines = fb.sogramBitmapNumValidLines
+            memmove(sogram.ctypes.data, fb.sogramBitmap, numValidLines * sogram.shape[1])
+        finally:
+            err_check(rsa.DPX_FinishFrameBuffer())
+        self.index = (self.index + 1) % self.numBuffers
+        return DPXFrame(bitmap, trace_to_dbm(traces), sogram[:numValidLines], fb.timestamp,
+                        fb.frameCount, fb.fftCount, fb.acqDataStatus)
+
+    def __iter__(self):
+        while True:
+            yield self.acquire()
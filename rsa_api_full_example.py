@@ -17,24 +17,37 @@ YOU WILL NEED TO REFERENCE THE API DOCUMENTATION
 """
 
 from ctypes import *
-from os import chdir
-from time import sleep
+from os import chdir, environ
+from time import perf_counter, sleep
+import asyncio
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 from RSA_API import *
-
-
-# C:\Tektronix\RSA_API\lib\x64 needs to be added to the
-# PATH system environment variable
-chdir("C:\\Tektronix\\RSA_API\\lib\\x64")
-rsa = cdll.LoadLibrary("RSA_API.dll")
+from rsa_api_async import AsyncRSA
+from rsa_api_dpx import DPXReader
+from rsa_api_iqblock import acquire_block_iq_into
+from rsa_api_iqstream import IQStreamClient, decode_status, iq_to_complex64
+from rsa_api_r3f import R3FFile
+from rsa_api_siq import SIQFile
+from rsa_api_sweep import SpectrumSweep
+from rsa_api_typed import bind, load_rsa
+
+
+# Set the RSA_API_SIM environment variable to run the examples against the
+# simulated device in rsa_api_sim.py instead of an analyzer
+if environ.get('RSA_API_SIM'):
+    from rsa_api_sim import SimRSA
+    rsa = bind(SimRSA())
+else:
+    # C:\Tektronix\RSA_API\lib\x64 needs to be added to the
+    # PATH system environment variable
+    chdir("C:\\Tektronix\\RSA_API\\lib\\x64")
+    # Typed bindings: every call is error checked
+    rsa = load_rsa("RSA_API.dll")
 
 
 """################CLASSES AND FUNCTIONS################"""
-def err_check(rs):
-    if ReturnStatus(rs) != ReturnStatus.noError:
-        raise RSAError(ReturnStatus(rs).name)
-
 def search_connect():
     numFound = c_int(0)
     intArray = c_int * DEVSRCH_MAX_NUM_DEVICES
@@ -61,7 +74,7 @@ def search_connect():
     else:
         # corner case
         print('2 or more instruments found. Enumerating instruments, please wait.')
-        for inst in deviceIDs:
+        for inst in deviceIDs[:numFound.value]:
             rsa.DEVICE_Connect(inst)
             rsa.DEVICE_GetSerialNumber(deviceSerial)
             rsa.DEVICE_GetNomenclature(deviceType)
@@ -70,6 +83,7 @@ def search_connect():
             print('Device serial number: {}'.format(deviceSerial.value))
             rsa.DEVICE_Disconnect()
         # note: the API can only currently access one at a time
+        # (rsa_api_pool.DevicePool runs one process per device to use them all)
         selection = 1024
         while (selection > numFound.value - 1) or (selection < 0):
             selection = int(input('Select device between 0 and {}\n> '.format(numFound.value - 1)))
@@ -114,7 +128,7 @@ def acquire_spectrum(specSet):
     rsa.SPECTRUM_AcquireTrace()
     while not ready.value:
         rsa.SPECTRUM_WaitForDataReady(c_int(100), byref(ready))
-    rsa.SPECTRUM_GetTrace(traceSelector, specSet.traceLength, byref(traceData),
+    rsa.SPECTRUM_GetTrace(traceSelector, specSet.traceLength, traceData,
                           byref(outTracePoints))
     rsa.DEVICE_Stop()
     return np.array(traceData)
@@ -169,22 +183,17 @@ def config_block_iq(cf=1e9, refLevel=0, iqBw=40e6, recordLength=10e3):
     return time
 
 
-def acquire_block_iq(recordLength=10e3):
+def acquire_block_iq(recordLength=10e3, out=None):
+    # The DLL writes directly into out, a complex64 array (or a pair of
+    # float32 I and Q arrays). Pass the same array on every call to avoid
+    # allocating, or use IQBlockReader from rsa_api_iqblock.py.
     recordLength = int(recordLength)
-    ready = c_bool(False)
-    iqArray = c_float * recordLength
-    iData = iqArray()
-    qData = iqArray()
-    outLength = 0
+    if out is None:
+        out = np.empty(recordLength, dtype=np.complex64)
     rsa.DEVICE_Run()
-    rsa.IQBLK_AcquireIQData()
-    while not ready.value:
-        rsa.IQBLK_WaitForIQDataReady(c_int(100), byref(ready))
-    rsa.IQBLK_GetIQDataDeinterleaved(byref(iData), byref(qData),
-                                     byref(c_int(outLength)), c_int(recordLength))
+    iq = acquire_block_iq_into(rsa, out, recordLength)
     rsa.DEVICE_Stop()
-
-    return np.array(iData) + 1j * np.array(qData)
+    return iq
 
 
 def block_iq_example():
@@ -243,56 +252,22 @@ def config_DPX(cf=1e9, refLevel=0, span=40e6, rbw=300e3):
 
 
 def acquire_dpx_frame():
-    frameAvailable = c_bool(False)
-    ready = c_bool(False)
-    fb = DPX_FrameBuffer()
-
+    # DPXReader copies the frame buffer before DPX_FinishFrameBuffer, after
+    # which the API may reuse its memory
     rsa.DEVICE_Run()
     rsa.DPX_Reset()
-
-    while not frameAvailable.value:
-        rsa.DPX_IsFrameBufferAvailable(byref(frameAvailable))
-        while not ready.value:
-            rsa.DPX_WaitForDataReady(c_int(100), byref(ready))
-    rsa.DPX_GetFrameBuffer(byref(fb))
-    rsa.DPX_FinishFrameBuffer()
+    frame = DPXReader(rsa, numBuffers=1).acquire()
     rsa.DEVICE_Stop()
-    return fb
-
+    return frame
 
-def extract_dpx_spectrum(fb):
-    # When converting a ctypes pointer to a numpy array, we need to
-    # explicitly specify its length to dereference it correctly
-    dpxBitmap = np.array(fb.spectrumBitmap[:fb.spectrumBitmapSize])
-    dpxBitmap = dpxBitmap.reshape((fb.spectrumBitmapHeight,
-                                   fb.spectrumBitmapWidth))
 
-    # Grab trace data and convert from W to dBm
-    # http://www.rapidtables.com/convert/power/Watt_to_dBm.htm
-    # Note: fb.spectrumTraces is a pointer to a pointer, so we need to
-    # go through an additional dereferencing step
-    traces = []
-    for i in range(3):
-        traces.append(10 * np.log10(1000 * np.array(
-            fb.spectrumTraces[i][:fb.spectrumTraceLength])) + 30)
-    # specTrace2 = 10 * np.log10(1000*np.array(
-    #     fb.spectrumTraces[1][:fb.spectrumTraceLength])) + 30
-    # specTrace3 = 10 * np.log10(1000*np.array(
-    #     fb.spectrumTraces[2][:fb.spectrumTraceLength])) + 30
+def extract_dpx_spectrum(frame):
+    # Bitmap and the (3, traceLength) traces in dBm
+    return frame.bitmap, frame.traces
 
-    # return dpxBitmap, specTrace1, specTrace2, specTrace3
-    return dpxBitmap, traces
 
-
-def extract_dpxogram(fb):
-    # When converting a ctypes pointer to a numpy array, we need to
-    # explicitly specify its length to dereference it correctly
-    dpxogram = np.array(fb.sogramBitmap[:fb.sogramBitmapSize])
-    dpxogram = dpxogram.reshape((fb.sogramBitmapHeight,
-                                 fb.sogramBitmapWidth))
-    dpxogram = dpxogram[:fb.sogramBitmapNumValidLines, :]
-
-    return dpxogram
+def extract_dpxogram(frame):
+    return frame.sogram
 
 
 def dpx_example():
@@ -304,10 +279,10 @@ def dpx_example():
     rbw = 100e3
 
     dpxFreq, dpxAmp = config_DPX(cf, refLevel, span, rbw)
-    fb = acquire_dpx_frame()
+    frame = acquire_dpx_frame()
 
-    dpxBitmap, traces = extract_dpx_spectrum(fb)
-    dpxogram = extract_dpxogram(fb)
+    dpxBitmap, traces = extract_dpx_spectrum(frame)
+    dpxogram = extract_dpxogram(frame)
     numTicks = 11
     plotFreq = np.linspace(cf - span / 2.0, cf + span / 2.0, numTicks) / 1e9
 
@@ -333,9 +308,9 @@ def dpx_example():
     ax2.set_xlabel('Frequency (GHz)')
     ax2.set_ylabel('Amplitude (dBm)')
     xTicks = map('{:.4}'.format, plotFreq)
-    plt.xticks(np.linspace(0, fb.spectrumBitmapWidth, numTicks), xTicks)
+    plt.xticks(np.linspace(0, dpxBitmap.shape[1], numTicks), xTicks)
     yTicks = map('{}'.format, np.linspace(refLevel, refLevel - 100, numTicks))
-    plt.yticks(np.linspace(0, fb.spectrumBitmapHeight, numTicks), yTicks)
+    plt.yticks(np.linspace(0, dpxBitmap.shape[0], numTicks), yTicks)
 
     # Show the colorized DPXogram
     ax3 = fig.add_subplot(133)
@@ -345,7 +320,7 @@ def dpx_example():
     ax3.set_xlabel('Frequency (GHz)')
     ax3.set_ylabel('Trace Lines')
     xTicks = map('{:.4}'.format, plotFreq)
-    plt.xticks(np.linspace(0, fb.sogramBitmapWidth, numTicks), xTicks)
+    plt.xticks(np.linspace(0, dpxogram.shape[1], numTicks), xTicks)
 
     plt.tight_layout()
     plt.show()
@@ -380,6 +355,14 @@ def if_stream_example():
         rsa.IFSTREAM_GetActiveStatus(byref(writing))
     print('Streaming finished.')
     rsa.DEVICE_Stop()
+
+    # Frames are decoded straight from the memory-mapped file
+    with R3FFile('C:\\SignalVu-PC Files\\if_stream_test.r3f') as r3f:
+        print('Read back {} frames, dropped frames: {}, status: {}'.format(
+            r3f.numFrames, len(r3f.dropped_frames()), r3f.status_summary()))
+        start, iq = next(r3f.iq_blocks())
+        print('IQ at {} MS/s, peak power: {:.2f} dBm'.format(
+            r3f.sampleRate / 2e6, 10 * np.log10(np.amax(np.abs(iq) ** 2) / 100) + 30))
     rsa.DEVICE_Disconnect()
 
 
@@ -406,21 +389,19 @@ def config_iq_stream(cf=1e9, refLevel=0, bw=10e6, fileDir='C:\\SignalVu-PC Files
 
 def iqstream_status_parser(iqStreamInfo):
     # This function parses the IQ streaming status variable
-    status = iqStreamInfo.acqStatus
-    if status == 0:
+    messages = {'overrange': 'Input overrange.',
+                'discontinuity': 'Data transfer discontinuity, data loss has occurred.',
+                'inputBuffer75': 'Input buffer > 75% full.',
+                'inputOverflow': ('Input buffer overflow. IQStream processing too slow, '
+                                  'data loss has occurred.'),
+                'outputBuffer75': 'Output buffer > 75% full.',
+                'outputOverflow': ('Output buffer overflow. File writing too slow, '
+                                   'data loss has occurred.')}
+    current, sticky = decode_status(iqStreamInfo.acqStatus)
+    if not sticky:
         print('\nNo error.\n')
-    if bool(status & 0x10000):  # mask bit 16
-        print('\nInput overrange.\n')
-    if bool(status & 0x40000):  # mask bit 18
-        print('\nInput buffer > 75{} full.\n'.format('%'))
-    if bool(status & 0x80000):  # mask bit 19
-        print('\nInput buffer overflow. IQStream processing too slow, ',
-              'data loss has occurred.\n')
-    if bool(status & 0x100000):  # mask bit 20
-        print('\nOutput buffer > 75{} full.\n'.format('%'))
-    if bool(status & 0x200000):  # mask bit 21
-        print('Output buffer overflow. File writing too slow, ',
-              'data loss has occurred.\n')
+    for kind in sticky:
+        print('\n{}\n'.format(messages[kind]))
 
 
 def iq_stream_example():
@@ -448,6 +429,112 @@ def iq_stream_example():
     rsa.IQSTREAM_GetFileInfo(byref(iqStreamInfo))
     iqstream_status_parser(iqStreamInfo)
     rsa.DEVICE_Stop()
+
+    # The data file is memory-mapped, only the samples read are loaded
+    with SIQFile('C:\\SignalVu-PC Files\\iq_stream_test.siqh') as siq:
+        iq = siq[:10000]
+        print('Read back {} of {} samples at {} MS/s, peak power: {:.2f} dBm'.format(
+            len(iq), len(siq), siq.sampleRate / 1e6,
+            10 * np.log10(np.amax(np.abs(iq) ** 2) / 100) + 30))
+    rsa.DEVICE_Disconnect()
+
+
+def iq_stream_client_example():
+    print('\n\n########IQ Stream Client Example########')
+    search_connect()
+
+    cf = 1e9
+    refLevel = 0
+    bw = 40e6
+    durationSec = 1
+
+    rsa.CONFIG_SetCenterFreq(c_double(cf))
+    rsa.CONFIG_SetReferenceLevel(c_double(refLevel))
+    stream = IQStreamClient(rsa, bandwidth=bw, dtype=IQSOUTDTYPE.IQSODT_INT16)
+    iq = np.empty(stream.blockSize, dtype=np.complex64)
+    numSamples = 0
+    peakPower = -np.inf
+    block = None
+
+    rsa.DEVICE_Run()
+    with stream:
+        for block in stream:
+            iqBlock = iq_to_complex64(block.data, block.scaleFactor, iq)
+            peakPower = max(peakPower, np.amax(iqBlock.real ** 2 + iqBlock.imag ** 2))
+            numSamples += len(iqBlock)
+            if numSamples >= durationSec * stream.sampleRate:
+                break
+    rsa.DEVICE_Stop()
+    print('Streamed {} samples at {} MS/s, {} blocks dropped.'.format(
+        numSamples, stream.sampleRate / 1e6, stream.overruns))
+    print('Peak power: {:.2f} dBm'.format(10 * np.log10(peakPower / 100) + 30))
+    if block is not None:
+        iqstream_status_parser(block)
+    rsa.DEVICE_Disconnect()
+
+
+"""################WIDEBAND SWEEP EXAMPLE################"""
+def sweep_example():
+    print('\n\n########Wideband Sweep Example########')
+    search_connect()
+    startFreq = 9e3
+    stopFreq = 6.2e9
+    refLevel = 0
+    rbw = 300e3
+
+    sweep = SpectrumSweep(rsa, startFreq, stopFreq, rbw=rbw, refLevel=refLevel)
+    rsa.DEVICE_Run()
+    start = perf_counter()
+    trace = sweep.sweep()
+    sweepTime = perf_counter() - start
+    rsa.DEVICE_Stop()
+    print('{} segments, {} points in {:.3f} s'.format(
+        len(sweep.segments), len(trace), sweepTime))
+
+    plt.figure(1, figsize=(10, 7))
+    ax = plt.subplot(111, facecolor='k')
+    ax.plot(sweep.freq, trace, color='y')
+    ax.set_title('Wideband Sweep')
+    ax.set_xlabel('Frequency (Hz)')
+    ax.set_ylabel('Amplitude (dBm)')
+    ax.set_xlim([sweep.freq[0], sweep.freq[-1]])
+    ax.set_ylim([refLevel - 100, refLevel])
+    plt.tight_layout()
+    plt.show()
+    rsa.DEVICE_Disconnect()
+
+
+"""################ASYNCIO EXAMPLE################"""
+def async_example():
+    print('\n\n########asyncio Example########')
+    search_connect()
+    config_spectrum(cf=2.4453e9, refLevel=0, span=40e6, rbw=300e3)
+    config_block_iq(cf=2.4453e9, refLevel=0, iqBw=40e6, recordLength=100e3)
+
+    async def monitor(dev):
+        # Acquisitions wait on the worker thread, so other tasks keep running
+        async for trace in dev.spectra(count=10):
+            print('Spectrum peak: {:.2f} dBm'.format(np.amax(trace)))
+        iq = await dev.iq_block()
+        print('IQ block: {} samples'.format(len(iq)))
+
+    async def heartbeat():
+        while True:
+            await asyncio.sleep(0.1)
+            print('event loop alive')
+
+    async def run():
+        beat = asyncio.ensure_future(heartbeat())
+        async with AsyncRSA(rsa) as dev:
+            await monitor(dev)
+        beat.cancel()
+
+    # asyncio.run needs Python 3.7; get_event_loop() is deprecated for this
+    # from 3.10
+    if sys.version_info >= (3, 7):
+        asyncio.run(run())
+    else:
+        asyncio.get_event_loop().run_until_complete(run())
     rsa.DEVICE_Disconnect()
 
 
@@ -474,6 +561,9 @@ def main():
     dpx_example()
     # if_stream_example()
     # iq_stream_example()
+    # iq_stream_client_example()
+    # sweep_example()
+    # async_example()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,257 @@
+"""
+Tektronix RSA_API Call Instrumentation
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Opt-in per-function call statistics for either binding. InstrumentedRSA
+wraps the ctypes library (typed or not), the simulated device or the
+Cython rsa_api module, and records for every API function the number of
+calls, total time, a latency histogram (for percentiles), bytes of data
+returned and the error status of failed calls. Sections of your own code
+are timed into the same table with timer():
+
+    rsa = InstrumentedRSA(load_rsa())
+    ...acquisition loop...
+    with rsa.timer('convert'):
+        iq = iq_to_complex64(block.data, block.scaleFactor)
+    print(rsa.stats.to_json())
+    open('rsa.prom', 'w').write(rsa.stats.to_prometheus())
+
+Latencies are counted in power-of-two nanosecond buckets, so recording a
+call is a few integer operations. disable() hands out the unwrapped
+functions again, leaving only the attribute lookup through the wrapper.
+"""
+
+from contextlib import contextmanager
+from ctypes import *
+import json
+from time import perf_counter
+import numpy as np
+from RSA_API import *
+from rsa_api_iqstream import IQSTREAM_DTYPES
+
+
+_NUM_BUCKETS = 64
+# Histogram bucket upper bounds exported to Prometheus, 1 us to 17 s
+_PROMETHEUS_BUCKETS = range(10, 35)
+
+
+def _out(arg):
+    # Value of an output argument passed as byref(x), pointer(x) or x
+    arg = getattr(arg, '_obj', arg)
+    if hasattr(arg, 'contents'):
+        arg = arg.contents
+    return getattr(arg, 'value', arg)
+
+
+def _dpx_bytes(args):
+    fb = getattr(args[0], '_obj', args[0])
+    if hasattr(fb, 'contents'):
+        fb = fb.contents
+    return (4 * fb.spectrumBitmapSize + 4 * fb.spectrumTraceLength * fb.numSpectrumTraces
+            + fb.sogramBitmapSize)
+
+
+# Bytes of data returned by a successful call, from its arguments
+BYTES_RETURNED = {
+    'IQBLK_GetIQData': lambda args: 8 * _out(args[1]),
+    'IQBLK_GetIQDataDeinterleaved': lambda args: 8 * _out(args[2]),
+    'IQBLK_GetIQDataCplx': lambda args: 8 * _out(args[1]),
+    'SPECTRUM_GetTrace': lambda args: 4 * _out(args[3]),
+    'DPX_GetFrameBuffer': _dpx_bytes,
+    'DPX_GetSogramHiResLine': lambda args: 2 * _out(args[1]),
+    'AUDIO_GetData': lambda args: 2 * _out(args[2]),
+}
+
+
+class CallStats:
+    # Counters for one function
+    __slots__ = ('count', 'totalNs', 'maxNs', 'bytes', 'errors', 'buckets')
+
+    def __init__(self):
+        self.count = 0
+        self.totalNs = 0
+        self.maxNs = 0
+        self.bytes = 0
+        self.errors = {}
+        # buckets[k] counts calls taking 2**(k-1) to 2**k - 1 ns
+        self.buckets = [0] * _NUM_BUCKETS
+
+    def record(self, ns):
+        self.count += 1
+        self.totalNs += ns
+        if ns > self.maxNs:
+            self.maxNs = ns
+        self.buckets[min(ns.bit_length(), _NUM_BUCKETS - 1)] += 1
+
+    def error(self, status):
+        self.errors[status] = self.errors.get(status, 0) + 1
+
+    def percentile(self, q):
+        # Latency in seconds below which a fraction q of the calls took,
+        # interpolated within the histogram bucket
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        total = 0
+        for k, n in enumerate(self.buckets):
+            if n and total + n >= target:
+                low = 2 ** (k - 1) if k else 0
+                high = min(2 ** k, self.maxNs + 1)
+                return (low + (high - low) * (target - total) / n) * 1e-9
+            total += n
+        return self.maxNs * 1e-9
+
+    def as_dict(self):
+        return {'count': self.count,
+                'totalSec': self.totalNs * 1e-9,
+                'meanSec': self.totalNs * 1e-9 / self.count if self.count else 0.0,
+                'p50Sec': self.percentile(0.5),
+                'p90Sec': self.percentile(0.9),
+                'p99Sec': self.percentile(0.99),
+                'maxSec': self.maxNs * 1e-9,
+                'bytes': self.bytes,
+                'errors': dict(self.errors)}
+
+
+class StatsTable:
+    # CallStats by function name
+    def __init__(self):
+        self.functions = {}
+
+    def get(self, name):
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = self.functions[name] = CallStats()
+        return stats
+
+    def reset(self):
+        # Zeroes the counters in place, so wrappers keep recording into them
+        for stats in self.functions.values():
+            stats.__init__()
+
+    def snapshot(self):
+        # {function name: statistics} of the functions called so far,
+        # most total time first
+        items = sorted(self.functions.items(), key=lambda item: -item[1].totalNs)
+        return {name: stats.as_dict() for name, stats in items if stats.count}
+
+    def to_json(self, indent=2):
+        return json.dumps(self.snapshot(), indent=indent)
+
+    def to_prometheus(self, prefix='rsa_api'):
+        # Prometheus text exposition format
+        lines = ['# HELP {}_call_seconds API call latency'.format(prefix),
+                 '# TYPE {}_call_seconds histogram'.format(prefix)]
+        counted = [(name, s) for name, s in sorted(self.functions.items()) if s.count]
+        for name, stats in counted:
+            cumulative = 0
+            upto = 0
+            for k in _PROMETHEUS_BUCKETS:
+                cumulative += sum(stats.buckets[upto:k + 1])
+                upto = k + 1
+                lines.append('{}_call_seconds_bucket{{function="{}",le="{:.9g}"}} {}'.format(
+                    prefix, name, 2 ** k * 1e-9, cumulative))
+            lines.append('{}_call_seconds_bucket{{function="{}",le="+Inf"}} {}'.format(
+                prefix, name, stats.count))
+            lines.append('{}_call_seconds_sum{{function="{}"}} {:.9g}'.format(
+                prefix, name, stats.totalNs * 1e-9))
+            lines.append('{}_call_seconds_count{{function="{}"}} {}'.format(
+                prefix, name, stats.count))
+        lines += ['# HELP {}_bytes_total Data bytes returned'.format(prefix),
+                  '# TYPE {}_bytes_total counter'.format(prefix)]
+        lines += ['{}_bytes_total{{function="{}"}} {}'.format(prefix, name, stats.bytes)
+                  for name, stats in counted if stats.bytes]
+        lines += ['# HELP {}_errors_total Failed calls by status'.format(prefix),
+                  '# TYPE {}_errors_total counter'.format(prefix)]
+        lines += ['{}_errors_total{{function="{}",status="{}"}} {}'.format(
+            prefix, name, status, n)
+            for name, stats in counted for status, n in sorted(stats.errors.items())]
+        return '\n'.join(lines) + '\n'
+
+
+class InstrumentedRSA:
+    # Wraps every callable of rsa. Calls that return a nonzero ReturnStatus
+    # or raise are counted as errors by status name; the return value or
+    # exception is passed on unchanged. Wrappers are cached per name.
+    def __init__(self, rsa, stats=None, enabled=True):
+        self.rsa = rsa
+        self.stats = stats if stats is not None else StatsTable()
+        self.enabled = enabled
+        # Bytes per IQ streaming sample, from IQSTREAM_SetOutputConfiguration
+        self.iqStreamSampleBytes = 4
+        self.cached = []
+
+    def enable(self):
+        self._clear()
+        self.enabled = True
+
+    def disable(self):
+        self._clear()
+        self.enabled = False
+
+    def _clear(self):
+        for name in self.cached:
+            delattr(self, name)
+        self.cached = []
+
+    def __getattr__(self, name):
+        func = getattr(self.rsa, name)
+        if not callable(func):
+            return func
+        call = self._wrap(name, func) if self.enabled else func
+        setattr(self, name, call)
+        self.cached.append(name)
+        return call
+
+    def _wrap(self, name, func):
+        stats = self.stats.get(name)
+        bytesReturned = BYTES_RETURNED.get(name)
+        # Cython wrappers (name_py) raise on errors and return their data
+        returnsStatus = not name.endswith('_py')
+        if name == 'IQSTREAM_GetIQData':
+            def bytesReturned(args):
+                return self.iqStreamSampleBytes * _out(args[1])
+
+        def call(*args):
+            start = perf_counter()
+            try:
+                rs = func(*args)
+            except Exception as e:
+                stats.record(int((perf_counter() - start) * 1e9))
+                stats.error(str(e) if isinstance(e, RSAError) else type(e).__name__)
+                raise
+            stats.record(int((perf_counter() - start) * 1e9))
+            if returnsStatus and isinstance(rs, int) and rs:
+                stats.error(STATUS_NAMES.get(rs, 'ReturnStatus {}'.format(rs)))
+            elif isinstance(rs, np.ndarray):
+                stats.bytes += rs.nbytes
+            elif bytesReturned is not None:
+                stats.bytes += bytesReturned(args)
+            return rs
+        if name == 'IQSTREAM_SetOutputConfiguration':
+            def configure(dest, dtype):
+                rs = call(dest, dtype)
+                dtype = IQSTREAM_DTYPES[getattr(dtype, 'value', dtype)]
+                self.iqStreamSampleBytes = 2 * np.dtype(dtype).itemsize
+                return rs
+            return configure
+        return call
+
+    @contextmanager
+    def timer(self, name):
+        # Times the with block into the table as name
+        if not self.enabled:
+            yield
+            return
+        stats = self.stats.get(name)
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            stats.record(int((perf_counter() - start) * 1e9))
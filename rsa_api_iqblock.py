@@ -0,0 +1,222 @@
+"""
+Tektronix RSA_API Block IQ Acquisition
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Block IQ acquisition into caller-owned NumPy arrays. The DLL writes straight
+into the array memory, so no ctypes arrays, Python lists or temporary copies
+are created per acquisition. A complex64 array has the same memory layout as
+an array of Cplx32 structs, so IQBLK_GetIQDataCplx fills it directly; split
+float32 I and Q arrays are filled with IQBLK_GetIQDataDeinterleaved.
+
+    reader = IQBlockReader(rsa, recordLength=1000000, numBuffers=4)
+    rsa.DEVICE_Run()
+    iq = reader.acquire()
+
+SegmentedCapture collects a burst of triggered records into one
+preallocated (numRecords, recordLength) complex64 array, with the
+IQBLK_ACQINFO of every record in a matching structured array:
+
+    config_trigger(trigMode=TriggerMode.triggered, trigLevel=-30)
+    data, acqInfo = capture_segments(rsa, numRecords=1000)
+    print(acqInfo['sample0Timestamp'], acqInfo['triggerSampleIndex'])
+"""
+
+from ctypes import *
+from time import perf_counter
+import numpy as np
+from RSA_API import *
+
+
+def _check_buffer(buf, dtype, length):
+    if buf.dtype != dtype or not buf.flags['C_CONTIGUOUS'] or not buf.flags['WRITEABLE']:
+        raise ValueError('IQ buffers must be writeable, C-contiguous {} arrays'.format(
+            np.dtype(dtype).name))
+    if buf.size < length:
+        raise ValueError('IQ buffer holds {} samples, {} requested'.format(buf.size, length))
+
+
+def get_iq_data_into(rsa, out, reqLength=None):
+    # out is either a complex64 array or an (iData, qData) pair of float32
+    # arrays. Returns a view of out trimmed to the samples returned.
+    outLength = c_int(0)
+    if isinstance(out, tuple):
+        iData, qData = out
+        reqLength = iData.size if reqLength is None else reqLength
+        _check_buffer(iData, np.float32, reqLength)
+        _check_buffer(qData, np.float32, reqLength)
+        err_check(rsa.IQBLK_GetIQDataDeinterleaved(
+            iData.ctypes.data_as(POINTER(c_float)), qData.ctypes.data_as(POINTER(c_float)),
+            byref(outLength), c_int(reqLength)))
+        return iData[:outLength.value], qData[:outLength.value]
+    reqLength = out.size if reqLength is None else reqLength
+    _check_buffer(out, np.complex64, reqLength)
+    err_check(rsa.IQBLK_GetIQDataCplx(out.ctypes.data_as(POINTER(Cplx32)),
+                                      byref(outLength), c_int(reqLength)))
+    return out[:outLength.value]
+
+
+def acquire_block_iq_into(rsa, out, reqLength=None, timeoutMsec=100):
+    # Acquires one IQ block into out. The device must already be running.
+    ready = c_bool(False)
+    err_check(rsa.IQBLK_AcquireIQData())
+    while not ready.value:
+        err_check(rsa.IQBLK_WaitForIQDataReady(c_int(timeoutMsec), byref(ready)))
+    return get_iq_data_into(rsa, out, reqLength)
+
+
+class IQBufferPool:
+    # A fixed set of preallocated IQ buffers handed out in rotation.
+    # A buffer is reused numBuffers acquisitions after it was handed out, so
+    # consumers must be done with it (or copy it) by then.
+    def __init__(self, recordLength, numBuffers=4, split=False):
+        self.recordLength = int(recordLength)
+        self.numBuffers = numBuffers
+        self.split = split
+        if split:
+            self.data = np.empty((numBuffers, 2, self.recordLength), dtype=np.float32)
+            self.buffers = [(d[0], d[1]) for d in self.data]
+        else:
+            self.data = np.empty((numBuffers, self.recordLength), dtype=np.complex64)
+            self.buffers = list(self.data)
+        self.index = 0
+
+    def __len__(self):
+        return self.numBuffers
+
+    def next(self):
+        buf = self.buffers[self.index]
+        self.index = (self.index + 1) % self.numBuffers
+        return buf
+
+
+class IQBlockReader:
+    # Repeated block IQ acquisitions into an IQBufferPool. The ctypes
+    # arguments for every buffer are built once, so an acquisition makes no
+    # Python-side allocations besides the returned array view.
+    def __init__(self, rsa, recordLength, numBuffers=4, split=False, timeoutMsec=100,
+                 pool=None):
+        self.rsa = rsa
+        self.pool = pool if pool is not None else IQBufferPool(recordLength, numBuffers, split)
+        self.recordLength = self.pool.recordLength
+        self.timeout = c_int(timeoutMsec)
+        self.ready = c_bool(False)
+        self.outLength = c_int(0)
+        self.reqLength = c_int(self.recordLength)
+        if self.pool.split:
+            self.args = [(i.ctypes.data_as(POINTER(c_float)), q.ctypes.data_as(POINTER(c_float)))
+                         for i, q in self.pool.buffers]
+        else:
+            self.args = [(b.ctypes.data_as(POINTER(Cplx32)),) for b in self.pool.buffers]
+
+    def acquire(self):
+        # Returns the next pool buffer filled with a new IQ block.
+        # The device must already be running.
+        rsa = self.rsa
+        index = self.pool.index
+        buf = self.pool.next()
+        self.ready.value = False
+        err_check(rsa.IQBLK_AcquireIQData())
+        while not self.ready.value:
+            err_check(rsa.IQBLK_WaitForIQDataReady(self.timeout, byref(self.ready)))
+        if self.pool.split:
+            iPtr, qPtr = self.args[index]
+            err_check(rsa.IQBLK_GetIQDataDeinterleaved(iPtr, qPtr, byref(self.outLength),
+                                                       self.reqLength))
+            return buf[0][:self.outLength.value], buf[1][:self.outLength.value]
+        err_check(rsa.IQBLK_GetIQDataCplx(self.args[index][0], byref(self.outLength),
+                                          self.reqLength))
+        return buf[:self.outLength.value]
+
+    def __iter__(self):
+        while True:
+            yield self.acquire()
+
+
+"""################SEGMENTED CAPTURE################"""
+# IQBLK_ACQINFO as a NumPy structured dtype with the same layout
+ACQINFO_DTYPE = np.dtype(IQBLK_ACQINFO)
+
+
+class SegmentedCapture:
+    # Repeated triggered acquisitions into row k of data, with the record's
+    # IQBLK_ACQINFO written by the DLL straight into acqInfo[k]. The next
+    # record is armed as soon as a record and its info are retrieved, so
+    # the device acquires while onRecord(k) runs for the previous one.
+    # Trigger and IQ block must already be configured and the device
+    # running.
+    def __init__(self, rsa, numRecords, recordLength=None, timeoutMsec=100):
+        self.rsa = rsa
+        if recordLength is None:
+            length = c_int(0)
+            err_check(rsa.IQBLK_GetIQRecordLength(byref(length)))
+            recordLength = length.value
+        self.recordLength = int(recordLength)
+        self.data = np.empty((numRecords, self.recordLength), dtype=np.complex64)
+        self.acqInfo = np.zeros(numRecords, dtype=ACQINFO_DTYPE)
+        self.dataPtrs = [d.ctypes.data_as(POINTER(Cplx32)) for d in self.data]
+        base = self.acqInfo.ctypes.data
+        self.infoPtrs = [cast(c_void_p(base + k * ACQINFO_DTYPE.itemsize),
+                              POINTER(IQBLK_ACQINFO)) for k in range(numRecords)]
+        self.timeout = c_int(timeoutMsec)
+        self.ready = c_bool(False)
+        self.outLength = c_int(0)
+        self.reqLength = c_int(self.recordLength)
+        self.count = 0
+
+    def __len__(self):
+        return len(self.data)
+
+    def capture(self, numRecords=None, timeoutSec=None, onRecord=None):
+        # Fills records 0..numRecords-1 (default all). Stops early if
+        # timeoutSec passes, leaving the last record disarmed. Returns the
+        # number of records captured; they are data[:count] and
+        # acqInfo[:count].
+        numRecords = len(self.data) if numRecords is None else min(numRecords, len(self.data))
+        acquire = self.rsa.IQBLK_AcquireIQData
+        wait = self.rsa.IQBLK_WaitForIQDataReady
+        getData = self.rsa.IQBLK_GetIQDataCplx
+        getInfo = self.rsa.IQBLK_GetIQAcqInfo
+        ready = self.ready
+        readyRef = byref(ready)
+        outRef = byref(self.outLength)
+        deadline = None if timeoutSec is None else perf_counter() + timeoutSec
+        self.count = 0
+        if not numRecords:
+            return 0
+        err_check(acquire())
+        for k in range(numRecords):
+            ready.value = False
+            while not ready.value:
+                err_check(wait(self.timeout, readyRef))
+                if deadline is not None and not ready.value and perf_counter() > deadline:
+                    return self.count
+            err_check(getData(self.dataPtrs[k], outRef, self.reqLength))
+            err_check(getInfo(self.infoPtrs[k]))
+            if k + 1 < numRecords:
+                err_check(acquire())
+            self.count = k + 1
+            if onRecord is not None:
+                onRecord(k)
+        return self.count
+
+    def valid(self):
+        # Mask of the captured records whose acqStatus reports no errors
+        return self.acqInfo['acqStatus'][:self.count] == 0
+
+
+def capture_segments(rsa, numRecords, recordLength=None, timeoutMsec=100, timeoutSec=None):
+    # Starts the device, captures numRecords triggered records and stops
+    # it. Returns (data, acqInfo) trimmed to the records captured.
+    seg = SegmentedCapture(rsa, numRecords, recordLength, timeoutMsec)
+    err_check(rsa.DEVICE_Run())
+    try:
+        count = seg.capture(timeoutSec=timeoutSec)
+    finally:
+        err_check(rsa.DEVICE_Stop())
+    return seg.data[:count], seg.acqInfo[:count]
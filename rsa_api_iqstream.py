@@ -0,0 +1,387 @@
+"""
+Tektronix RSA_API Client IQ Streaming
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+IQ streaming to the client (IQSOD_CLIENT) instead of to disk. A reader
+thread drains IQSTREAM_GetIQData straight into a preallocated ring of
+int16/int32/float32 blocks while the consumer iterates over them:
+
+    stream = IQStreamClient(rsa, bandwidth=40e6, dtype=IQSOUTDTYPE.IQSODT_INT16)
+    rsa.DEVICE_Run()
+    with stream:
+        for block in stream:
+            iq = iq_to_complex64(block.data, block.scaleFactor)
+
+Each block's data is a view into the ring and stays valid until the next
+block is requested. If the consumer falls a whole ring behind, the reader
+keeps draining the device and discards blocks, counting them in overruns.
+
+IQStreamMonitor decodes the acquisition status while streaming instead of
+after the capture, counting overrange, discontinuity and buffer events as
+they happen. Given to IQStreamClient it sees every block's status; for
+disk streaming it polls IQSTREAM_GetDiskFileInfo from its own thread:
+
+    monitor = IQStreamMonitor(callback=print, adaptive=True)
+    stream = IQStreamClient(rsa, bandwidth=40e6, monitor=monitor)
+"""
+
+from ctypes import *
+from collections import namedtuple
+from threading import Condition, Event, Lock, Thread
+from time import perf_counter, sleep
+import numpy as np
+from RSA_API import *
+
+
+IQStreamEvent = namedtuple('IQStreamEvent', ['kind', 'sticky', 'timestamp', 'time'])
+
+IQStreamBlock = namedtuple('IQStreamBlock', ['data', 'timestamp', 'triggerIndices',
+                                             'scaleFactor', 'acqStatus', 'sequence'])
+
+IQSTREAM_DTYPES = {IQSOUTDTYPE.IQSODT_SINGLE.value: np.float32,
+                   IQSOUTDTYPE.IQSODT_INT32.value: np.int32,
+                   IQSOUTDTYPE.IQSODT_INT16.value: np.int16}
+
+
+def iq_to_complex64(data, scaleFactor=1.0, out=None):
+    # Converts interleaved IQ (float32 or integer) to complex64 volts
+    numSamples = data.size // 2
+    if out is None:
+        out = np.empty(numSamples, dtype=np.complex64)
+    else:
+        out = out[:numSamples]
+    if data.dtype == np.float32:
+        out[:] = data.reshape(-1).view(np.complex64)
+        return out
+    floats = out.view(np.float32)
+    np.multiply(data.reshape(-1), np.float32(scaleFactor), out=floats, casting='unsafe')
+    return out
+
+
+class IQStreamClient:
+    # monitor is an optional IQStreamMonitor fed the status of every block
+    # as it is read. If the monitor is adaptive and reports sustained buffer
+    # pressure, get() reconfigures the stream between blocks.
+    def __init__(self, rsa, bandwidth=40e6, dtype=IQSOUTDTYPE.IQSODT_INT16,
+                 numBlocks=64, bufferSize=None, pollSec=0.001, monitor=None):
+        self.rsa = rsa
+        self.numBlocks = numBlocks
+        self.pollSec = pollSec
+        self.bufferSize = bufferSize
+        self.monitor = monitor
+        self.ring = None
+        self._configure(bandwidth, dtype)
+
+        self.cond = Condition()
+        self.writeSeq = 0
+        self.readSeq = 0
+        self.overruns = 0
+        self.samplesRead = 0
+        self.error = None
+        self.running = False
+        self.thread = None
+        self.current = None
+
+    def _configure(self, bandwidth, dtype):
+        rsa = self.rsa
+        self.dtypeCode = getattr(dtype, 'value', dtype)
+        self.dtype = IQSTREAM_DTYPES[self.dtypeCode]
+        err_check(rsa.IQSTREAM_SetAcqBandwidth(c_double(bandwidth)))
+        err_check(rsa.IQSTREAM_SetOutputConfiguration(IQSOUTDEST.IQSOD_CLIENT,
+                                                      c_int(self.dtypeCode)))
+        if self.bufferSize is not None:
+            err_check(rsa.IQSTREAM_SetIQDataBufferSize(c_int(self.bufferSize)))
+        blockSize = c_int(0)
+        err_check(rsa.IQSTREAM_GetIQDataBufferSize(byref(blockSize)))
+        # This must be called before IQSTREAM_Start()
+        bwActual = c_double(0)
+        sampleRate = c_double(0)
+        err_check(rsa.IQSTREAM_GetAcqParameters(byref(bwActual), byref(sampleRate)))
+        self.bandwidth = bwActual.value
+        self.requestedBandwidth = bandwidth
+        self.sampleRate = sampleRate.value
+        if (self.ring is not None and self.ring.dtype == self.dtype
+                and self.blockSize == blockSize.value):
+            return
+        self.blockSize = blockSize.value
+
+        # One extra slot receives blocks that are discarded on overrun
+        numBlocks = self.numBlocks
+        self.ring = np.empty((numBlocks + 1, 2 * self.blockSize), dtype=self.dtype)
+        self.lengths = np.zeros(numBlocks + 1, dtype=np.int32)
+        self.timestamps = np.zeros(numBlocks + 1, dtype=np.uint64)
+        self.scaleFactors = np.zeros(numBlocks + 1, dtype=np.float64)
+        self.acqStatus = np.zeros(numBlocks + 1, dtype=np.uint32)
+        self.triggerCounts = np.zeros(numBlocks + 1, dtype=np.int32)
+        self.triggerIndices = np.zeros((numBlocks + 1, IQSTRM_MAXTRIGGERS), dtype=np.int32)
+        self.slotPtrs = [c_void_p(self.ring[i].ctypes.data) for i in range(numBlocks + 1)]
+
+    def reconfigure(self, bandwidth=None, dtype=None):
+        # Restarts the stream with a new bandwidth and/or output type. Call
+        # it from the consuming thread; blocks already handed out become
+        # invalid and blocks still buffered are discarded.
+        running = self.running or self.thread is not None
+        if running:
+            self.stop()
+        self._configure(self.requestedBandwidth if bandwidth is None else bandwidth,
+                        self.dtypeCode if dtype is None else dtype)
+        if running:
+            self.start()
+
+    def start(self):
+        # The device must already be running
+        self.writeSeq = self.readSeq = self.overruns = self.samplesRead = 0
+        self.error = None
+        self.current = None
+        self.rsa.IQSTREAM_ClearAcqStatus()
+        err_check(self.rsa.IQSTREAM_Start())
+        self.running = True
+        self.thread = Thread(target=self._reader, name='IQStreamReader', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        err_check(self.rsa.IQSTREAM_Stop())
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _reader(self):
+        rsa = self.rsa
+        iqlen = c_int(0)
+        iqinfo = IQSTRMIQINFO()
+        discardSlot = self.numBlocks
+        try:
+            while self.running:
+                with self.cond:
+                    full = self.writeSeq - self.readSeq >= self.numBlocks
+                slot = discardSlot if full else self.writeSeq % self.numBlocks
+                err_check(rsa.IQSTREAM_GetIQData(self.slotPtrs[slot], byref(iqlen),
+                                                 byref(iqinfo)))
+                if iqlen.value == 0:
+                    sleep(self.pollSec)
+                    continue
+                self.lengths[slot] = iqlen.value
+                self.timestamps[slot] = iqinfo.timestamp
+                self.scaleFactors[slot] = iqinfo.scaleFactor
+                self.acqStatus[slot] = iqinfo.acqStatus
+                if self.monitor is not None:
+                    self.monitor.update(iqinfo.acqStatus, iqinfo.timestamp, full)
+                count = min(iqinfo.triggerCount, IQSTRM_MAXTRIGGERS)
+                self.triggerCounts[slot] = count
+                if count:
+                    self.triggerIndices[slot, :count] = np.ctypeslib.as_array(
+                        iqinfo.triggerIndices, (count,))
+                with self.cond:
+                    self.samplesRead += iqlen.value
+                    if full:
+                        self.overruns += 1
+                    else:
+                        self.writeSeq += 1
+                        self.cond.notify_all()
+        except Exception as e:
+            with self.cond:
+                self.error = e
+                self.running = False
+                self.cond.notify_all()
+
+    def get(self, timeout=None):
+        # Returns the next IQStreamBlock, or None on timeout or once the
+        # stream has stopped and every buffered block has been consumed.
+        # Requesting a block releases the previous one back to the reader.
+        monitor = self.monitor
+        if monitor is not None and monitor.adaptive and monitor.pressure():
+            monitor.adapt(self)
+        with self.cond:
+            if self.current is not None:
+                self.readSeq += 1
+                self.current = None
+            if not self.cond.wait_for(lambda: self.writeSeq > self.readSeq or not self.running,
+                                      timeout):
+                return None
+            if self.writeSeq == self.readSeq:
+                if self.error is not None:
+                    raise self.error
+                return None
+            seq = self.readSeq
+            self.current = seq
+        slot = seq % self.numBlocks
+        length = self.lengths[slot]
+        return IQStreamBlock(self.ring[slot, :2 * length], int(self.timestamps[slot]),
+                             self.triggerIndices[slot, :self.triggerCounts[slot]],
+                             float(self.scaleFactors[slot]), int(self.acqStatus[slot]), seq)
+
+    def __iter__(self):
+        while True:
+            block = self.get()
+            if block is None:
+                return
+            yield block
+
+    def backlog(self):
+        with self.cond:
+            return self.writeSeq - self.readSeq
+
+
+"""################STATUS MONITOR################"""
+# Event kind of each IQSTRM_STATUS bit
+IQSTREAM_STATUS_EVENTS = ((IQSTRM_STATUS_OVERRANGE, 'overrange'),
+                          (IQSTRM_STATUS_XFER_DISCONTINUITY, 'discontinuity'),
+                          (IQSTRM_STATUS_IBUFF75PCT, 'inputBuffer75'),
+                          (IQSTRM_STATUS_IBUFFOVFLOW, 'inputOverflow'),
+                          (IQSTRM_STATUS_OBUFF75PCT, 'outputBuffer75'),
+                          (IQSTRM_STATUS_OBUFFOVFLOW, 'outputOverflow'))
+# Buffer bits that count towards IQStreamMonitor.pressure()
+_PRESSURE_STATUS = (IQSTRM_STATUS_IBUFF75PCT | IQSTRM_STATUS_IBUFFOVFLOW
+                    | IQSTRM_STATUS_OBUFF75PCT | IQSTRM_STATUS_OBUFFOVFLOW)
+
+
+def decode_status(acqStatus):
+    # Returns (kinds set in the current block, kinds set since the status
+    # was last cleared) as tuples of event kinds
+    current = (acqStatus >> IQSTRM_STATUS_NONSTICKY_SHIFT) & 0xffff
+    sticky = (acqStatus >> IQSTRM_STATUS_STICKY_SHIFT) & 0xffff
+    return (tuple(kind for bit, kind in IQSTREAM_STATUS_EVENTS if current & bit),
+            tuple(kind for bit, kind in IQSTREAM_STATUS_EVENTS if sticky & bit))
+
+
+class IQStreamMonitor:
+    # Tracks IQ streaming status words. counts[kind] is the number of
+    # blocks (or polls) with the kind set in the current status, and
+    # 'clientOverrun' counts blocks IQStreamClient discarded. An
+    # IQStreamEvent is recorded in events, and passed to callback, when a
+    # kind starts in the current status or first appears in the sticky
+    # status. If adaptive, input or output buffer warnings or discarded
+    # blocks in persistBlocks consecutive blocks make IQStreamClient switch
+    # to int16 output and then halve its bandwidth, down to minBandwidth.
+    def __init__(self, callback=None, adaptive=False, persistBlocks=16, minBandwidth=5e3,
+                 maxEvents=1000):
+        self.callback = callback
+        self.adaptive = adaptive
+        self.persistBlocks = persistBlocks
+        self.minBandwidth = minBandwidth
+        self.maxEvents = maxEvents
+        self.thread = None
+        self.stopping = Event()
+        # Guards pressureStreak, which the watch() thread updates
+        self.lock = Lock()
+        self.reset()
+
+    def reset(self):
+        # Exception that ended the watch() thread, raised by the queries
+        self.error = None
+        self.counts = {kind: 0 for bit, kind in IQSTREAM_STATUS_EVENTS}
+        self.counts['clientOverrun'] = 0
+        self.dropping = False
+        self.events = []
+        self.status = 0
+        self.updates = 0
+        with self.lock:
+            self.pressureStreak = 0
+        self.adaptations = []
+
+    def _event(self, kind, sticky, timestamp):
+        event = IQStreamEvent(kind, sticky, timestamp, perf_counter())
+        if len(self.events) < self.maxEvents:
+            self.events.append(event)
+        if self.callback is not None:
+            self.callback(event)
+
+    def update(self, acqStatus, timestamp=0, dropped=False):
+        # Feeds one status word, and whether the client discarded its block
+        previous = self.status
+        self.status = acqStatus
+        self.updates += 1
+        changed = acqStatus & ~previous
+        for bit, kind in IQSTREAM_STATUS_EVENTS:
+            if acqStatus & bit << IQSTRM_STATUS_NONSTICKY_SHIFT:
+                self.counts[kind] += 1
+            if changed & bit << IQSTRM_STATUS_NONSTICKY_SHIFT:
+                self._event(kind, False, timestamp)
+            if changed & bit << IQSTRM_STATUS_STICKY_SHIFT:
+                self._event(kind, True, timestamp)
+        if dropped:
+            self.counts['clientOverrun'] += 1
+            if not self.dropping:
+                self._event('clientOverrun', False, timestamp)
+        self.dropping = dropped
+        with self.lock:
+            if dropped or acqStatus & _PRESSURE_STATUS:
+                self.pressureStreak += 1
+            else:
+                self.pressureStreak = 0
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def pressure(self):
+        # True while warnings or discarded blocks have lasted persistBlocks
+        # updates
+        self._check()
+        with self.lock:
+            return self.pressureStreak >= self.persistBlocks
+
+    def data_lost(self):
+        self._check()
+        return bool(self.status & ((IQSTRM_STATUS_IBUFFOVFLOW | IQSTRM_STATUS_OBUFFOVFLOW
+                                    | IQSTRM_STATUS_XFER_DISCONTINUITY)
+                                   << IQSTRM_STATUS_STICKY_SHIFT))
+
+    def adapt(self, stream):
+        # Lightens the load of an IQStreamClient, returns False if it can't
+        with self.lock:
+            self.pressureStreak = 0
+        if stream.dtypeCode != IQSOUTDTYPE.IQSODT_INT16.value:
+            stream.reconfigure(dtype=IQSOUTDTYPE.IQSODT_INT16)
+        elif stream.requestedBandwidth / 2 >= self.minBandwidth:
+            stream.reconfigure(bandwidth=stream.requestedBandwidth / 2)
+        else:
+            return False
+        # The restarted stream's status starts from zero
+        self.status = 0
+        self.dropping = False
+        self.adaptations.append((perf_counter(), stream.requestedBandwidth, stream.dtypeCode))
+        self._event('adapted', False, 0)
+        return True
+
+    def watch(self, rsa, pollSec=0.1):
+        # Polls the status of a disk stream from a background thread. If
+        # polling fails, the thread ends and pressure(), data_lost() and
+        # stop() raise its exception.
+        self.stopping.clear()
+        self.error = None
+        self.thread = Thread(target=self._poll, args=(rsa, pollSec), name='IQStreamMonitor',
+                             daemon=True)
+        self.thread.start()
+
+    def _poll(self, rsa, pollSec):
+        info = IQSTREAM_File_Info()
+        try:
+            while not self.stopping.wait(pollSec):
+                err_check(rsa.IQSTREAM_GetDiskFileInfo(byref(info)))
+                self.update(info.acqStatus, info.sample0Timestamp)
+        except Exception as e:
+            self.error = e
+
+    def stop(self):
+        if self.thread is not None:
+            self.stopping.set()
+            self.thread.join()
+            self.thread = None
+        self._check()
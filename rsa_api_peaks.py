@@ -0,0 +1,127 @@
+"""
+Tektronix RSA_API Spectrum Peak Search
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Finds every peak above a threshold (or a per-bin mask) in a batch of
+spectrum traces at once, with a minimum separation between peaks and
+parabolic interpolation of frequency and amplitude. All traces and bins are
+processed with whole-array NumPy operations; there is no per-trace or
+per-peak Python loop:
+
+    traces = np.array([...])        # (numTraces, traceLength) in dBm
+    peaks = find_peaks(traces, specSet, threshold=-70, minSeparation=100e3)
+    for t, f, p in zip(peaks.trace, peaks.freq, peaks.power):
+        ...
+
+PeakMonitor applies the same search one trace (or batch) at a time during
+continuous acquisition and keeps per-bin occupancy counts and a max hold.
+"""
+
+from collections import namedtuple
+import numpy as np
+from RSA_API import *
+
+
+# Flat arrays, one entry per peak, sorted by trace then frequency
+Peaks = namedtuple('Peaks', ['trace', 'bin', 'freq', 'power'])
+
+
+def freq_axis(specSet):
+    # Frequency of every trace point of a Spectrum_Settings
+    return specSet.actualStartFreq + np.arange(specSet.traceLength) * specSet.actualFreqStepSize
+
+
+def _window_max(x, width):
+    # max(x[..., i:i + width]) for every i, by doubling the window
+    w = x
+    k = 1
+    while 2 * k <= width:
+        w = np.maximum(w[..., :-k], w[..., k:])
+        k *= 2
+    if k == width:
+        return w
+    return np.maximum(w[..., :w.shape[-1] - (width - k)], w[..., width - k:])
+
+
+def find_peaks(traces, freq, threshold=-np.inf, minSeparation=0, maxPeaks=None):
+    # traces is (numTraces, traceLength) or one trace. freq is the
+    # frequency axis or the Spectrum_Settings of the traces. threshold is
+    # a level or a mask broadcastable to traces. A peak is kept only if no
+    # higher point is within minSeparation Hz of it; maxPeaks keeps the
+    # strongest per trace. Returns Peaks.
+    traces = np.atleast_2d(traces)
+    if isinstance(freq, Spectrum_Settings):
+        freq = freq_axis(freq)
+    freq = np.asarray(freq, dtype=np.float64)
+    numTraces, traceLength = traces.shape
+    step = freq[1] - freq[0] if traceLength > 1 else 1.0
+    sep = max(1, int(np.ceil(minSeparation / step - 1e-9)))
+
+    # Highest point in the sep bins on either side of each bin
+    padded = np.full((numTraces, traceLength + 2 * sep), -np.inf, dtype=traces.dtype)
+    padded[:, sep:sep + traceLength] = traces
+    windowMax = _window_max(padded, sep)
+    leftMax = windowMax[:, :traceLength]
+    rightMax = windowMax[:, sep + 1:sep + 1 + traceLength]
+    # Strictly above the left side, so a flat top is only found once
+    isPeak = (traces > leftMax) & (traces >= rightMax) & (traces >= threshold)
+    t, i = np.nonzero(isPeak)
+
+    # Parabolic interpolation through the peak and its neighbours (in dB)
+    left = traces[t, np.maximum(i - 1, 0)].astype(np.float64)
+    center = traces[t, i].astype(np.float64)
+    right = traces[t, np.minimum(i + 1, traceLength - 1)].astype(np.float64)
+    denom = left - 2 * center + right
+    interior = (i > 0) & (i < traceLength - 1) & (denom < 0)
+    offset = np.zeros(len(i))
+    np.divide(0.5 * (left - right), denom, out=offset, where=interior)
+    power = center - 0.25 * (left - right) * offset
+    peakFreq = freq[i] + offset * step
+
+    if maxPeaks is not None and len(i):
+        # Rank peaks by power within each trace
+        order = np.lexsort((-power, t))
+        groupStart = np.searchsorted(t[order], t[order], 'left')
+        keep = np.sort(order[np.arange(len(order)) - groupStart < maxPeaks])
+        t, i, peakFreq, power = t[keep], i[keep], peakFreq[keep], power[keep]
+    return Peaks(t, i, peakFreq, power)
+
+
+class PeakMonitor:
+    # Incremental peak search for continuous acquisition. Each update()
+    # returns the peaks of the new traces, numbered from the first trace
+    # seen, and updates hits (detections per bin) and maxHold.
+    def __init__(self, freq, threshold=-np.inf, minSeparation=0, maxPeaks=None):
+        if isinstance(freq, Spectrum_Settings):
+            freq = freq_axis(freq)
+        self.freq = np.asarray(freq, dtype=np.float64)
+        self.threshold = threshold
+        self.minSeparation = minSeparation
+        self.maxPeaks = maxPeaks
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.hits = np.zeros(len(self.freq), dtype=np.int64)
+        self.maxHold = np.full(len(self.freq), -np.inf, dtype=np.float32)
+
+    def update(self, traces):
+        # traces is one trace or a (numTraces, traceLength) batch
+        traces = np.atleast_2d(traces)
+        peaks = find_peaks(traces, self.freq, self.threshold, self.minSeparation,
+                           self.maxPeaks)
+        np.add.at(self.hits, peaks.bin, 1)
+        np.maximum(self.maxHold, traces.max(axis=0), out=self.maxHold)
+        first = self.count
+        self.count += len(traces)
+        return peaks._replace(trace=peaks.trace + first)
+
+    def occupancy(self):
+        # Fraction of traces with a peak in each bin
+        return self.hits / max(self.count, 1)
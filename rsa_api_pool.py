@@ -0,0 +1,323 @@
+"""
+Tektronix RSA_API Multi-Device Pool
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Runs several analyzers at once. The API only talks to one device per
+process, so DevicePool starts one worker process per serial number, each
+with its own RSA_API.dll instance and connection. Jobs are plain functions
+called in the worker as func(rsa, *args, **kwargs); NumPy arrays they
+return (also inside tuples and lists) are passed back through shared memory
+rather than pickled:
+
+    if __name__ == '__main__':
+        with DevicePool() as pool:
+            results = pool.run_all(acquire_iq, cf=2.4e9, recordLength=1000000)
+            for serial, iq in results.items():
+                ...
+
+Jobs must be module-level functions so they can be sent to the workers.
+Returned arrays are views of the worker's shared memory slots. A job waits
+to be sent until its slot's previous result has arrived, and that result
+is copied out of the slot if a job was already waiting for it. Otherwise
+the arrays are overwritten by the job submitted numSlots jobs later on the
+same device; copy them to keep them longer.
+"""
+
+from collections import deque
+from concurrent.futures import Future
+from ctypes import *
+from multiprocessing import Pipe, Process
+from multiprocessing.sharedctypes import RawArray
+from os import environ
+from threading import Condition, Thread
+import numpy as np
+from RSA_API import *
+from rsa_api_iqblock import acquire_block_iq_into
+from rsa_api_state import CachedRSA
+from rsa_api_typed import bind, load_rsa
+
+
+_ALIGN = 64
+
+
+def default_factory():
+    # The library instance for a worker: the simulated device when
+    # RSA_API_SIM is set, RSA_API.dll otherwise
+    if environ.get('RSA_API_SIM'):
+        from rsa_api_sim import SimRSA
+        return bind(SimRSA())
+    return load_rsa()
+
+
+def search_devices(rsa):
+    # Returns [(deviceID, serial number, device type)] of every device found
+    numFound = c_int(0)
+    deviceIDs = (c_int * DEVSRCH_MAX_NUM_DEVICES)()
+    deviceSerial = ((c_char * DEVSRCH_SERIAL_MAX_STRLEN) * DEVSRCH_MAX_NUM_DEVICES)()
+    deviceType = ((c_char * DEVSRCH_TYPE_MAX_STRLEN) * DEVSRCH_MAX_NUM_DEVICES)()
+    err_check(rsa.DEVICE_Search(byref(numFound), deviceIDs, deviceSerial, deviceType))
+    return [(deviceIDs[i], deviceSerial[i].value.decode(), deviceType[i].value.decode())
+            for i in range(numFound.value)]
+
+
+"""################JOBS################"""
+def acquire_iq(rsa, cf=1e9, refLevel=0, iqBw=40e6, recordLength=1024, timeoutMsec=100):
+    # One block IQ record as complex64
+    err_check(rsa.CONFIG_SetCenterFreq(c_double(cf)))
+    err_check(rsa.CONFIG_SetReferenceLevel(c_double(refLevel)))
+    err_check(rsa.IQBLK_SetIQBandwidth(c_double(iqBw)))
+    err_check(rsa.IQBLK_SetIQRecordLength(c_int(recordLength)))
+    err_check(rsa.DEVICE_Run())
+    try:
+        out = np.empty(recordLength, dtype=np.complex64)
+        return acquire_block_iq_into(rsa, out, timeoutMsec=timeoutMsec)
+    finally:
+        err_check(rsa.DEVICE_Stop())
+
+
+def acquire_spectrum(rsa, cf=1e9, refLevel=0, span=40e6, rbw=300e3, timeoutMsec=100):
+    # One spectrum trace in dBm, returned as (freq, trace)
+    err_check(rsa.SPECTRUM_SetEnable(c_bool(True)))
+    err_check(rsa.CONFIG_SetCenterFreq(c_double(cf)))
+    err_check(rsa.CONFIG_SetReferenceLevel(c_double(refLevel)))
+    err_check(rsa.SPECTRUM_SetDefault())
+    specSet = Spectrum_Settings()
+    err_check(rsa.SPECTRUM_GetSettings(byref(specSet)))
+    specSet.span = span
+    specSet.rbw = rbw
+    specSet.verticalUnit = SpectrumVerticalUnits.SpectrumVerticalUnit_dBm
+    err_check(rsa.SPECTRUM_SetSettings(specSet))
+    err_check(rsa.SPECTRUM_GetSettings(byref(specSet)))
+
+    trace = np.empty(specSet.traceLength, dtype=np.float32)
+    outTracePoints = c_int(0)
+    ready = c_bool(False)
+    err_check(rsa.DEVICE_Run())
+    try:
+        err_check(rsa.SPECTRUM_AcquireTrace())
+        while not ready.value:
+            err_check(rsa.SPECTRUM_WaitForTraceReady(c_int(timeoutMsec), byref(ready)))
+        err_check(rsa.SPECTRUM_GetTrace(SpectrumTraces.SpectrumTrace1, specSet.traceLength,
+                                        trace.ctypes.data_as(POINTER(c_float)),
+                                        byref(outTracePoints)))
+    finally:
+        err_check(rsa.DEVICE_Stop())
+    freq = specSet.actualStartFreq + np.arange(outTracePoints.value) * specSet.actualFreqStepSize
+    return freq, trace[:outTracePoints.value]
+
+
+"""################SHARED MEMORY################"""
+def _pack(result, slot, offset=0):
+    # Copies the arrays in result into slot (a uint8 array) and returns a
+    # picklable layout describing result, and the next free offset
+    if isinstance(result, np.ndarray) and result.dtype != object:
+        start = -(-offset // _ALIGN) * _ALIGN
+        end = start + result.nbytes
+        if end > len(slot):
+            raise ValueError('Result needs {} bytes of shared memory, the slot holds {}'.format(
+                end, len(slot)))
+        dest = slot[start:end].view(result.dtype).reshape(result.shape)
+        dest[...] = result
+        return ('array', start, result.dtype.str, result.shape), end
+    if isinstance(result, (tuple, list)):
+        items = []
+        for item in result:
+            layout, offset = _pack(item, slot, offset)
+            items.append(layout)
+        return (type(result).__name__, items), offset
+    return ('value', result), offset
+
+
+def _unpack(layout, slot, copy=False):
+    kind = layout[0]
+    if kind == 'array':
+        start, dtype, shape = layout[1:]
+        count = int(np.prod(shape))
+        data = np.frombuffer(slot, dtype=dtype, count=count, offset=start).reshape(shape)
+        return data.copy() if copy else data
+    if kind in ('tuple', 'list'):
+        items = [_unpack(item, slot, copy) for item in layout[1]]
+        return tuple(items) if kind == 'tuple' else items
+    return layout[1]
+
+
+def _send_error(conn, e):
+    try:
+        conn.send(('error', e))
+    except Exception:
+        # The exception itself could not be pickled
+        conn.send(('error', RuntimeError(repr(e))))
+
+
+def _worker(factory, serial, conn, buffers, cached):
+    # Worker process: connects to one device and runs jobs until told to
+    # stop
+    slots = [np.frombuffer(b, dtype=np.uint8) for b in buffers]
+    try:
+        rsa = factory()
+        deviceIDs = [d for d, s, t in search_devices(rsa) if s == serial]
+        if not deviceIDs:
+            raise RSAError('Device {} not found'.format(serial))
+        err_check(rsa.DEVICE_Connect(deviceIDs[0]))
+        err_check(rsa.CONFIG_Preset())
+        if cached:
+            rsa = CachedRSA(rsa)
+    except Exception as e:
+        _send_error(conn, e)
+        return
+    conn.send(('ready', None))
+    try:
+        while True:
+            job = conn.recv()
+            if job is None:
+                break
+            slotIndex, func, args, kwargs = job
+            try:
+                layout, end = _pack(func(rsa, *args, **kwargs), slots[slotIndex])
+                conn.send(('result', layout))
+            except Exception as e:
+                _send_error(conn, e)
+    finally:
+        rsa.DEVICE_Stop()
+        rsa.DEVICE_Disconnect()
+
+
+class _DeviceWorker:
+    # Parent side of one worker process. A reader thread resolves the
+    # futures of submitted jobs in order.
+    def __init__(self, serial, factory, slotBytes, numSlots, cached):
+        self.serial = serial
+        self.buffers = [RawArray(c_uint8, slotBytes) for i in range(numSlots)]
+        self.slots = [np.frombuffer(b, dtype=np.uint8) for b in self.buffers]
+        self.conn, childConn = Pipe()
+        self.process = Process(target=_worker, name='RSA {}'.format(serial), daemon=True,
+                               args=(factory, serial, childConn, self.buffers, cached))
+        self.process.start()
+        childConn.close()
+        self.pending = deque()
+        self.cond = Condition()
+        self.jobCount = 0
+        # Whether a slot's job has not returned yet, and how many jobs are
+        # waiting to use it
+        self.busy = [False] * numSlots
+        self.waiting = [0] * numSlots
+        self.exited = False
+        self.reader = None
+
+    def wait_ready(self):
+        kind, value = self.conn.recv()
+        if kind == 'error':
+            raise value
+        self.reader = Thread(target=self._read, daemon=True)
+        self.reader.start()
+
+    def submit(self, func, args, kwargs):
+        # Blocks while the slot's previous job has not returned
+        future = Future()
+        with self.cond:
+            slotIndex = self.jobCount % len(self.slots)
+            self.jobCount += 1
+            self.waiting[slotIndex] += 1
+            self.cond.wait_for(lambda: not self.busy[slotIndex] or self.exited)
+            self.waiting[slotIndex] -= 1
+            if self.exited:
+                raise RSAError('Worker for {} exited'.format(self.serial))
+            self.busy[slotIndex] = True
+            self.pending.append((future, slotIndex))
+            self.conn.send((slotIndex, func, args, kwargs))
+        return future
+
+    def _read(self):
+        while True:
+            try:
+                kind, value = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            with self.cond:
+                future, slotIndex = self.pending.popleft()
+                if kind != 'error':
+                    # A waiting job would overwrite the result before the
+                    # caller could use it
+                    value = _unpack(value, self.buffers[slotIndex],
+                                    copy=self.waiting[slotIndex] > 0)
+                self.busy[slotIndex] = False
+                self.cond.notify_all()
+            if kind == 'error':
+                future.set_exception(value)
+            else:
+                future.set_result(value)
+        with self.cond:
+            self.exited = True
+            self.cond.notify_all()
+        for future, slotIndex in self.pending:
+            future.set_exception(RSAError('Worker for {} exited'.format(self.serial)))
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join()
+        self.conn.close()
+        if self.reader is not None:
+            self.reader.join()
+
+
+class DevicePool:
+    # One worker per serial number (default: every device DEVICE_Search
+    # finds). factory is a module-level function returning a library
+    # instance; cached wraps it in CachedRSA so repeated configuration is
+    # skipped. Each worker has numSlots shared memory slots of slotBytes
+    # for returned arrays.
+    def __init__(self, serials=None, factory=default_factory, slotBytes=64 << 20,
+                 numSlots=2, cached=True):
+        if serials is None:
+            serials = [s for d, s, t in search_devices(factory())]
+        if not serials:
+            raise RSAError('No devices found')
+        self.serials = list(serials)
+        self.workers = {}
+        try:
+            for serial in self.serials:
+                self.workers[serial] = _DeviceWorker(serial, factory, slotBytes, numSlots,
+                                                     cached)
+            # Workers connect concurrently, then report in
+            for worker in self.workers.values():
+                worker.wait_ready()
+        except Exception:
+            self.close()
+            raise
+
+    def close(self):
+        for worker in self.workers.values():
+            worker.close()
+        self.workers = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.workers)
+
+    def submit(self, serial, func, *args, **kwargs):
+        # Runs func(rsa, *args, **kwargs) on one device, returns a Future
+        return self.workers[serial].submit(func, args, kwargs)
+
+    def submit_all(self, func, *args, **kwargs):
+        # Runs the job on every device at once, returns {serial: Future}
+        return {serial: worker.submit(func, args, kwargs)
+                for serial, worker in self.workers.items()}
+
+    def run_all(self, func, *args, **kwargs):
+        # Runs the job on every device at once, returns {serial: result}
+        futures = self.submit_all(func, *args, **kwargs)
+        return {serial: future.result() for serial, future in futures.items()}
@@ -0,0 +1,305 @@
+"""
+Tektronix RSA_API R3F IF Stream File Decoder
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Decoder for the formatted (.r3f) IF stream files written with
+IFSTREAM_SetDiskFileMode(StreamingMode.StreamingModeFormatted). The file is
+a 16384 byte header followed by fixed size frames, each holding int16 ADC
+samples and a footer (frame ID, trigger indices, status, timestamp). The
+whole file is memory-mapped and viewed as an array of frames, so samples
+and footer fields are strided NumPy views with no per-frame Python loop:
+
+    with R3FFile('C:\\SignalVu-PC Files\\if_stream_test.r3f') as r3f:
+        print(r3f.status_summary(), r3f.dropped_frames())
+        for start, adc in r3f.blocks(framesPerBlock=64):
+            ...
+        for start, iq in r3f.iq_blocks():
+            ...
+
+Header and footer layouts follow the R3F file format description in the
+RSA API programmer manual; R3FWriter writes the same layout.
+"""
+
+from calendar import timegm
+from fractions import Fraction
+import numpy as np
+from RSA_API import *
+
+
+R3F_HEADER_SIZE = 16384
+R3F_FRAME_SIZE = 16384
+R3F_SAMPLES_PER_FRAME = 8178
+R3F_FOOTER_SIZE = 28
+R3F_FILE_ID = b'Tektronix RSA300 Data File'
+R3F_TABLE_SIZE = 501
+
+R3F_HEADER = np.dtype({
+    'names': ['fileId', 'endianCheck', 'fileFormatVersion', 'apiVersion', 'fx3Version',
+              'fpgaVersion', 'deviceSerial',
+              'referenceLevel', 'rfCenterFreq', 'deviceTemperature', 'alignmentState',
+              'freqRefState', 'triggerMode', 'triggerSource', 'triggerTransition',
+              'triggerLevel',
+              'dataType', 'frameOffset', 'frameSize', 'sampleOffset', 'sampleSize',
+              'nonSampleOffset', 'nonSampleSize', 'ifCenterFreq', 'sampleRate', 'bandwidth',
+              'dataCorrected', 'timeType', 'refTime', 'clockSamples', 'timestampRate',
+              'adcScaleFactor', 'pathDelay',
+              'correctionType', 'numTableEntries', 'freqTable', 'ampTable', 'phaseTable'],
+    'formats': ['S27', '<u4', '4u1', '4u1', '4u1', '4u1', 'S64',
+                '<f8', '<f8', '<f8', '<u4', '<u4', '<u4', '<u4', '<u4', '<f8',
+                '<u4', '<u4', '<u4', '<u4', '<u4', '<u4', '<u4', '<f8', '<f8', '<f8',
+                '<u4', '<u4', '(7,)<i4', '<u8', '<u8',
+                '<f8', '<f8',
+                '<u4', '<u4', '({},)<f4'.format(R3F_TABLE_SIZE),
+                '({},)<f4'.format(R3F_TABLE_SIZE), '({},)<f4'.format(R3F_TABLE_SIZE)],
+    'offsets': [0, 512, 516, 520, 524, 528, 532,
+                1024, 1032, 1040, 1048, 1052, 1056, 1060, 1064, 1068,
+                2048, 2052, 2056, 2060, 2064, 2068, 2072, 2076, 2084, 2092,
+                2100, 2104, 2108, 2136, 2144,
+                3072, 3080,
+                4096, 4352, 4356, 6360, 8364],
+    'itemsize': R3F_HEADER_SIZE})
+
+R3F_FOOTER = np.dtype({
+    'names': ['frameId', 'trigger2Index', 'trigger1Index', 'timeSyncIndex', 'frameStatus',
+              'timestamp'],
+    'formats': ['<u4', '<u2', '<u2', '<u2', '<u2', '<u8'],
+    'offsets': [8, 12, 14, 16, 18, 20],
+    'itemsize': R3F_FOOTER_SIZE})
+
+R3F_STATUS_BITS = {'ADC_OVERRANGE': AcqDataStatus_ADC_OVERRANGE,
+                   'REF_OSC_UNLOCK': AcqDataStatus_REF_OSC_UNLOCK,
+                   'LOW_SUPPLY_VOLTAGE': AcqDataStatus_LOW_SUPPLY_VOLTAGE,
+                   'ADC_DATA_LOST': AcqDataStatus_ADC_DATA_LOST}
+
+
+def _frame_dtype(header):
+    samplesPerFrame = (int(header['nonSampleOffset']) - int(header['sampleOffset'])) // 2
+    return np.dtype({'names': ['samples', 'footer'],
+                     'formats': [('<i2', samplesPerFrame), R3F_FOOTER],
+                     'offsets': [int(header['sampleOffset']), int(header['nonSampleOffset'])],
+                     'itemsize': int(header['frameSize'])})
+
+
+def lowpass_taps(numTaps, cutoff, beta=8.0):
+    # Kaiser windowed-sinc lowpass, cutoff as a fraction of the sample rate
+    n = np.arange(numTaps) - (numTaps - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(numTaps, beta)
+    return (taps / np.sum(taps)).astype(np.float32)
+
+
+class R3FFile:
+    def __init__(self, filename):
+        self.filename = filename
+        self.mm = np.memmap(filename, dtype=np.uint8, mode='r')
+        if len(self.mm) < R3F_HEADER_SIZE:
+            raise ValueError('{} is too short to be an R3F file'.format(filename))
+        self.header = h = self.mm[:R3F_HEADER_SIZE].view(R3F_HEADER)[0]
+        if not bytes(h['fileId']).startswith(R3F_FILE_ID) or h['endianCheck'] != 0x12345678:
+            raise ValueError('{} is not a little-endian R3F file'.format(filename))
+        self.rfCenterFreq = float(h['rfCenterFreq'])
+        self.ifCenterFreq = float(h['ifCenterFreq'])
+        self.sampleRate = float(h['sampleRate'])
+        self.bandwidth = float(h['bandwidth'])
+        self.refLevel = float(h['referenceLevel'])
+        self.scale = float(h['adcScaleFactor'])
+        self.serial = bytes(h['deviceSerial']).split(b'\0', 1)[0].decode('ascii', 'replace')
+
+        frameOffset = int(h['frameOffset'])
+        frameDtype = _frame_dtype(h)
+        self.numFrames = (len(self.mm) - frameOffset) // frameDtype.itemsize
+        self.frames = np.ndarray((self.numFrames,), dtype=frameDtype, buffer=self.mm,
+                                 offset=frameOffset)
+        # (numFrames, samplesPerFrame) strided int16 view of the ADC samples
+        self.samples = self.frames['samples']
+        self.samplesPerFrame = self.samples.shape[1] if self.numFrames else \
+            frameDtype['samples'].shape[0]
+        self.footers = self.frames['footer']
+
+    def close(self):
+        self.frames = self.samples = self.footers = self.header = None
+        self.mm._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.numFrames * self.samplesPerFrame
+
+    """################FOOTERS################"""
+    @property
+    def frameId(self):
+        return self.footers['frameId']
+
+    @property
+    def timestamp(self):
+        return self.footers['timestamp']
+
+    @property
+    def frameStatus(self):
+        return self.footers['frameStatus']
+
+    def status_summary(self):
+        # Number of frames with each AcqDataStatus bit set
+        status = np.asarray(self.frameStatus)
+        return {name: int(np.count_nonzero(status & bit))
+                for name, bit in R3F_STATUS_BITS.items()}
+
+    def dropped_frames(self):
+        # Frame indices after which frame IDs are not consecutive
+        return np.flatnonzero(np.diff(self.frameId.astype(np.int64)) != 1)
+
+    def trigger_indices(self, trigger=1):
+        # Sample indices (from the start of the file) of trigger events
+        index = self.footers['trigger{}Index'.format(trigger)].astype(np.int64)
+        frames = np.flatnonzero(index < self.samplesPerFrame)
+        return frames * self.samplesPerFrame + index[frames]
+
+    def utc_at(self, timestamp):
+        # UTC time of a footer timestamp as (seconds, nanoseconds)
+        h = self.header
+        year, month, day, hour, minute, sec, nsec = (int(v) for v in h['refTime'])
+        refSec = timegm((year, month, day, hour, minute, sec))
+        nsec += (int(timestamp) - int(h['clockSamples'])) * 1000000000 // int(h['timestampRate'])
+        return refSec + nsec // 1000000000, nsec % 1000000000
+
+    """################SAMPLES################"""
+    def blocks(self, framesPerBlock=64, start=0, stop=None):
+        # Yields (first sample index, float32 ADC samples in volts) for
+        # framesPerBlock frames at a time, from frame start up to frame
+        # stop. The block is one reused buffer, overwritten on the next
+        # iteration.
+        stop = self.numFrames if stop is None else min(stop, self.numFrames)
+        buf = np.empty((framesPerBlock, self.samplesPerFrame), dtype=np.float32)
+        scale = np.float32(self.scale)
+        for frame in range(start, stop, framesPerBlock):
+            count = min(framesPerBlock, stop - frame)
+            out = buf[:count]
+            np.multiply(self.samples[frame:frame + count], scale, out=out, casting='unsafe')
+            yield frame * self.samplesPerFrame, out.reshape(-1)
+
+    def iq_blocks(self, framesPerBlock=64, decimation=2, numTaps=63, start=0, stop=None):
+        # Yields (first IQ sample index, complex64 IQ) downconverted from
+        # ifCenterFreq to baseband, lowpass filtered to the bandwidth and
+        # decimated, so the IQ sample rate is sampleRate / decimation. The
+        # filter state carries over between blocks, so the output is
+        # continuous; the first numTaps - 1 ADC samples only prime it.
+        # The block is one reused buffer, overwritten on the next iteration.
+        # A gain of 2 keeps the power of the real IF signal in the complex IQ
+        taps = 2 * lowpass_taps(numTaps, min(self.bandwidth / 2 / self.sampleRate * 1.1,
+                                             0.5 / decimation))
+        blockLen = framesPerBlock * self.samplesPerFrame
+        history = numTaps - 1
+        mixed = np.zeros(history + blockLen, dtype=np.complex64)
+        out = np.empty(blockLen // decimation + 1, dtype=np.complex64)
+        tmp = np.empty_like(out)
+        lo = _Mixer(self.ifCenterFreq / self.sampleRate, blockLen)
+        sampleIndex = start * self.samplesPerFrame
+        # Index (into mixed) of the next output sample's newest input
+        phase = history
+        for first, adc in self.blocks(framesPerBlock, start, stop):
+            n = len(adc)
+            x = mixed[:history + n]
+            np.multiply(adc, lo.table(first, n), out=x[history:])
+            numOut = len(range(phase, history + n, decimation))
+            y = out[:numOut]
+            y[:] = 0
+            for j in range(numTaps):
+                begin = phase - j
+                np.multiply(x[begin:begin + (numOut - 1) * decimation + 1:decimation],
+                            taps[j], out=tmp[:numOut])
+                y += tmp[:numOut]
+            outIndex = (sampleIndex + phase - history) // decimation
+            phase = phase + numOut * decimation - n
+            mixed[:history] = x[n:]
+            sampleIndex += n
+            yield outIndex, y
+
+
+class _Mixer:
+    # exp(-2j pi f n) for normalized frequency f, from a precomputed table
+    # when f is a ratio with a small period (28 MHz / 112 MHz repeats every
+    # 4 samples)
+    def __init__(self, freq, maxLen):
+        self.freq = freq
+        ratio = Fraction(freq).limit_denominator(4096)
+        self.period = ratio.denominator if abs(float(ratio) - freq) < 1e-12 else None
+        if self.period:
+            n = np.arange(maxLen + self.period)
+            self.lut = np.exp(-2j * np.pi * float(ratio) * n).astype(np.complex64)
+
+    def table(self, first, count):
+        if self.period:
+            offset = first % self.period
+            return self.lut[offset:offset + count]
+        n = first + np.arange(count, dtype=np.float64)
+        return np.exp(-2j * np.pi * ((self.freq * n) % 1.0)).astype(np.complex64)
+
+
+class R3FWriter:
+    # Writes formatted IF frames with the R3F header and footer layout
+    def __init__(self, filename, rfCenterFreq, refLevel=0, ifCenterFreq=28e6,
+                 sampleRate=112e6, bandwidth=40e6, adcScaleFactor=1.0, refTime=None,
+                 clockSamples=0, timestampRate=112000000, serial=''):
+        header = np.zeros(1, dtype=R3F_HEADER)
+        h = header[0]
+        h['fileId'] = R3F_FILE_ID
+        h['endianCheck'] = 0x12345678
+        h['fileFormatVersion'] = (1, 2, 0, 0)
+        h['deviceSerial'] = serial.encode()
+        h['referenceLevel'] = refLevel
+        h['rfCenterFreq'] = rfCenterFreq
+        h['dataType'] = 161
+        h['frameOffset'] = R3F_HEADER_SIZE
+        h['frameSize'] = R3F_FRAME_SIZE
+        h['sampleOffset'] = 0
+        h['sampleSize'] = 2
+        h['nonSampleOffset'] = R3F_SAMPLES_PER_FRAME * 2
+        h['nonSampleSize'] = R3F_FOOTER_SIZE
+        h['ifCenterFreq'] = ifCenterFreq
+        h['sampleRate'] = sampleRate
+        h['bandwidth'] = bandwidth
+        h['refTime'] = refTime if refTime is not None else (1970, 1, 1, 0, 0, 0, 0)
+        h['clockSamples'] = clockSamples
+        h['timestampRate'] = timestampRate
+        h['adcScaleFactor'] = adcScaleFactor
+        self.frameDtype = _frame_dtype(h)
+        self.timestampStep = R3F_SAMPLES_PER_FRAME * timestampRate / sampleRate
+        self.clockSamples = clockSamples
+        self.frameId = 0
+        self.f = open(filename, 'wb')
+        self.f.write(header.tobytes())
+
+    def write(self, samples, frameStatus=0):
+        # samples is int16 ADC data, a whole number of frames long
+        samples = np.asarray(samples, dtype=np.int16).reshape(-1, R3F_SAMPLES_PER_FRAME)
+        frames = np.zeros(len(samples), dtype=self.frameDtype)
+        frames['samples'] = samples
+        footers = frames['footer']
+        ids = self.frameId + np.arange(len(samples))
+        footers['frameId'] = ids
+        footers['trigger1Index'] = 0xFFFF
+        footers['trigger2Index'] = 0xFFFF
+        footers['timeSyncIndex'] = 0xFFFF
+        footers['frameStatus'] = frameStatus
+        footers['timestamp'] = self.clockSamples + np.round(
+            ids * self.timestampStep).astype(np.uint64)
+        self.f.write(frames.tobytes())
+        self.frameId += len(samples)
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,248 @@
+"""
+Tektronix RSA_API Write-Behind Capture Recorder
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Saves acquired blocks (IQ, spectrum traces, DPX bitmaps, any NumPy array)
+without blocking the acquisition thread on disk. put() copies a block into
+one of a fixed set of preallocated slots and returns at once; if every
+slot is still waiting to be written the block is dropped and counted
+instead of waiting. Blocks are optionally compressed with zlib, bz2 or
+lzma on a thread pool (they release the GIL), then a writer thread packs
+them, in order, into large aligned writes to a file that is preallocated
+ahead of the write position:
+
+    with Recorder('capture.rrec', codec='zlib') as rec:
+        for block in stream:
+            rec.put(block.data, 'iq', block.timestamp)
+    print(rec.dropped, rec.rawBytes / rec.storedBytes)
+
+    for kind, timestamp, data in RecordingFile('capture.rrec'):
+        ...
+
+The file is an 8 byte signature followed by chunks, each a fixed header
+(kind, dtype, shape, timestamp, codec, sizes) and the stored bytes.
+"""
+
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import bz2
+import lzma
+import os
+import struct
+from threading import Condition, Thread
+import zlib
+import numpy as np
+
+
+RECORDING_SIGNATURE = b'RSAREC01'
+MAX_DIMS = 4
+# signature, kind, dtype, codec, ndim, shape, timestamp, rawBytes, storedBytes
+_CHUNK = struct.Struct('<4s8s8sBB2x{}QQQQ'.format(MAX_DIMS))
+_CHUNK_SIGNATURE = b'RCHK'
+_ALIGN = 4096
+
+CODECS = {None: 0, 'zlib': 1, 'bz2': 2, 'lzma': 3}
+_COMPRESS = {1: lambda data, level: zlib.compress(data, level),
+             2: lambda data, level: bz2.compress(data, max(level, 1)),
+             3: lambda data, level: lzma.compress(data, preset=level)}
+_DECOMPRESS = {1: zlib.decompress, 2: bz2.decompress, 3: lzma.decompress}
+
+RecordedBlock = namedtuple('RecordedBlock', ['kind', 'timestamp', 'data'])
+
+
+def _preallocate(fd, size):
+    if hasattr(os, 'posix_fallocate'):
+        os.posix_fallocate(fd, 0, size)
+    else:
+        os.ftruncate(fd, size)
+
+
+class Recorder:
+    # numSlots blocks of up to slotBytes each can wait to be written.
+    # Blocks are written writeBytes at a time (a multiple of 4096), and the
+    # file is extended preallocateBytes at a time.
+    def __init__(self, filename, slotBytes=16 << 20, numSlots=8, codec=None, level=1,
+                 workers=None, writeBytes=4 << 20, preallocateBytes=256 << 20):
+        if codec not in CODECS:
+            raise ValueError('codec must be one of {}'.format(sorted(c for c in CODECS if c)))
+        self.filename = filename
+        self.slotBytes = slotBytes
+        self.codec = CODECS[codec]
+        self.level = level
+        self.writeBytes = -(-writeBytes // _ALIGN) * _ALIGN
+        self.preallocateBytes = max(preallocateBytes, self.writeBytes)
+        self.slots = np.empty((numSlots, slotBytes), dtype=np.uint8)
+        self.staging = np.empty(self.writeBytes, dtype=np.uint8)
+        self.executor = (ThreadPoolExecutor(workers or os.cpu_count() or 1)
+                         if self.codec else None)
+
+        self.cond = Condition()
+        self.free = deque(range(numSlots))
+        self.pending = deque()
+        self.closing = False
+        self.error = None
+        self.queued = 0
+        self.dropped = 0
+        self.written = 0
+        self.rawBytes = 0
+        self.storedBytes = 0
+
+        flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0)
+        self.fd = os.open(filename, flags, 0o644)
+        self.allocated = 0
+        self.filePos = 0
+        self.stagePos = 0
+        self._stage(RECORDING_SIGNATURE)
+        self.thread = Thread(target=self._writer, name='Recorder', daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def put(self, data, kind='iq', timestamp=0):
+        # Queues a copy of data (any array of up to MAX_DIMS dimensions).
+        # Returns False, without waiting, if it had to be dropped.
+        data = np.asarray(data)
+        if data.nbytes > self.slotBytes or data.ndim > MAX_DIMS or len(data.dtype.str) > 8:
+            raise ValueError('A {} block of {} bytes and {} dimensions cannot be recorded'.format(
+                data.dtype, data.nbytes, data.ndim))
+        if len(kind.encode()) > 8:
+            raise ValueError('Block kind {!r} is longer than 8 bytes'.format(kind))
+        with self.cond:
+            if self.error is not None:
+                raise self.error
+            if self.closing:
+                raise ValueError('Recorder is closed')
+            if not self.free:
+                self.dropped += 1
+                return False
+            slot = self.free.popleft()
+        view = self.slots[slot, :data.nbytes]
+        view.view(data.dtype).reshape(data.shape)[...] = data
+        future = None
+        if self.codec:
+            future = self.executor.submit(_COMPRESS[self.codec], view, self.level)
+        with self.cond:
+            self.pending.append((slot, kind, timestamp, data.dtype.str, data.shape,
+                                 data.nbytes, future))
+            self.queued += 1
+            self.cond.notify_all()
+        return True
+
+    def backlog(self):
+        with self.cond:
+            return len(self.pending)
+
+    def _stage(self, payload):
+        # Appends payload to the staging buffer, writing it out when full
+        payload = np.frombuffer(payload, dtype=np.uint8)
+        while len(payload):
+            n = min(len(payload), self.writeBytes - self.stagePos)
+            self.staging[self.stagePos:self.stagePos + n] = payload[:n]
+            self.stagePos += n
+            payload = payload[n:]
+            if self.stagePos == self.writeBytes:
+                self._flush()
+
+    def _flush(self):
+        end = self.filePos + self.stagePos
+        if end > self.allocated:
+            steps = -(-(end - self.allocated) // self.preallocateBytes)
+            self.allocated += steps * self.preallocateBytes
+            _preallocate(self.fd, self.allocated)
+        view = memoryview(self.staging)[:self.stagePos]
+        while len(view):
+            view = view[os.write(self.fd, view):]
+        self.filePos = end
+        self.stagePos = 0
+
+    def _writer(self):
+        try:
+            while True:
+                with self.cond:
+                    self.cond.wait_for(lambda: self.pending or self.closing)
+                    if not self.pending:
+                        break
+                    slot, kind, timestamp, dtype, shape, nbytes, future = self.pending[0]
+                payload = future.result() if future is not None else self.slots[slot, :nbytes]
+                header = _CHUNK.pack(_CHUNK_SIGNATURE, kind.encode(), dtype.encode(),
+                                     self.codec, len(shape),
+                                     *(tuple(shape) + (0,) * (MAX_DIMS - len(shape))),
+                                     timestamp, nbytes, len(payload))
+                self._stage(header)
+                self._stage(payload)
+                with self.cond:
+                    self.pending.popleft()
+                    self.free.append(slot)
+                    self.written += 1
+                    self.rawBytes += nbytes
+                    self.storedBytes += len(payload)
+        except Exception as e:
+            with self.cond:
+                self.error = e
+                self.closing = True
+
+    def close(self):
+        # Writes everything queued, then trims the file to its length
+        with self.cond:
+            self.closing = True
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+            if self.executor is not None:
+                self.executor.shutdown()
+            try:
+                if self.error is None:
+                    self._flush()
+                os.ftruncate(self.fd, self.filePos)
+            finally:
+                os.close(self.fd)
+        if self.error is not None:
+            raise self.error
+
+
+class RecordingFile:
+    # Iterates over the blocks of a Recorder file as RecordedBlock
+    def __init__(self, filename):
+        self.f = open(filename, 'rb')
+        if self.f.read(len(RECORDING_SIGNATURE)) != RECORDING_SIGNATURE:
+            self.f.close()
+            raise ValueError('{} is not a recording'.format(filename))
+
+    def close(self):
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __iter__(self):
+        f = self.f
+        f.seek(len(RECORDING_SIGNATURE))
+        while True:
+            header = f.read(_CHUNK.size)
+            if len(header) < _CHUNK.size:
+                return
+            fields = _CHUNK.unpack(header)
+            signature, kind, dtype, codec, ndim = fields[:5]
+            shape = fields[5:5 + ndim]
+            timestamp, rawBytes, storedBytes = fields[5 + MAX_DIMS:]
+            if signature != _CHUNK_SIGNATURE:
+                raise ValueError('Corrupt chunk at byte {}'.format(f.tell() - _CHUNK.size))
+            payload = f.read(storedBytes)
+            if codec:
+                payload = _DECOMPRESS[codec](payload)
+            data = np.frombuffer(payload, dtype=dtype.rstrip(b'\0').decode()).reshape(shape)
+            yield RecordedBlock(kind.rstrip(b'\0').decode(), timestamp, data)
@@ -0,0 +1,355 @@
+"""
+Tektronix RSA_API Shared Memory Fan-Out
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.8 64-bit (multiprocessing.shared_memory)
+NumPy 1.11.3
+
+Publishes acquisitions (spectrum traces, IQ blocks, DPX frames) to any
+number of consumer processes through a ring of slots in one named shared
+memory block. Each slot has a header (sequence number, timestamp, tag,
+acquisition status, center frequency, sample rate, reference level, start
+frequency and frequency step of spectrum data, and the dtype and shape of
+up to 4 arrays) followed by the array data. The publisher
+never waits for consumers; a consumer that falls more than the ring
+length behind loses the oldest items, which it counts as dropped.
+
+    pub = RingPublisher('rsa_iq', numSlots=8, slotBytes=8 << 20)
+    rsa.DEVICE_Run()
+    publish_iq_blocks(rsa, pub, recordLength=1000000)
+
+    # in another process
+    sub = RingSubscriber('rsa_iq')
+    while True:
+        item = sub.get(timeout=1)
+        iq = item.arrays[0]     # a view of the shared memory, no copy
+        ...
+        if not sub.valid(item):
+            pass                # overwritten while it was being used
+
+Items are views of the ring and stay valid until the publisher wraps
+around to their slot, numSlots publications later.
+"""
+
+from collections import namedtuple
+from ctypes import *
+from multiprocessing import resource_tracker, shared_memory
+from time import perf_counter, sleep
+import gc
+import os
+import sys
+import numpy as np
+from RSA_API import *
+from rsa_api_iqblock import acquire_block_iq_into
+
+
+RING_MAGIC = b'RSARING1'
+RING_MAX_ARRAYS = 4
+RING_MAX_DIMS = 3
+_ALIGN = 64
+
+_CONTROL = np.dtype([('magic', 'S8'), ('numSlots', '<u8'), ('slotBytes', '<u8'),
+                     ('writeSeq', '<u8')])
+_CONTROL_SIZE = _ALIGN
+
+# seq is 0 while a slot is being written and the item's sequence number
+# (from 1) once it is complete
+_ITEM_HEADER = np.dtype([('seq', '<u8'), ('timestamp', '<u8'), ('tag', 'S16'),
+                         ('acqStatus', '<u4'), ('numArrays', '<u4'),
+                         ('centerFreq', '<f8'), ('rate', '<f8'), ('refLevel', '<f8'),
+                         ('startFreq', '<f8'), ('freqStep', '<f8'),
+                         ('dtypes', 'S4', (RING_MAX_ARRAYS,)),
+                         ('shapes', '<i8', (RING_MAX_ARRAYS, RING_MAX_DIMS)),
+                         ('offsets', '<u8', (RING_MAX_ARRAYS,))])
+_HEADER_SIZE = -(-_ITEM_HEADER.itemsize // _ALIGN) * _ALIGN
+
+# Rings created by this process, which the resource tracker has to keep
+_published = set()
+
+RingItem = namedtuple('RingItem', ['seq', 'timestamp', 'tag', 'acqStatus', 'centerFreq',
+                                   'rate', 'refLevel', 'startFreq', 'freqStep', 'arrays'])
+
+
+def _layout(shm, numSlots, slotBytes):
+    # (control, slot headers, slot data) views of a ring
+    buf = np.frombuffer(shm.buf, dtype=np.uint8)
+    control = buf[:_CONTROL_SIZE].view(_CONTROL)
+    headersEnd = _CONTROL_SIZE + numSlots * _HEADER_SIZE
+    headers = [buf[_CONTROL_SIZE + i * _HEADER_SIZE:][:_ITEM_HEADER.itemsize].view(
+        _ITEM_HEADER) for i in range(numSlots)]
+    data = [buf[headersEnd + i * slotBytes:headersEnd + (i + 1) * slotBytes]
+            for i in range(numSlots)]
+    return control, headers, data
+
+
+def _close(shm):
+    try:
+        shm.close()
+    except BufferError:
+        # Arrays passed through ndarray.ctypes.data_as() are only released
+        # by the garbage collector
+        gc.collect()
+        shm.close()
+
+
+class RingPublisher:
+    # Creates the ring. numSlots items of up to slotBytes of array data
+    # each. name=None picks a unique name (see .name).
+    def __init__(self, name=None, numSlots=8, slotBytes=16 << 20):
+        slotBytes = -(-slotBytes // _ALIGN) * _ALIGN
+        size = _CONTROL_SIZE + numSlots * (_HEADER_SIZE + slotBytes)
+        self.shm = shared_memory.SharedMemory(name, create=True, size=size)
+        self.name = self.shm.name
+        _published.add(self.name)
+        self.numSlots = numSlots
+        self.slotBytes = slotBytes
+        self.control, self.headers, self.data = _layout(self.shm, numSlots, slotBytes)
+        self.control['magic'] = RING_MAGIC
+        self.control['numSlots'] = numSlots
+        self.control['slotBytes'] = slotBytes
+        self.control['writeSeq'] = 0
+        for header in self.headers:
+            header['seq'] = 0
+        self.seq = 0
+        self.reserved = None
+
+    def close(self):
+        # Removes the ring; consumers that are attached keep their mapping.
+        # Arrays from reserve() must be released first.
+        self.control = self.headers = self.data = None
+        self.shm.unlink()
+        _published.discard(self.name)
+        _close(self.shm)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reserve(self, specs):
+        # Returns writable arrays in the next slot for [(shape, dtype)], to
+        # be filled in place (e.g. by acquire_block_iq_into) and published
+        # with commit()
+        if len(specs) > RING_MAX_ARRAYS:
+            raise ValueError('At most {} arrays per item'.format(RING_MAX_ARRAYS))
+        seq = self.seq + 1
+        slot = (seq - 1) % self.numSlots
+        header = self.headers[slot]
+        header['seq'] = 0
+        arrays = []
+        offset = 0
+        for i, (shape, dtype) in enumerate(specs):
+            dtype = np.dtype(dtype)
+            shape = tuple(shape) if isinstance(shape, (tuple, list)) else (shape,)
+            if len(shape) > RING_MAX_DIMS:
+                raise ValueError('At most {} dimensions per array'.format(RING_MAX_DIMS))
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            if offset + nbytes > self.slotBytes:
+                raise ValueError('Item needs {} bytes, ring slots hold {}'.format(
+                    offset + nbytes, self.slotBytes))
+            arrays.append(self.data[slot][offset:offset + nbytes].view(dtype).reshape(shape))
+            header['dtypes'][0, i] = dtype.str.encode()
+            header['shapes'][0, i] = tuple(shape) + (0,) * (RING_MAX_DIMS - len(shape))
+            header['offsets'][0, i] = offset
+            offset = -(-(offset + nbytes) // _ALIGN) * _ALIGN
+        header['numArrays'] = len(specs)
+        self.reserved = seq
+        return arrays
+
+    def commit(self, tag='', timestamp=0, centerFreq=0, rate=0, refLevel=0, acqStatus=0,
+               startFreq=0, freqStep=0):
+        # Publishes the reserved slot and returns its sequence number. rate
+        # is the sample rate of IQ data; startFreq and freqStep give the
+        # frequency of each point of spectrum data.
+        seq = self.reserved
+        if seq is None:
+            raise RuntimeError('commit() without reserve()')
+        header = self.headers[(seq - 1) % self.numSlots]
+        header['timestamp'] = timestamp
+        header['tag'] = tag.encode()
+        header['acqStatus'] = acqStatus
+        header['centerFreq'] = centerFreq
+        header['rate'] = rate
+        header['refLevel'] = refLevel
+        header['startFreq'] = startFreq
+        header['freqStep'] = freqStep
+        # The sequence number is written last, so a reader never sees a
+        # half-written slot as complete
+        header['seq'] = seq
+        self.control['writeSeq'] = seq
+        self.seq = seq
+        self.reserved = None
+        return seq
+
+    def publish(self, arrays, **meta):
+        # Copies an array (or a list of up to 4) into the ring; meta is
+        # passed to commit()
+        if isinstance(arrays, np.ndarray):
+            arrays = [arrays]
+        dests = self.reserve([(a.shape, a.dtype) for a in arrays])
+        for dest, a in zip(dests, arrays):
+            dest[...] = a
+        return self.commit(**meta)
+
+
+class RingSubscriber:
+    # Attaches to a ring by name. start='latest' begins with the next
+    # item published, 'oldest' with the oldest one still in the ring.
+    def __init__(self, name, start='latest'):
+        # Only the publisher may unlink the ring. Before Python 3.13 an
+        # attached SharedMemory is tracked too (on POSIX) and unlinked when
+        # the consumer exits, unless it is unregistered again. The tracker
+        # is per process, so rings published here stay registered.
+        if sys.version_info >= (3, 13):
+            self.shm = shared_memory.SharedMemory(name, track=False)
+        else:
+            self.shm = shared_memory.SharedMemory(name)
+            if os.name == 'posix' and self.shm.name not in _published:
+                resource_tracker.unregister(self.shm._name, 'shared_memory')
+        control = np.frombuffer(self.shm.buf, dtype=np.uint8)[:_CONTROL_SIZE].view(_CONTROL)
+        if control['magic'][0] != RING_MAGIC:
+            raise ValueError('{} is not an RSA ring'.format(name))
+        self.numSlots = int(control['numSlots'][0])
+        self.slotBytes = int(control['slotBytes'][0])
+        self.control, self.headers, self.data = _layout(self.shm, self.numSlots,
+                                                        self.slotBytes)
+        writeSeq = int(self.control['writeSeq'][0])
+        if start == 'oldest':
+            self.next = max(1, writeSeq - self.numSlots + 2)
+        else:
+            self.next = writeSeq + 1
+        self.received = 0
+        self.dropped = 0
+        self.overruns = 0
+
+    def close(self):
+        # Items read must be released first
+        self.control = self.headers = self.data = None
+        _close(self.shm)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def backlog(self):
+        # Items published but not yet read
+        return max(0, int(self.control['writeSeq'][0]) - self.next + 1)
+
+    def poll(self):
+        # Returns the next RingItem, or None if there is nothing new
+        while True:
+            writeSeq = int(self.control['writeSeq'][0])
+            if self.next > writeSeq:
+                return None
+            # Items more than a ring behind are gone; the slot after the
+            # newest one may be being rewritten, so skip it too
+            oldest = writeSeq - self.numSlots + 2
+            if self.next < oldest:
+                self.dropped += oldest - self.next
+                self.next = oldest
+            seq = self.next
+            header = self.headers[(seq - 1) % self.numSlots]
+            h = header[0].copy()
+            if h['seq'] != seq or header['seq'][0] != seq:
+                # Overwritten since writeSeq was read
+                self.dropped += 1
+                self.next += 1
+                continue
+            self.next += 1
+            self.received += 1
+            return self._item(h, self.data[(seq - 1) % self.numSlots])
+
+    def _item(self, h, data):
+        arrays = []
+        for i in range(int(h['numArrays'])):
+            shape = tuple(int(n) for n in h['shapes'][i] if n)
+            dtype = np.dtype(h['dtypes'][i].decode())
+            offset = int(h['offsets'][i])
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            a = data[offset:offset + nbytes].view(dtype).reshape(shape)
+            a.flags.writeable = False
+            arrays.append(a)
+        return RingItem(int(h['seq']), int(h['timestamp']), h['tag'].decode(),
+                        int(h['acqStatus']), float(h['centerFreq']), float(h['rate']),
+                        float(h['refLevel']), float(h['startFreq']), float(h['freqStep']),
+                        arrays)
+
+    def get(self, timeout=None, pollInterval=0.0005):
+        # Waits up to timeout seconds (None: forever) for the next item.
+        # Returns None on timeout.
+        deadline = None if timeout is None else perf_counter() + timeout
+        while True:
+            item = self.poll()
+            if item is not None:
+                return item
+            if deadline is not None and perf_counter() >= deadline:
+                return None
+            sleep(pollInterval)
+
+    def valid(self, item):
+        # False if the publisher has started overwriting item's slot, in
+        # which case the arrays may hold newer data; counted as an overrun
+        ok = self.headers[(item.seq - 1) % self.numSlots]['seq'][0] == item.seq
+        if not ok:
+            self.overruns += 1
+        return ok
+
+    def __iter__(self):
+        while True:
+            yield self.get()
+
+
+"""################PUBLISHING ACQUISITIONS################"""
+def publish_iq_blocks(rsa, publisher, recordLength, count=None, timeoutMsec=100):
+    # Acquires block IQ straight into ring slots, count blocks (forever if
+    # None). The device must already be running with block IQ configured.
+    cf = c_double(0)
+    sampleRate = c_double(0)
+    refLevel = c_double(0)
+    err_check(rsa.CONFIG_GetCenterFreq(byref(cf)))
+    err_check(rsa.IQBLK_GetIQSampleRate(byref(sampleRate)))
+    err_check(rsa.CONFIG_GetReferenceLevel(byref(refLevel)))
+    acqInfo = IQBLK_ACQINFO()
+    n = 0
+    while count is None or n < count:
+        out, = publisher.reserve([((recordLength,), np.complex64)])
+        acquire_block_iq_into(rsa, out, timeoutMsec=timeoutMsec)
+        err_check(rsa.IQBLK_GetIQAcqInfo(byref(acqInfo)))
+        publisher.commit('iq', acqInfo.sample0Timestamp, cf.value, sampleRate.value,
+                         refLevel.value, acqInfo.acqStatus)
+        n += 1
+
+
+def publish_spectrum(rsa, publisher, reader, count=None):
+    # Publishes traces from a SpectrumReader (see rsa_api_spectrum)
+    specSet = Spectrum_Settings()
+    cf = c_double(0)
+    refLevel = c_double(0)
+    err_check(rsa.SPECTRUM_GetSettings(byref(specSet)))
+    err_check(rsa.CONFIG_GetCenterFreq(byref(cf)))
+    err_check(rsa.CONFIG_GetReferenceLevel(byref(refLevel)))
+    n = 0
+    while count is None or n < count:
+        trace, info = reader.acquire()
+        publisher.publish(trace, tag='spectrum', timestamp=info.timestamp,
+                          centerFreq=cf.value, refLevel=refLevel.value,
+                          acqStatus=info.acqDataStatus, startFreq=specSet.actualStartFreq,
+                          freqStep=specSet.actualFreqStepSize)
+        n += 1
+
+
+def publish_dpx(publisher, reader, count=None):
+    # Publishes (bitmap, traces, sogram) frames from a DPXReader (see
+    # rsa_api_dpx)
+    n = 0
+    while count is None or n < count:
+        frame = reader.acquire()
+        publisher.publish([frame.bitmap, frame.traces, frame.sogram], tag='dpx',
+                          timestamp=frame.timestamp, acqStatus=frame.acqDataStatus)
+        n += 1
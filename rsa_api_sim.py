@@ -0,0 +1,1454 @@
+"""
+Tektronix RSA_API Simulated Device
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit or any OS that runs NumPy
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+SimRSA is a stand-in for RSA_API.dll that needs neither Windows nor an
+analyzer. It exports the RSA_API functions under their C names and takes the
+same ctypes arguments (plain values, c_* objects, byref() outputs, ctypes
+arrays and pointers), so it can replace the object returned by
+cdll.LoadLibrary("RSA_API.dll"):
+
+    from rsa_api_sim import SimRSA
+    rsa = SimRSA(tones=((1e9, -20),), noiseFloor=-100)
+
+Acquisitions return synthetic tones plus noise. With realTime=False every
+acquisition is ready as soon as it is requested, which isolates the cost of
+the Python conversion layer. With realTime=True, IQ and audio data arrive at
+the sample rate and spectrum traces and DPX frames at traceRate and
+dpxFrameRate. IQ streaming to IQSOD_FILE_SIQ and IQSOD_FILE_SIQ_SPLIT writes
+real SIQ files, once the file length has elapsed or IQSTREAM_Stop is called,
+and formatted IF streaming writes R3F files the same way.
+"""
+
+from ctypes import *
+from ctypes import _Pointer
+from os import path
+import ntpath
+from time import gmtime, perf_counter, sleep, strftime, time
+import numpy as np
+from RSA_API import *
+from rsa_api_r3f import R3F_SAMPLES_PER_FRAME, R3FWriter
+from rsa_api_siq import SIQWriter
+
+
+TIMESTAMP_RATE = 112000000
+MAX_SAMPLE_RATE = 56e6
+MAX_BANDWIDTH = 40e6
+MIN_BANDWIDTH = 100
+MAX_RECORD_LENGTH = 126000000
+MIN_CENTER_FREQ = 9e3
+MAX_CENTER_FREQ = 6.2e9
+AUDIO_SAMPLE_RATE = 32000
+DPX_BITMAP_HEIGHT = 201
+SOGRAM_BITMAP_WIDTH = 267
+SOGRAM_BITMAP_HEIGHT = 500
+IQSTREAM_BUFFER_COUNT = 16
+IF_SAMPLE_RATE = 112e6
+IF_CENTER_FREQ = 28e6
+
+
+"""################ARGUMENT CONVERSION################"""
+def _val(arg):
+    # Accepts plain Python values as well as c_int(), c_double(), etc.
+    return getattr(arg, 'value', arg)
+
+
+def _ref(arg):
+    # byref(x) and pointer(x) both resolve to x
+    if isinstance(arg, _Pointer):
+        return arg.contents
+    return getattr(arg, '_obj', arg)
+
+
+def _set(arg, value):
+    _ref(arg).value = value
+
+
+def _addr(arg):
+    arg = getattr(arg, '_as_parameter_', arg)
+    if isinstance(arg, int):
+        return arg
+    if isinstance(arg, c_void_p):
+        return arg.value
+    if isinstance(arg, _Pointer):
+        return cast(arg, c_void_p).value
+    return addressof(_ref(arg))
+
+
+def _array(arg, ctype, count):
+    # NumPy view over caller-owned memory (ctypes array, pointer or ndarray)
+    return np.ctypeslib.as_array(cast(_addr(arg), POINTER(ctype)), (count,))
+
+
+def _sample_rate(bandwidth):
+    sampleRate = MAX_SAMPLE_RATE
+    while sampleRate / 2 >= bandwidth * 1.4 and sampleRate > 2 * MIN_BANDWIDTH:
+        sampleRate /= 2
+    return sampleRate
+
+
+def _dbm_to_volts(dbm):
+    # Peak amplitude of a complex tone of the given power into 50 ohms
+    return np.sqrt(100 * 10 ** ((dbm - 30) / 10))
+
+
+def _requires_connection(func):
+    def wrapper(self, *args):
+        if self._deviceID is None:
+            return ReturnStatus.errorNotConnected.value
+        return func(self, *args)
+    wrapper.__name__ = func.__name__
+    return wrapper
+
+
+"""################SIMULATED DEVICE################"""
+class SimRSA:
+    def __init__(self, tones=((1e9, -20), (2.4453e9, -30)), noiseFloor=-100,
+                 realTime=False, traceRate=100, dpxFrameRate=25,
+                 serials=('B010101',), nomenclature='RSA306B', seed=None):
+        # tones are (absolute frequency in Hz, power in dBm) pairs
+        self.tones = list(tones)
+        self.noiseFloor = noiseFloor
+        self.realTime = realTime
+        self.traceRate = traceRate
+        self.dpxFrameRate = dpxFrameRate
+        self.serials = list(serials)
+        self.nomenclature = nomenclature
+        self._rng = np.random.RandomState(seed)
+        self._t0 = perf_counter()
+        self._deviceID = None
+        self._running = False
+        self._cache = {}
+        refTime = time()
+        self._refTime = (int(refTime), int((refTime % 1) * 1e9), 0)
+        self._refTimeSet = perf_counter()
+        self._preset()
+
+    def _preset(self):
+        self._centerFreq = 1.5e9
+        self._refLevel = 0.0
+        self._extRef = False
+        self._autoAtten = True
+        self._preamp = False
+        self._atten = 0.0
+
+        self._trigMode = TriggerMode.freeRun.value
+        self._trigSource = TriggerSource.TriggerSourceIFPowerLevel.value
+        self._trigTransition = TriggerTransition.TriggerTransitionLH.value
+        self._trigLevel = -10.0
+        self._trigPosPercent = 50.0
+        self._forceTrigger = False
+        self._trigEvent = (False, 0)
+
+        self._iqBandwidth = MAX_BANDWIDTH
+        self._recordLength = 1024
+        self._iqReadyAt = None
+        self._iqAcqInfo = (0, 0, 0, 0)
+
+        self._specEnable = False
+        self._specSettings = self._default_spectrum_settings()
+        self._traceTypes = self._default_trace_types()
+        self._traceReadyAt = None
+        self._traceInfo = (0, 0)
+        self._traceCount = 0
+
+        self._dpxEnable = False
+        self._dpxParams = (40e6, 300e3, 801, 1, VerticalUnitType.VerticalUnit_dBm.value,
+                           0.0, -100.0, False, 1.0, False)
+        self._dpxConfig = (True, True)
+        self._dpxSogramParams = (0.1, 0.01, 0.0, -100.0)
+        self._dpxFrameAt = None
+        self._dpxFrameCount = 0
+        self._dpxFFTCount = 0
+        self._dpxFrame = None
+
+        self._audioMode = AudioDemodMode.ADM_FM_8KHZ.value
+        self._audioVolume = 0.5
+        self._audioMute = False
+        self._audioFreqOffset = 0.0
+        self._audioStart = None
+        self._audioDelivered = 0
+
+        self._ifEnable = False
+        self._ifPath = b''
+        self._ifBase = b''
+        self._ifSuffix = IFSSDFN_SUFFIX_NONE.value
+        self._ifLength = 1000
+        self._ifCount = 1
+        self._ifMode = StreamingMode.StreamingModeFormatted.value
+        self._ifStart = None
+
+        self._iqsBandwidth = MAX_BANDWIDTH
+        self._iqsDest = IQSOUTDEST.IQSOD_CLIENT.value
+        self._iqsDtype = IQSOUTDTYPE.IQSODT_SINGLE.value
+        self._iqsBufferSize = 65536
+        self._iqsFilenameBase = b''
+        self._iqsSuffix = IQSSDFN_SUFFIX_NONE.value
+        self._iqsFileLength = 1000
+        self._iqsStart = None
+        self._iqsStartTimestamp = 0
+        self._iqsDelivered = 0
+        self._iqsStatus = 0
+        self._iqsFiles = []
+        self._iqsFileWritten = True
+        self._iqsTriggers = (c_int * IQSTRM_MAXTRIGGERS)()
+        self._iqsFilenames = None
+
+    def _default_spectrum_settings(self):
+        return {'span': 40e6, 'rbw': 300e3, 'enableVBW': False, 'vbw': 300e3,
+                'traceLength': 801,
+                'window': SpectrumWindows.SpectrumWindow_Kaiser.value,
+                'verticalUnit': SpectrumVerticalUnits.SpectrumVerticalUnit_dBm.value}
+
+    def _timestamp(self):
+        return int((perf_counter() - self._t0) * TIMESTAMP_RATE)
+
+    def _pace(self, duration):
+        return perf_counter() + (duration if self.realTime else 0)
+
+    def _wait(self, readyAt, timeoutMsec, ready):
+        # Blocks like the DLL: up to timeoutMsec, returning early once ready
+        timeout = _val(timeoutMsec) / 1000
+        if readyAt is None or not self._running:
+            sleep(timeout)
+            _set(ready, False)
+            return ReturnStatus.noError.value
+        remaining = readyAt - perf_counter()
+        if remaining > timeout:
+            sleep(timeout)
+            _set(ready, False)
+        else:
+            if remaining > 0:
+                sleep(remaining)
+            _set(ready, True)
+        return ReturnStatus.noError.value
+
+    def _triggered(self, bandwidth):
+        # Whether an IF power trigger would fire with the current signal
+        if self._trigMode == TriggerMode.freeRun.value or self._forceTrigger:
+            return True
+        if self._trigSource != TriggerSource.TriggerSourceIFPowerLevel.value:
+            return False
+        power = max([p for f, p in self.tones
+                     if abs(f - self._centerFreq) <= bandwidth / 2] + [self.noiseFloor])
+        return power >= self._trigLevel
+
+    """################SIGNAL MODEL################"""
+    def _power_spectrum(self, freq, rbw):
+        # Power in mW per bin of an ideal analyzer with a Gaussian RBW filter
+        power = np.full(len(freq), 10 ** (self.noiseFloor / 10))
+        sigma = max(rbw, 1) / 2.355
+        for toneFreq, tonePower in self.tones:
+            power += 10 ** (tonePower / 10) * np.exp(-0.5 * ((freq - toneFreq) / sigma) ** 2)
+        return power
+
+    def _trace_pool(self):
+        s = self._specSettings
+        key = ('trace', self._centerFreq, s['span'], s['rbw'], s['traceLength'],
+               s['verticalUnit'], tuple(self.tones), self.noiseFloor)
+        if key not in self._cache:
+            freq = np.linspace(self._centerFreq - s['span'] / 2,
+                               self._centerFreq + s['span'] / 2, s['traceLength'])
+            jitter = self._rng.normal(0, 1, (16, s['traceLength']))
+            pool = 10 * np.log10(self._power_spectrum(freq, s['rbw'])) + jitter
+            if s['verticalUnit'] == SpectrumVerticalUnits.SpectrumVerticalUnit_Watt.value:
+                pool = 10 ** ((pool - 30) / 10)
+            self._cache[key] = pool.astype(np.float32)
+        return self._cache[key]
+
+    def _iq_pool(self, sampleRate, length):
+        # Synthetic complex baseband, padded so blocks can start at an offset
+        key = ('iq', self._centerFreq, sampleRate, length, tuple(self.tones),
+               self.noiseFloor)
+        if key not in self._cache:
+            n = length + 8192
+            t = np.arange(n) / sampleRate
+            iq = _dbm_to_volts(self.noiseFloor) * np.sqrt(sampleRate / 1e6) / np.sqrt(2) * (
+                self._rng.standard_normal(n) + 1j * self._rng.standard_normal(n))
+            for toneFreq, tonePower in self.tones:
+                offset = toneFreq - self._centerFreq
+                if abs(offset) < sampleRate / 2:
+                    iq += _dbm_to_volts(tonePower) * np.exp(2j * np.pi * offset * t)
+            self._cache[key] = iq.astype(np.complex64)
+        return self._cache[key]
+
+    def _iq_block(self, sampleRate, length, start=None):
+        pool = self._iq_pool(sampleRate, length)
+        if start is None:
+            start = self._rng.randint(0, len(pool) - length)
+        return pool[start:start + length]
+
+    """################DEVICE CONNECTION AND INFO################"""
+    def DEVICE_GetErrorString(self, status):
+        if _val(status) == 0:
+            return b'No Error'
+        try:
+            return ReturnStatus(_val(status)).name.encode()
+        except ValueError:
+            return b'Unknown Error'
+
+    def DEVICE_GetAPIVersion(self, apiVersion):
+        _ref(apiVersion).value = b'3.9.0029 (simulated)'
+        return ReturnStatus.noError.value
+
+    def DEVICE_Search(self, numDevicesFound, deviceIDs, deviceSerial, deviceType):
+        numDevices = min(len(self.serials), DEVSRCH_MAX_NUM_DEVICES)
+        _set(numDevicesFound, numDevices)
+        ids = _array(deviceIDs, c_int, numDevices)
+        ids[:] = np.arange(numDevices)
+        # Serials and types are fixed-width C string tables; a caller that
+        # passes a single string buffer only receives the first entry
+        serialBuf, typeBuf = _ref(deviceSerial), _ref(deviceType)
+        for i, serial in enumerate(self.serials[:numDevices]):
+            if (i + 1) * DEVSRCH_SERIAL_MAX_STRLEN <= sizeof(serialBuf) or i == 0:
+                memmove(addressof(serialBuf) + i * DEVSRCH_SERIAL_MAX_STRLEN,
+                        serial.encode() + b'\0', len(serial) + 1)
+            if (i + 1) * DEVSRCH_TYPE_MAX_STRLEN <= sizeof(typeBuf) or i == 0:
+                memmove(addressof(typeBuf) + i * DEVSRCH_TYPE_MAX_STRLEN,
+                        self.nomenclature.encode() + b'\0', len(self.nomenclature) + 1)
+        return ReturnStatus.noError.value
+
+    def DEVICE_Connect(self, deviceID):
+        deviceID = _val(deviceID)
+        if not 0 <= deviceID < len(self.serials):
+            return ReturnStatus.errorNotConnected.value
+        self._deviceID = deviceID
+        return ReturnStatus.noError.value
+
+    def DEVICE_Reset(self, deviceID):
+        self._deviceID = None
+        self._running = False
+        return ReturnStatus.noError.value
+
+    def DEVICE_Disconnect(self):
+        self._deviceID = None
+        self._running = False
+        self._preset()
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DEVICE_GetSerialNumber(self, serialNum):
+        _ref(serialNum).value = self.serials[self._deviceID].encode()
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DEVICE_GetNomenclature(self, nomenclature):
+        _ref(nomenclature).value = self.nomenclature.encode()
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DEVICE_GetFWVersion(self, fwVersion):
+        _ref(fwVersion).value = b'V1.7 (simulated)'
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DEVICE_GetFPGAVersion(self, fpgaVersion):
+        _ref(fpgaVersion).value = b'V2.1 (simulated)'
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DEVICE_GetHWVersion(self, hwVersion):
+        _ref(hwVersion).value = b'V7 (simulated)'
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DEVICE_GetInfo(self, devInfo):
+        info = _ref(devInfo)
+        info.nomenclature = self.nomenclature.encode()
+        info.serialNum = self.serials[self._deviceID].encode()
+        info.apiVersion = b'3.9.0029 (simulated)'
+        info.fwVersion = b'V1.7 (simulated)'
+        info.fpgaVersion = b'V2.1 (simulated)'
+        info.hwVersion = b'V7 (simulated)'
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DEVICE_GetOverTemperatureStatus(self, overTemperature):
+        _set(overTemperature, False)
+        return ReturnStatus.noError.value
+
+    """################DEVICE CONFIGURATION################"""
+    @_requires_connection
+    def CONFIG_Preset(self):
+        self._running = False
+        self._preset()
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_SetReferenceLevel(self, refLevel):
+        self._refLevel = float(_val(refLevel))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_GetReferenceLevel(self, refLevel):
+        _set(refLevel, self._refLevel)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_GetMaxCenterFreq(self, maxCF):
+        _set(maxCF, MAX_CENTER_FREQ)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_GetMinCenterFreq(self, minCF):
+        _set(minCF, MIN_CENTER_FREQ)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_SetCenterFreq(self, cf):
+        cf = float(_val(cf))
+        if not MIN_CENTER_FREQ <= cf <= MAX_CENTER_FREQ:
+            return ReturnStatus.errorFrequencyOutOfRange.value
+        self._centerFreq = cf
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_GetCenterFreq(self, cf):
+        _set(cf, self._centerFreq)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_SetExternalRefEnable(self, exRefEn):
+        self._extRef = bool(_val(exRefEn))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_GetExternalRefEnable(self, exRefEn):
+        _set(exRefEn, self._extRef)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_GetExternalRefFrequency(self, extFreq):
+        if not self._extRef:
+            return ReturnStatus.errorExternalReferenceNotEnabled.value
+        _set(extFreq, 10e6)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_SetAutoAttenuationEnable(self, enable):
+        self._autoAtten = bool(_val(enable))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_GetAutoAttenuationEnable(self, enable):
+        _set(enable, self._autoAtten)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_SetRFPreampEnable(self, enable):
+        self._preamp = bool(_val(enable))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_GetRFPreampEnable(self, enable):
+        _set(enable, self._preamp)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_SetRFAttenuator(self, value):
+        self._atten = float(_val(value))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def CONFIG_GetRFAttenuator(self, value):
+        _set(value, self._atten)
+        return ReturnStatus.noError.value
+
+    """################TRIGGER CONFIGURATION################"""
+    @_requires_connection
+    def TRIG_SetTriggerMode(self, mode):
+        self._trigMode = _val(mode)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def TRIG_GetTriggerMode(self, mode):
+        _set(mode, self._trigMode)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def TRIG_SetTriggerSource(self, source):
+        self._trigSource = _val(source)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def TRIG_GetTriggerSource(self, source):
+        _set(source, self._trigSource)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def TRIG_SetTriggerTransition(self, transition):
+        self._trigTransition = _val(transition)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def TRIG_GetTriggerTransition(self, transition):
+        _set(transition, self._trigTransition)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def TRIG_SetIFPowerTriggerLevel(self, level):
+        self._trigLevel = float(_val(level))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def TRIG_GetIFPowerTriggerLevel(self, level):
+        _set(level, self._trigLevel)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def TRIG_SetTriggerPositionPercent(self, trigPosPercent):
+        trigPosPercent = float(_val(trigPosPercent))
+        if not 1 <= trigPosPercent <= 99:
+            return ReturnStatus.errorParameter.value
+        self._trigPosPercent = trigPosPercent
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def TRIG_GetTriggerPositionPercent(self, trigPosPercent):
+        _set(trigPosPercent, self._trigPosPercent)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def TRIG_ForceTrigger(self):
+        self._forceTrigger = True
+        if self._iqReadyAt == float('inf'):
+            self._iqReadyAt = self._pace(self._recordLength / _sample_rate(self._iqBandwidth))
+        return ReturnStatus.noError.value
+
+    """################ALIGNMENT################"""
+    @_requires_connection
+    def ALIGN_GetWarmupStatus(self, warmedUp):
+        _set(warmedUp, True)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def ALIGN_GetAlignmentNeeded(self, needed):
+        _set(needed, False)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def ALIGN_RunAlignment(self):
+        return ReturnStatus.noError.value
+
+    """################DEVICE OPERATION################"""
+    @_requires_connection
+    def DEVICE_GetEnable(self, enable):
+        _set(enable, self._running)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DEVICE_Run(self):
+        if not self._running:
+            self._running = True
+            self._dpxFrameAt = self._pace(1 / self.dpxFrameRate) if self._dpxEnable else None
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DEVICE_PrepareForRun(self):
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DEVICE_StartFrameTransfer(self):
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DEVICE_Stop(self):
+        self._running = False
+        self._iqReadyAt = None
+        self._traceReadyAt = None
+        self._dpxFrameAt = None
+        self._iqsStart = None
+        self._ifStart = None
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DEVICE_GetEventStatus(self, eventID, eventOccurred, eventTimestamp):
+        occurred, timestamp = False, 0
+        if _val(eventID) == DEVEVENT_TRIGGER.value:
+            occurred, timestamp = self._trigEvent
+            self._trigEvent = (False, 0)
+        _set(eventOccurred, occurred)
+        _set(eventTimestamp, timestamp)
+        return ReturnStatus.noError.value
+
+    """################SYSTEM/REFERENCE TIME################"""
+    def REFTIME_GetTimestampRate(self, o_refTimestampRate):
+        _set(o_refTimestampRate, TIMESTAMP_RATE)
+        return ReturnStatus.noError.value
+
+    def REFTIME_GetCurrentTime(self, o_timeSec, o_timeNsec, o_timestamp):
+        timestamp = self._timestamp()
+        sec, nsec = self._time_from_timestamp(timestamp)
+        _set(o_timeSec, sec)
+        _set(o_timeNsec, nsec)
+        _set(o_timestamp, timestamp)
+        return ReturnStatus.noError.value
+
+    def _time_from_timestamp(self, timestamp):
+        refSec, refNsec, refTimestamp = self._refTime
+        nsec = refNsec + (timestamp - refTimestamp) * 1000000000 // TIMESTAMP_RATE
+        return refSec + nsec // 1000000000, nsec % 1000000000
+
+    def REFTIME_GetTimeFromTimestamp(self, i_timestamp, o_timeSec, o_timeNsec):
+        sec, nsec = self._time_from_timestamp(_val(i_timestamp))
+        _set(o_timeSec, sec)
+        _set(o_timeNsec, nsec)
+        return ReturnStatus.noError.value
+
+    def REFTIME_GetTimestampFromTime(self, i_timeSec, i_timeNsec, o_timestamp):
+        refSec, refNsec, refTimestamp = self._refTime
+        nsec = (_val(i_timeSec) - refSec) * 1000000000 + _val(i_timeNsec) - refNsec
+        _set(o_timestamp, refTimestamp + nsec * TIMESTAMP_RATE // 1000000000)
+        return ReturnStatus.noError.value
+
+    def REFTIME_GetIntervalSinceRefTimeSet(self, sec):
+        _set(sec, perf_counter() - self._refTimeSet)
+        return ReturnStatus.noError.value
+
+    def REFTIME_SetReferenceTime(self, refTimeSec, refTimeNsec, refTimestamp):
+        self._refTime = (_val(refTimeSec), _val(refTimeNsec), _val(refTimestamp))
+        self._refTimeSet = perf_counter()
+        return ReturnStatus.noError.value
+
+    def REFTIME_GetReferenceTime(self, refTimeSec, refTimeNsec, refTimestamp):
+        _set(refTimeSec, self._refTime[0])
+        _set(refTimeNsec, self._refTime[1])
+        _set(refTimestamp, self._refTime[2])
+        return ReturnStatus.noError.value
+
+    """################IQ BLOCK################"""
+    @_requires_connection
+    def IQBLK_GetMaxIQBandwidth(self, maxBandwidth):
+        _set(maxBandwidth, MAX_BANDWIDTH)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQBLK_GetMinIQBandwidth(self, minBandwidth):
+        _set(minBandwidth, MIN_BANDWIDTH)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQBLK_GetMaxIQRecordLength(self, maxSamples):
+        _set(maxSamples, MAX_RECORD_LENGTH)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQBLK_SetIQBandwidth(self, iqBandwidth):
+        iqBandwidth = float(_val(iqBandwidth))
+        if not MIN_BANDWIDTH <= iqBandwidth <= MAX_BANDWIDTH:
+            return ReturnStatus.errorParameter.value
+        self._iqBandwidth = iqBandwidth
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQBLK_GetIQBandwidth(self, iqBandwidth):
+        _set(iqBandwidth, self._iqBandwidth)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQBLK_GetIQSampleRate(self, iqSampleRate):
+        _set(iqSampleRate, _sample_rate(self._iqBandwidth))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQBLK_SetIQRecordLength(self, recordLength):
+        recordLength = int(_val(recordLength))
+        if not 2 <= recordLength <= MAX_RECORD_LENGTH:
+            return ReturnStatus.errorParameter.value
+        self._recordLength = recordLength
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQBLK_GetIQRecordLength(self, recordLength):
+        _set(recordLength, self._recordLength)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQBLK_AcquireIQData(self):
+        sampleRate = _sample_rate(self._iqBandwidth)
+        self._forceTrigger = False
+        if self._triggered(self._iqBandwidth):
+            self._iqReadyAt = self._pace(self._recordLength / sampleRate)
+        else:
+            self._iqReadyAt = float('inf')
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQBLK_WaitForIQDataReady(self, timeoutMsec, ready):
+        return self._wait(self._iqReadyAt, timeoutMsec, ready)
+
+    def _iq_acquisition(self, reqLength):
+        if self._iqReadyAt is None or self._iqReadyAt > perf_counter():
+            return None
+        if not 0 < reqLength <= self._recordLength:
+            return None
+        sampleRate = _sample_rate(self._iqBandwidth)
+        timestamp = self._timestamp() - int(self._recordLength / sampleRate * TIMESTAMP_RATE)
+        if self._trigMode == TriggerMode.triggered.value:
+            trigIndex = int(self._recordLength * self._trigPosPercent / 100)
+            trigTimestamp = timestamp + int(trigIndex / sampleRate * TIMESTAMP_RATE)
+            self._trigEvent = (True, trigTimestamp)
+        else:
+            trigIndex, trigTimestamp = 0, 0
+        self._iqAcqInfo = (timestamp, trigIndex, trigTimestamp, 0)
+        return self._iq_block(sampleRate, reqLength)
+
+    @_requires_connection
+    def IQBLK_GetIQData(self, iqData, outLength, reqLength):
+        reqLength = _val(reqLength)
+        block = self._iq_acquisition(reqLength)
+        if block is None:
+            return ReturnStatus.errorDataNotReady.value
+        _array(iqData, c_float, 2 * reqLength)[:] = block.view(np.float32)
+        _set(outLength, reqLength)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQBLK_GetIQDataDeinterleaved(self, iData, qData, outLength, reqLength):
+        reqLength = _val(reqLength)
+        block = self._iq_acquisition(reqLength)
+        if block is None:
+            return ReturnStatus.errorDataNotReady.value
+        _array(iData, c_float, reqLength)[:] = block.real
+        _array(qData, c_float, reqLength)[:] = block.imag
+        _set(outLength, reqLength)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQBLK_GetIQDataCplx(self, iqData, outLength, reqLength):
+        reqLength = _val(reqLength)
+        block = self._iq_acquisition(reqLength)
+        if block is None:
+            return ReturnStatus.errorDataNotReady.value
+        _array(iqData, c_float, 2 * reqLength)[:] = block.view(np.float32)
+        _set(outLength, reqLength)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQBLK_GetIQAcqInfo(self, acqInfo):
+        info = _ref(acqInfo)
+        (info.sample0Timestamp, info.triggerSampleIndex,
+         info.triggerTimestamp, info.acqStatus) = self._iqAcqInfo
+        return ReturnStatus.noError.value
+
+    """################SPECTRUM################"""
+    @_requires_connection
+    def SPECTRUM_SetEnable(self, enable):
+        self._specEnable = bool(_val(enable))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def SPECTRUM_GetEnable(self, enable):
+        _set(enable, self._specEnable)
+        return ReturnStatus.noError.value
+
+    def _default_trace_types(self):
+        return [(True, SpectrumDetectors.SpectrumDetector_PosPeak.value),
+                (False, SpectrumDetectors.SpectrumDetector_PosPeak.value),
+                (False, SpectrumDetectors.SpectrumDetector_PosPeak.value)]
+
+    @_requires_connection
+    def SPECTRUM_SetDefault(self):
+        # Resets the trace enables and detectors too
+        self._specSettings = self._default_spectrum_settings()
+        self._traceTypes = self._default_trace_types()
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def SPECTRUM_SetSettings(self, settings):
+        settings = _ref(settings)
+        newSettings = {}
+        for name in self._specSettings:
+            newSettings[name] = _val(settings[name] if isinstance(settings, dict)
+                                     else getattr(settings, name))
+        if newSettings['span'] < newSettings['rbw']:
+            return ReturnStatus.errorSpanIsLessThanRBW.value
+        if newSettings['span'] > MAX_BANDWIDTH or newSettings['traceLength'] < 3:
+            return ReturnStatus.errorParameter.value
+        self._specSettings = newSettings
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def SPECTRUM_GetSettings(self, settings):
+        settings = _ref(settings)
+        s = self._specSettings
+        for name, value in s.items():
+            setattr(settings, name, value)
+        settings.actualStartFreq = self._centerFreq - s['span'] / 2
+        settings.actualStopFreq = self._centerFreq + s['span'] / 2
+        settings.actualFreqStepSize = s['span'] / (s['traceLength'] - 1)
+        settings.actualRBW = s['rbw']
+        settings.actualVBW = s['vbw'] if s['enableVBW'] else 0
+        settings.actualNumIQSamples = int(2.5 * _sample_rate(s['span']) / s['rbw'])
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def SPECTRUM_SetTraceType(self, trace, enable, detector):
+        self._traceTypes[_val(trace)] = (bool(_val(enable)), _val(detector))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def SPECTRUM_GetTraceType(self, trace, enable, detector):
+        traceEnable, traceDetector = self._traceTypes[_val(trace)]
+        _set(enable, traceEnable)
+        _set(detector, traceDetector)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def SPECTRUM_GetLimits(self, limits):
+        limits = _ref(limits)
+        limits.maxSpan, limits.minSpan = MAX_BANDWIDTH, 1e3
+        limits.maxRBW, limits.minRBW = 10e6, 10
+        limits.maxVBW, limits.minVBW = 10e6, 1
+        limits.maxTraceLength, limits.minTraceLength = 64001, 801
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def SPECTRUM_AcquireTrace(self):
+        if not self._specEnable:
+            return ReturnStatus.errorMeasurementNotEnabled.value
+        self._traceReadyAt = self._pace(1 / self.traceRate)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def SPECTRUM_WaitForTraceReady(self, timeoutMsec, ready):
+        return self._wait(self._traceReadyAt, timeoutMsec, ready)
+
+    # Name used by rsa_api_full_example.py
+    SPECTRUM_WaitForDataReady = SPECTRUM_WaitForTraceReady
+
+    @_requires_connection
+    def SPECTRUM_GetTrace(self, trace, maxTracePoints, traceData, outTracePoints):
+        if self._traceReadyAt is None or self._traceReadyAt > perf_counter():
+            return ReturnStatus.errorDataNotReady.value
+        pool = self._trace_pool()
+        numPoints = min(_val(maxTracePoints), pool.shape[1])
+        _array(traceData, c_float, numPoints)[:] = pool[self._traceCount % len(pool), :numPoints]
+        _set(outTracePoints, numPoints)
+        self._traceCount += 1
+        self._traceInfo = (self._timestamp(), 0)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def SPECTRUM_GetTraceInfo(self, traceInfo):
+        info = _ref(traceInfo)
+        info.timestamp, info.acqDataStatus = self._traceInfo
+        return ReturnStatus.noError.value
+
+    """################DPX################"""
+    @_requires_connection
+    def DPX_GetEnable(self, enable):
+        _set(enable, self._dpxEnable)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_SetEnable(self, enable):
+        self._dpxEnable = bool(_val(enable))
+        if self._dpxEnable and self._running:
+            self._dpxFrameAt = self._pace(1 / self.dpxFrameRate)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_SetParameters(self, fspan, rbw, bitmapWidth, tracePtsPerPixel, yUnit,
+                          yTop, yBottom, infinitePersistence, persistenceTimeSec,
+                          showOnlyTrigFrame):
+        params = tuple(_val(a) for a in (fspan, rbw, bitmapWidth, tracePtsPerPixel, yUnit,
+                                         yTop, yBottom, infinitePersistence,
+                                         persistenceTimeSec, showOnlyTrigFrame))
+        if params[3] not in (1, 3, 5) or not 1 <= params[2] <= 801:
+            return ReturnStatus.errorParameter.value
+        self._dpxParams = params
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_Configure(self, enableSpectrum, enableSpectrogram):
+        self._dpxConfig = (bool(_val(enableSpectrum)), bool(_val(enableSpectrogram)))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_GetSettings(self, pSettings):
+        settings = _ref(pSettings)
+        settings.enableSpectrum, settings.enableSpectrogram = self._dpxConfig
+        settings.bitmapWidth = self._dpxParams[2]
+        settings.bitmapHeight = DPX_BITMAP_HEIGHT
+        settings.traceLength = self._dpxParams[2] * self._dpxParams[3]
+        settings.decayFactor = 1 / max(self._dpxParams[8], 1e-3)
+        settings.actualRBW = self._dpxParams[1]
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_SetSpectrumTraceType(self, traceIndex, type):
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_GetRBWRange(self, fspan, minRBW, maxRBW):
+        _set(minRBW, _val(fspan) / 10000)
+        _set(maxRBW, _val(fspan) / 100)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_Reset(self):
+        self._dpxFrameCount = 0
+        self._dpxFFTCount = 0
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_IsFrameBufferAvailable(self, frameAvailable):
+        _set(frameAvailable, self._running and self._dpxFrameAt is not None
+             and self._dpxFrameAt <= perf_counter())
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_WaitForDataReady(self, timeoutMsec, ready):
+        return self._wait(self._dpxFrameAt, timeoutMsec, ready)
+
+    @_requires_connection
+    def DPX_GetFrameInfo(self, frameCount, fftCount):
+        _set(frameCount, self._dpxFrameCount)
+        _set(fftCount, self._dpxFFTCount)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_SetSogramParameters(self, timePerBitmapLine, timeResolution, maxPower, minPower):
+        self._dpxSogramParams = tuple(float(_val(a)) for a in (
+            timePerBitmapLine, timeResolution, maxPower, minPower))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_SetSogramTraceType(self, traceType):
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_GetSogramSettings(self, pSettings):
+        settings = _ref(pSettings)
+        settings.bitmapWidth = SOGRAM_BITMAP_WIDTH
+        settings.bitmapHeight = SOGRAM_BITMAP_HEIGHT
+        settings.sogramTraceLineTime = self._dpxSogramParams[1]
+        settings.sogramBitmapLineTime = self._dpxSogramParams[0]
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_GetSogramHiResLineCountLatest(self, lineCount):
+        _set(lineCount, min(self._dpxFrameCount, SOGRAM_BITMAP_HEIGHT))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_GetSogramHiResLineTriggered(self, triggered, lineIndex):
+        _set(triggered, False)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_GetSogramHiResLineTimestamp(self, timestamp, lineIndex):
+        _set(timestamp, self._timestamp() / TIMESTAMP_RATE
+             - _val(lineIndex) * self._dpxSogramParams[1])
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_GetSogramHiResLine(self, vData, vDataSize, lineIndex, dataSF, tracePoints,
+                               firstValidPoint):
+        tracePoints = _val(tracePoints)
+        line = self._dpx_pool()['sogram'][0, :tracePoints]
+        _array(vData, c_int16, tracePoints)[:] = line.astype(np.int16) * 100
+        _set(vDataSize, tracePoints)
+        _set(dataSF, 0.01)
+        return ReturnStatus.noError.value
+
+    def _dpx_pool(self):
+        fspan, rbw, width, ptsPerPixel, yUnit, yTop, yBottom = self._dpxParams[:7]
+        maxPower, minPower = self._dpxSogramParams[2:]
+        key = ('dpx', self._centerFreq, self._dpxParams, self._dpxSogramParams,
+               tuple(self.tones), self.noiseFloor)
+        if key not in self._cache:
+            traceLength = width * ptsPerPixel
+            freq = np.linspace(self._centerFreq - fspan / 2,
+                               self._centerFreq + fspan / 2, traceLength)
+            levels = 10 * np.log10(self._power_spectrum(freq, rbw))
+            bitmaps = np.zeros((4, DPX_BITMAP_HEIGHT, width), dtype=np.float32)
+            columnLevels = levels[::ptsPerPixel][:width]
+            for frame in range(len(bitmaps)):
+                jitter = columnLevels + self._rng.normal(0, 1, width)
+                rows = np.round((yTop - jitter) / (yTop - yBottom) * (DPX_BITMAP_HEIGHT - 1))
+                rows = np.clip(rows, 0, DPX_BITMAP_HEIGHT - 1).astype(int)
+                bitmaps[frame, rows, np.arange(width)] = 100
+                bitmaps[frame, np.clip(rows + 1, 0, DPX_BITMAP_HEIGHT - 1), np.arange(width)] += 25
+                bitmaps[frame, np.clip(rows - 1, 0, DPX_BITMAP_HEIGHT - 1), np.arange(width)] += 25
+            # Max hold, min hold and average in Watts
+            traces = np.empty((3, traceLength), dtype=np.float32)
+            for i, offset in enumerate((3, -3, 0)):
+                traces[i] = 10 ** ((levels + offset - 30) / 10)
+            sogramLevels = 10 * np.log10(self._power_spectrum(np.linspace(
+                self._centerFreq - fspan / 2, self._centerFreq + fspan / 2,
+                SOGRAM_BITMAP_WIDTH), rbw))
+            sogram = (sogramLevels - minPower) / max(maxPower - minPower, 1e-3) * 255
+            sogram = sogram + self._rng.normal(0, 4, (SOGRAM_BITMAP_HEIGHT, SOGRAM_BITMAP_WIDTH))
+            self._cache[key] = {'bitmaps': bitmaps, 'traces': traces,
+                                'sogram': np.clip(sogram, 0, 255).astype(np.uint8)}
+        return self._cache[key]
+
+    @_requires_connection
+    def DPX_GetFrameBuffer(self, frameBuffer):
+        if not self._running or self._dpxFrameAt is None or self._dpxFrameAt > perf_counter():
+            return ReturnStatus.errorDataNotReady.value
+        pool = self._dpx_pool()
+        width, ptsPerPixel = self._dpxParams[2:4]
+        self._dpxFrameCount += 1
+        fftPerFrame = 100
+        self._dpxFFTCount += fftPerFrame
+
+        # The frame buffer points into simulator-owned memory that stays
+        # valid until the next DPX_GetFrameBuffer call, like the DLL's
+        bitmap = pool['bitmaps'][self._dpxFrameCount % len(pool['bitmaps'])]
+        traces = pool['traces']
+        tracePtrs = (POINTER(c_float) * 3)(*[t.ctypes.data_as(POINTER(c_float)) for t in traces])
+        sogram = pool['sogram']
+        numValidLines = min(self._dpxFrameCount, SOGRAM_BITMAP_HEIGHT)
+        timestamps = np.full(SOGRAM_BITMAP_HEIGHT, self._timestamp() / TIMESTAMP_RATE)
+        triggers = np.zeros(SOGRAM_BITMAP_HEIGHT)
+        self._dpxFrame = (bitmap, traces, tracePtrs, sogram, timestamps, triggers)
+
+        fb = _ref(frameBuffer)
+        fb.fftPerFrame = fftPerFrame
+        fb.fftCount = self._dpxFFTCount
+        fb.frameCount = self._dpxFrameCount
+        fb.timestamp = self._timestamp() / TIMESTAMP_RATE
+        fb.acqDataStatus = 0
+        fb.minSigDuration = 1e-5
+        fb.minSigDurOutOfRange = False
+        fb.spectrumBitmapWidth = width
+        fb.spectrumBitmapHeight = DPX_BITMAP_HEIGHT
+        fb.spectrumBitmapSize = width * DPX_BITMAP_HEIGHT
+        fb.spectrumTraceLength = width * ptsPerPixel
+        fb.numSpectrumTraces = 3
+        fb.spectrumEnabled, fb.spectrogramEnabled = self._dpxConfig
+        fb.spectrumBitmap = bitmap.ctypes.data_as(POINTER(c_float))
+        fb.spectrumTraces = cast(tracePtrs, POINTER(POINTER(c_float)))
+        fb.sogramBitmapWidth = SOGRAM_BITMAP_WIDTH
+        fb.sogramBitmapHeight = SOGRAM_BITMAP_HEIGHT
+        fb.sogramBitmapSize = SOGRAM_BITMAP_WIDTH * SOGRAM_BITMAP_HEIGHT
+        fb.sogramBitmapNumValidLines = numValidLines
+        fb.sogramBitmap = sogram.ctypes.data_as(POINTER(c_uint8))
+        fb.sogramBitmapTimestampArray = timestamps.ctypes.data_as(POINTER(c_double))
+        fb.sogramBitmapContainTriggerArray = triggers.ctypes.data_as(POINTER(c_double))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def DPX_FinishFrameBuffer(self):
+        if self._running and self._dpxEnable:
+            self._dpxFrameAt = self._pace(1 / self.dpxFrameRate)
+        return ReturnStatus.noError.value
+
+    """################AUDIO################"""
+    @_requires_connection
+    def AUDIO_SetMode(self, mode):
+        self._audioMode = _val(mode)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def AUDIO_GetMode(self, mode):
+        _set(mode, self._audioMode)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def AUDIO_SetVolume(self, volume):
+        self._audioVolume = min(max(float(_val(volume)), 0), 1)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def AUDIO_GetVolume(self, _volume):
+        _set(_volume, self._audioVolume)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def AUDIO_SetMute(self, mute):
+        self._audioMute = bool(_val(mute))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def AUDIO_GetMute(self, _mute):
+        _set(_mute, self._audioMute)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def AUDIO_SetFrequencyOffset(self, freqOffsetHz):
+        self._audioFreqOffset = float(_val(freqOffsetHz))
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def AUDIO_GetFrequencyOffset(self, freqOffsetHz):
+        _set(freqOffsetHz, self._audioFreqOffset)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def AUDIO_Start(self):
+        self._audioStart = perf_counter()
+        self._audioDelivered = 0
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def AUDIO_Stop(self):
+        self._audioStart = None
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def AUDIO_GetEnable(self, enable):
+        _set(enable, self._audioStart is not None)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def AUDIO_GetData(self, data, inSize, outSize):
+        inSize = _val(inSize)
+        if self._audioStart is None:
+            _set(outSize, 0)
+            return ReturnStatus.noError.value
+        if self.realTime:
+            available = int((perf_counter() - self._audioStart) * AUDIO_SAMPLE_RATE)
+            count = max(min(inSize, available - self._audioDelivered), 0)
+        else:
+            count = inSize
+        n = np.arange(self._audioDelivered, self._audioDelivered + count)
+        level = 0 if self._audioMute else self._audioVolume * 16000
+        _array(data, c_int16, count)[:] = level * np.sin(2 * np.pi * 1e3 * n / AUDIO_SAMPLE_RATE)
+        self._audioDelivered += count
+        _set(outSize, count)
+        return ReturnStatus.noError.value
+
+    """################IF STREAMING################"""
+    @_requires_connection
+    def IFSTREAM_SetDiskFileMode(self, mode):
+        self._ifMode = _val(mode)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IFSTREAM_SetDiskFilePath(self, path):
+        self._ifPath = _val(path)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IFSTREAM_SetDiskFilenameBase(self, base):
+        self._ifBase = _val(base)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IFSTREAM_SetDiskFilenameSuffix(self, suffixCtl):
+        self._ifSuffix = _val(suffixCtl)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IFSTREAM_SetDiskFileLength(self, msec):
+        self._ifLength = _val(msec)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IFSTREAM_SetDiskFileCount(self, count):
+        self._ifCount = _val(count)
+        return ReturnStatus.noError.value
+
+    def _if_pool(self):
+        # Real ADC samples at the IF. Tones sit on whole cycles of the pool
+        # so it can be repeated without phase jumps.
+        n = R3F_SAMPLES_PER_FRAME * 16
+        key = ('if', self._centerFreq, self._refLevel, tuple(self.tones), self.noiseFloor)
+        if key not in self._cache:
+            t = np.arange(n) / IF_SAMPLE_RATE
+            adc = _dbm_to_volts(self.noiseFloor) * np.sqrt(IF_SAMPLE_RATE / 2e6) * \
+                self._rng.standard_normal(n)
+            for toneFreq, tonePower in self.tones:
+                ifFreq = IF_CENTER_FREQ + toneFreq - self._centerFreq
+                if 0 < ifFreq < IF_SAMPLE_RATE / 2:
+                    ifFreq = round(ifFreq * n / IF_SAMPLE_RATE) * IF_SAMPLE_RATE / n
+                    adc += _dbm_to_volts(tonePower) * np.cos(2 * np.pi * ifFreq * t)
+            scale = self._if_scale_factor()
+            self._cache[key] = np.clip(np.round(adc / scale), -32768, 32767).astype(np.int16)
+        return self._cache[key]
+
+    def _if_scale_factor(self):
+        return _dbm_to_volts(self._refLevel + 10) / 32767
+
+    def _if_write_files(self):
+        # Writes the files a formatted IF stream of the configured length
+        # and count produces
+        if self._ifStart is None or self._ifMode != StreamingMode.StreamingModeFormatted.value:
+            return
+        start, self._ifStart = self._ifStartTimestamp, None
+        pool = self._if_pool()
+        framesPerFile = int(np.ceil(self._ifLength / 1000 * IF_SAMPLE_RATE
+                                    / R3F_SAMPLES_PER_FRAME))
+        directory = self._ifPath.decode() if isinstance(self._ifPath, bytes) else self._ifPath
+        base = self._ifBase.decode() if isinstance(self._ifBase, bytes) else self._ifBase
+        # Windows paths keep their separators, as they do on the analyzer
+        join = ntpath.join if '\\' in directory else path.join
+        refSec, refNsec = self._time_from_timestamp(start)
+        refTime = tuple(gmtime(refSec)[:6]) + (refNsec,)
+        for fileIndex in range(self._ifCount):
+            if self._ifSuffix == IFSSDFN_SUFFIX_TIMESTAMP.value:
+                suffix = strftime('-%Y.%m.%d.%H.%M.%S', gmtime(refSec))
+            elif self._ifSuffix >= IFSSDFN_SUFFIX_INCRINDEX_MIN.value:
+                suffix = '-{:05d}'.format(self._ifSuffix + fileIndex)
+            else:
+                suffix = ''
+            with R3FWriter(join(directory, base + suffix + '.r3f'), self._centerFreq,
+                           self._refLevel, IF_CENTER_FREQ, IF_SAMPLE_RATE, MAX_BANDWIDTH,
+                           self._if_scale_factor(), refTime, start, TIMESTAMP_RATE,
+                           self.serials[self._deviceID]) as f:
+                # Frame IDs and timestamps continue across files
+                f.frameId = fileIndex * framesPerFile
+                poolFrames = len(pool) // R3F_SAMPLES_PER_FRAME
+                for frame in range(0, framesPerFile, poolFrames):
+                    count = min(poolFrames, framesPerFile - frame)
+                    f.write(pool[:count * R3F_SAMPLES_PER_FRAME])
+        if self._ifSuffix >= IFSSDFN_SUFFIX_INCRINDEX_MIN.value:
+            self._ifSuffix += self._ifCount
+
+    @_requires_connection
+    def IFSTREAM_SetEnable(self, enable):
+        if bool(_val(enable)) and self._running:
+            self._ifStart = perf_counter()
+            self._ifStartTimestamp = self._timestamp()
+        else:
+            self._if_write_files()
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IFSTREAM_GetActiveStatus(self, active):
+        duration = self._ifLength * self._ifCount / 1000 if self.realTime else 0
+        isActive = self._ifStart is not None and perf_counter() - self._ifStart < duration
+        if not isActive:
+            self._if_write_files()
+        _set(active, isActive)
+        return ReturnStatus.noError.value
+
+    """################IQ STREAMING################"""
+    @_requires_connection
+    def IQSTREAM_GetMaxAcqBandwidth(self, maxBandwidthHz):
+        _set(maxBandwidthHz, MAX_BANDWIDTH)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQSTREAM_GetMinAcqBandwidth(self, minBandwidthHz):
+        _set(minBandwidthHz, 5e3)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQSTREAM_SetAcqBandwidth(self, bwHz_req):
+        bwHz_req = float(_val(bwHz_req))
+        if not 5e3 <= bwHz_req <= MAX_BANDWIDTH:
+            return ReturnStatus.errorIQStreamBandwidthOutOfRange.value
+        self._iqsBandwidth = bwHz_req
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQSTREAM_GetAcqParameters(self, bwHz_act, srSps):
+        sampleRate = _sample_rate(self._iqsBandwidth)
+        _set(bwHz_act, sampleRate / 1.4)
+        _set(srSps, sampleRate)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQSTREAM_SetOutputConfiguration(self, dest, dtype):
+        dest, dtype = _val(dest), _val(dtype)
+        if dest == IQSOUTDEST.IQSOD_FILE_TIQ.value and dtype == IQSOUTDTYPE.IQSODT_INT16.value:
+            return ReturnStatus.errorIQStreamInvalidFileDataType.value
+        self._iqsDest, self._iqsDtype = dest, dtype
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQSTREAM_SetIQDataBufferSize(self, reqSize):
+        self._iqsBufferSize = min(max(int(_val(reqSize)), 1), 1 << 20)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQSTREAM_GetIQDataBufferSize(self, maxSize):
+        _set(maxSize, self._iqsBufferSize)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQSTREAM_SetDiskFilenameBase(self, filenameBase):
+        self._iqsFilenameBase = _val(filenameBase)
+        return ReturnStatus.noError.value
+
+    IQSTREAM_SetDiskFilenameBaseW = IQSTREAM_SetDiskFilenameBase
+
+    @_requires_connection
+    def IQSTREAM_SetDiskFilenameSuffix(self, suffixCtl):
+        self._iqsSuffix = _val(suffixCtl)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQSTREAM_SetDiskFileLength(self, msec):
+        self._iqsFileLength = _val(msec)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQSTREAM_Start(self):
+        if not self._running:
+            return ReturnStatus.errorStreamingOperationNotSupported.value
+        self._iqsStart = perf_counter()
+        self._iqsStartTimestamp = self._timestamp()
+        self._iqsDelivered = 0
+        self._iqsFileWritten = self._iqsDest in (IQSOUTDEST.IQSOD_CLIENT.value,
+                                                 IQSOUTDEST.IQSOD_FILE_TIQ.value)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQSTREAM_Stop(self):
+        if self._iqsStart is not None:
+            self._iqs_write_file()
+        self._iqsStart = None
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQSTREAM_GetEnable(self, enable):
+        _set(enable, self._iqsStart is not None)
+        return ReturnStatus.noError.value
+
+    def _iqs_scale_factor(self):
+        fullScale = _dbm_to_volts(self._refLevel + 10)
+        if self._iqsDtype == IQSOUTDTYPE.IQSODT_INT16.value:
+            return fullScale / 32767
+        if self._iqsDtype == IQSOUTDTYPE.IQSODT_INT32.value:
+            return fullScale / 2147483647
+        return 1.0
+
+    def _iqs_samples(self, start, count):
+        # Stream samples [start, start + count) in the configured output type
+        sampleRate = _sample_rate(self._iqsBandwidth)
+        pool = self._iq_pool(sampleRate, 1 << 16)
+        start %= len(pool)
+        if start + count <= len(pool):
+            block = pool[start:start + count]
+        else:
+            block = np.concatenate((pool[start:], pool[:start + count - len(pool)]))
+        if self._iqsDtype == IQSOUTDTYPE.IQSODT_SINGLE.value:
+            return block.view(np.float32)
+        iq = block.view(np.float32) / self._iqs_scale_factor()
+        if self._iqsDtype == IQSOUTDTYPE.IQSODT_INT16.value:
+            return np.clip(np.round(iq), -32768, 32767).astype(np.int16)
+        return np.round(iq).astype(np.int32)
+
+    @_requires_connection
+    def IQSTREAM_GetIQData(self, iqdata, iqlen, iqinfo):
+        if self._iqsStart is None or self._iqsDest != IQSOUTDEST.IQSOD_CLIENT.value:
+            return ReturnStatus.errorStreamingOperationNotSupported.value
+        sampleRate = _sample_rate(self._iqsBandwidth)
+        bufferSize = self._iqsBufferSize
+        status = 0
+        if self.realTime:
+            # Samples the device has produced but the client has not read yet
+            backlog = int((perf_counter() - self._iqsStart) * sampleRate) - self._iqsDelivered
+            capacity = IQSTREAM_BUFFER_COUNT * bufferSize
+            if backlog > capacity:
+                status |= IQSTRM_STATUS_IBUFFOVFLOW | IQSTRM_STATUS_XFER_DISCONTINUITY
+                self._iqsDelivered += backlog - capacity
+                backlog = capacity
+            if backlog > 0.75 * capacity:
+                status |= IQSTRM_STATUS_IBUFF75PCT
+            count = bufferSize if backlog >= bufferSize else 0
+        else:
+            count = bufferSize
+        self._iqsStatus |= status << IQSTRM_STATUS_STICKY_SHIFT
+        info = _ref(iqinfo)
+        info.timestamp = self._iqsStartTimestamp + int(
+            self._iqsDelivered / sampleRate * TIMESTAMP_RATE)
+        info.triggerCount = 0
+        info.triggerIndices = cast(self._iqsTriggers, POINTER(c_int))
+        info.scaleFactor = self._iqs_scale_factor()
+        info.acqStatus = status | self._iqsStatus
+        if count:
+            samples = self._iqs_samples(self._iqsDelivered, count)
+            memmove(_addr(iqdata), samples.ctypes.data, samples.nbytes)
+            self._iqsDelivered += count
+        _set(iqlen, count)
+        return ReturnStatus.noError.value
+
+    def _iqs_filename(self):
+        base = self._iqsFilenameBase
+        base = base.decode() if isinstance(base, bytes) else base
+        if self._iqsSuffix == IQSSDFN_SUFFIX_TIMESTAMP.value:
+            refSec = self._time_from_timestamp(self._iqsStartTimestamp)[0]
+            base += strftime('-%Y.%m.%d.%H.%M.%S', gmtime(refSec))
+        elif self._iqsSuffix >= IQSSDFN_SUFFIX_INCRINDEX_MIN.value:
+            base += '-{:05d}'.format(self._iqsSuffix)
+        if self._iqsDest == IQSOUTDEST.IQSOD_FILE_SIQ_SPLIT.value:
+            return base + '.siqh', [base + '.siqh', base + '.siqd']
+        return base + '.siq', [base + '.siq']
+
+    def _iqs_write_file(self):
+        # Writes the file a disk stream of the configured length produces
+        if self._iqsFileWritten:
+            return
+        self._iqsFileWritten = True
+        sampleRate = _sample_rate(self._iqsBandwidth)
+        numSamples = int(self._iqsFileLength / 1000 * sampleRate)
+        filename, self._iqsFiles = self._iqs_filename()
+        numberFormat = {IQSOUTDTYPE.IQSODT_INT16.value: 'IQ-Int16',
+                        IQSOUTDTYPE.IQSODT_INT32.value: 'IQ-Int32',
+                        IQSOUTDTYPE.IQSODT_SINGLE.value: 'IQ-Single'}[self._iqsDtype]
+        with SIQWriter(filename, sampleRate, self._centerFreq, sampleRate / 1.4,
+                       self._refLevel, numberFormat, self._iqs_scale_factor(),
+                       self._time_from_timestamp(self._iqsStartTimestamp),
+                       acqStatus=self._iqsStatus,
+                       hardware='{}-{}'.format(self.nomenclature,
+                                               self.serials[self._deviceID])) as f:
+            for start in range(0, numSamples, 1 << 16):
+                f.write(self._iqs_samples(start, min(1 << 16, numSamples - start)))
+        if self._iqsSuffix >= IQSSDFN_SUFFIX_INCRINDEX_MIN.value:
+            self._iqsSuffix += 1
+
+    @_requires_connection
+    def IQSTREAM_GetDiskFileWriteStatus(self, isComplete, isWriting):
+        duration = self._iqsFileLength / 1000 if self.realTime else 0
+        started = self._iqsStart is not None
+        complete = started and perf_counter() - self._iqsStart >= duration
+        if complete:
+            self._iqs_write_file()
+        _set(isComplete, complete)
+        _set(isWriting, started and not complete)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def IQSTREAM_GetDiskFileInfo(self, fileinfo):
+        info = _ref(fileinfo)
+        info.numberSamples = int(self._iqsFileLength / 1000 * _sample_rate(self._iqsBandwidth))
+        info.sample0Timestamp = self._iqsStartTimestamp
+        info.triggerSampleIndex = 0
+        info.triggerTimestamp = 0
+        info.acqStatus = self._iqsStatus
+        self._iqsFilenames = c_wchar_p(self._iqsFiles[0] if self._iqsFiles
+                                       else self._iqsFilenameBase.decode())
+        info.filenames = self._iqsFilenames
+        return ReturnStatus.noError.value
+
+    # Name used by rsa_api_full_example.py
+    IQSTREAM_GetFileInfo = IQSTREAM_GetDiskFileInfo
+
+    def IQSTREAM_ClearAcqStatus(self):
+        self._iqsStatus = 0
+        return ReturnStatus.noError.value
+
+    """################TRACKING GENERATOR, GNSS AND POWER################"""
+    @_requires_connection
+    def TRKGEN_GetHwInstalled(self, installed):
+        _set(installed, False)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def GNSS_GetHwInstalled(self, installed):
+        _set(installed, False)
+        return ReturnStatus.noError.value
+
+    @_requires_connection
+    def POWER_GetStatus(self, powerInfo):
+        info = _ref(powerInfo)
+        info.externalPowerPresent = True
+        info.batteryPresent = False
+        info.batteryChargeLevel = 0
+        info.batteryCharging = False
+        info.batteryOverTemperature = False
+        info.batteryHardwareError = False
+        return ReturnStatus.noError.value
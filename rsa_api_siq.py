@@ -0,0 +1,266 @@
+"""
+Tektronix RSA_API SIQ File Reader
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Reads the .siq files (and .siqh/.siqd pairs) written by IQ streaming with
+IQSOD_FILE_SIQ and IQSOD_FILE_SIQ_SPLIT. The header is parsed and the data
+section is memory-mapped, so a recording of any size opens instantly and
+only the samples that are accessed are read and scaled to volts:
+
+    with SIQFile('C:\\SignalVu-PC Files\\iq_stream_test.siqh') as siq:
+        print(siq.info())
+        iq = siq[1000:2000]
+        for start, chunk in siq.chunks(1 << 20):
+            ...
+
+SIQWriter writes files in the same format, e.g. from IQ streamed to the
+client.
+"""
+
+from collections import namedtuple
+from datetime import datetime
+from os import path
+import numpy as np
+
+
+SIQ_HEADER_SIZE = 16384
+SIQ_NUMBER_FORMATS = {'IQ-Int16': np.int16, 'IQ-Int32': np.int32, 'IQ-Single': np.float32}
+
+# Equivalent of IQSTREAM_File_Info, with UTC times in seconds instead of
+# device timestamps
+SIQFileInfo = namedtuple('SIQFileInfo', ['numberSamples', 'sample0Time', 'triggerSampleIndex',
+                                         'triggerTime', 'acqStatus', 'filenames'])
+
+
+def _split_filenames(filename):
+    # Returns (header file, data file, True if split)
+    base, ext = path.splitext(filename)
+    if ext.lower() in ('.siqh', '.siqd'):
+        return base + '.siqh', base + '.siqd', True
+    return filename, filename, False
+
+
+def _parse_utc(value):
+    # 'seconds,nanoseconds' or 'seconds.fraction' to (seconds, nanoseconds)
+    if ',' in value:
+        sec, nsec = value.split(',', 1)
+        return int(sec), int(nsec)
+    sec, _, frac = value.partition('.')
+    return int(sec), int((frac + '000000000')[:9])
+
+
+def read_siq_header(filename):
+    # Returns the header fields as a dict of strings and the header size
+    with open(filename, 'rb') as f:
+        first = f.readline().decode('ascii').strip()
+        key, _, value = first.partition(':')
+        if key != 'RSASIQHT':
+            raise ValueError('{} is not a SIQ file'.format(filename))
+        version, headerSize = (int(v) for v in value.split(','))
+        f.seek(0)
+        text = f.read(headerSize).split(b'\0', 1)[0].decode('ascii', 'replace')
+    header = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition(':')
+        if sep:
+            header[key.strip()] = value.strip()
+    return header, headerSize
+
+
+class SIQFile:
+    def __init__(self, filename):
+        self.headerFile, self.dataFile, self.split = _split_filenames(filename)
+        self.header, self.headerSize = read_siq_header(self.headerFile)
+        h = self.header
+        self.centerFreq = float(h.get('CenterFrequency', 0))
+        self.sampleRate = float(h['SampleRate'])
+        self.bandwidth = float(h.get('AcqBandwidth', 0))
+        self.refLevel = float(h.get('ReferenceLevel', 0))
+        self.numberFormat = h.get('NumberFormat', 'IQ-Int16')
+        self.scale = float(h.get('DataScale', 1))
+        self.recordUtc = _parse_utc(h.get('RecordUtcSec', '0,0'))
+        self.triggerIndex = int(h.get('TriggerIndex', 0))
+        self.acqStatus = int(h.get('AcqStatus', '0'), 0)
+
+        dtype = np.dtype(SIQ_NUMBER_FORMATS[self.numberFormat])
+        dtype = dtype.newbyteorder('>' if h.get('DataEndian', 'Little') == 'Big' else '<')
+        offset = 0 if self.split else self.headerSize
+        # A recording that was cut short holds fewer samples than its header says
+        available = (path.getsize(self.dataFile) - offset) // (2 * dtype.itemsize)
+        self.numSamples = min(int(h.get('NumberSamples', available)), available)
+        if self.numSamples:
+            self.raw = np.memmap(self.dataFile, dtype=dtype, mode='r', offset=offset,
+                                 shape=(self.numSamples, 2))
+        else:
+            self.raw = np.empty((0, 2), dtype=dtype)
+
+    def close(self):
+        # Releases the memory map; arrays returned by read() stay valid
+        mm = getattr(self.raw, '_mmap', None)
+        self.raw = None
+        if mm is not None:
+            mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.numSamples
+
+    def __getitem__(self, key):
+        # siq[i] is one complex sample, siq[a:b:c] a complex64 array
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self.numSamples)
+            if step == 1:
+                return self.read(start, stop - start)
+            return self._scale(self.raw[key])
+        if key < 0:
+            key += self.numSamples
+        return complex(self.read(key, 1)[0])
+
+    def _scale(self, raw, out=None):
+        if out is None:
+            out = np.empty(len(raw), dtype=np.complex64)
+        np.multiply(raw, np.float32(self.scale), out=out.view(np.float32).reshape(-1, 2),
+                    casting='unsafe')
+        return out
+
+    def read(self, start=0, count=None, out=None):
+        # Returns count samples from start as complex64 volts, written into
+        # out if given
+        if count is None:
+            count = self.numSamples - start
+        if not 0 <= start <= start + count <= self.numSamples:
+            raise IndexError('samples {} to {} requested from a file of {}'.format(
+                start, start + count, self.numSamples))
+        if out is not None:
+            out = out[:count]
+        return self._scale(self.raw[start:start + count], out)
+
+    def chunks(self, chunkSize=1 << 20, start=0, stop=None):
+        # Yields (first sample index, complex64 chunk). The chunk is one
+        # reused buffer, overwritten on the next iteration, so memory use is
+        # bounded by chunkSize
+        stop = self.numSamples if stop is None else min(stop, self.numSamples)
+        buf = np.empty(min(chunkSize, max(stop - start, 0)), dtype=np.complex64)
+        for index in range(start, stop, chunkSize):
+            yield index, self.read(index, min(chunkSize, stop - index), buf)
+
+    """################TIME################"""
+    def utc_at(self, index):
+        # UTC time of a sample as (seconds, nanoseconds)
+        nsec = self.recordUtc[1] + int(round(index * 1e9 / self.sampleRate))
+        return self.recordUtc[0] + nsec // 1000000000, nsec % 1000000000
+
+    def time_at(self, index):
+        # UTC time of a sample in seconds. A float only resolves about
+        # 0.25 us at current dates, use utc_at() for exact times
+        sec, nsec = self.utc_at(index)
+        return sec + nsec * 1e-9
+
+    def index_at(self, utc):
+        # Index of the sample at or just after a UTC time, given in seconds
+        # or as (seconds, nanoseconds)
+        if isinstance(utc, tuple):
+            offset = (utc[0] - self.recordUtc[0]) + (utc[1] - self.recordUtc[1]) * 1e-9
+        else:
+            offset = (utc - self.recordUtc[0]) - self.recordUtc[1] * 1e-9
+        return int(np.ceil(round(offset * self.sampleRate, 3)))
+
+    def read_time(self, utc, duration):
+        # Samples from a UTC time (see index_at) for duration seconds
+        start = max(self.index_at(utc), 0)
+        count = min(int(round(duration * self.sampleRate)), self.numSamples - start)
+        return self.read(start, max(count, 0))
+
+    def info(self):
+        filenames = (self.headerFile, self.dataFile) if self.split else (self.dataFile,)
+        return SIQFileInfo(self.numSamples, self.time_at(0), self.triggerIndex,
+                           self.time_at(self.triggerIndex), self.acqStatus, filenames)
+
+
+class SIQWriter:
+    # Writes interleaved IQ to a .siq file, or a .siqh/.siqd pair if
+    # filename ends in .siqh or .siqd. The header is rewritten with the
+    # final sample count on close().
+    def __init__(self, filename, sampleRate, centerFreq=0, bandwidth=0, refLevel=0,
+                 numberFormat='IQ-Int16', dataScale=1.0, recordUtc=None, triggerIndex=0,
+                 acqStatus=0, hardware=''):
+        self.headerFile, self.dataFile, self.split = _split_filenames(filename)
+        self.dtype = np.dtype(SIQ_NUMBER_FORMATS[numberFormat]).newbyteorder('<')
+        if recordUtc is None:
+            now = datetime.utcnow()
+            recordUtc = (int((now - datetime(1970, 1, 1)).total_seconds()),
+                         now.microsecond * 1000)
+        self.fields = [('FileDateTime', datetime.now().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3]),
+                       ('Hardware', hardware),
+                       ('ReferenceLevel', '{:.2f}'.format(refLevel)),
+                       ('CenterFrequency', '{:.3f}'.format(centerFreq)),
+                       ('SampleRate', '{:.3f}'.format(sampleRate)),
+                       ('AcqBandwidth', '{:.3f}'.format(bandwidth)),
+                       ('NumberSamples', None),
+                       ('NumberFormat', numberFormat),
+                       ('DataScale', '{:.9e}'.format(dataScale)),
+                       ('DataEndian', 'Little'),
+                       ('RecordUtcSec', '{},{:09d}'.format(*recordUtc)),
+                       ('TriggerIndex', str(triggerIndex)),
+                       ('AcqStatus', '0x{:08X}'.format(acqStatus))]
+        self.numSamples = 0
+        if self.split:
+            self.headerF = open(self.headerFile, 'wb')
+            self.dataF = open(self.dataFile, 'wb')
+        else:
+            self.headerF = self.dataF = open(self.dataFile, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        lines = ['RSASIQHT:1,{}'.format(SIQ_HEADER_SIZE)]
+        for key, value in self.fields:
+            lines.append('{}:{}'.format(key, self.numSamples if value is None else value))
+        header = ('\r\n'.join(lines) + '\r\n').encode('ascii')
+        self.headerF.seek(0)
+        if self.split:
+            self.headerF.write(header)
+            self.headerF.truncate()
+        else:
+            self.headerF.write(header.ljust(SIQ_HEADER_SIZE, b' '))
+
+    def write(self, data):
+        # data is interleaved IQ (any shape) in the file's number format
+        data = np.ascontiguousarray(data, dtype=self.dtype)
+        self.dataF.write(data.data)
+        self.numSamples += data.size // 2
+
+    def reserve(self, numSamples):
+        # Extends the data by numSamples zeroed samples, to be filled in
+        # through a memory map after close(). Returns the byte offset of the
+        # first reserved sample in the data file.
+        offset = self.dataF.seek(0, 2)
+        self.dataF.truncate(offset + numSamples * 2 * self.dtype.itemsize)
+        self.dataF.seek(0, 2)
+        self.numSamples += numSamples
+        return offset
+
+    def close(self):
+        if self.headerF is None:
+            return
+        self._write_header()
+        self.headerF.close()
+        if self.split:
+            self.dataF.close()
+        self.headerF = self.dataF = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
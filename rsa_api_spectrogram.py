@@ -0,0 +1,208 @@
+"""
+Tektronix RSA_API Client-Side Spectrogram
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Spectrogram (STFT) of IQ from block acquisitions, client IQ streaming or
+recorded files, at any FFT length and overlap, unlike the fixed 267 point
+DPXogram. IQ is fed in chunks of any size; the samples left over between
+chunks are carried to the next one, so the lines are the same however the
+IQ is chunked. Lines are computed in batches of overlapping windowed FFTs,
+the batches are spread over a thread pool (the NumPy FFT and ufuncs release
+the GIL), and the results are written in dBm into a preallocated float32
+waterfall that wraps around when full:
+
+    sg = Spectrogram(fftLength=1024, sampleRate=56e6, overlap=0.5, numLines=2000)
+    for iq in iq_chunks:
+        sg.process(iq)
+    plt.imshow(sg.lines(), aspect='auto')
+
+Windows are looked up by SpectrumWindows value and cached per length.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import os
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+from RSA_API import *
+from rsa_api_siq import SIQFile
+
+
+_windowCache = {}
+
+
+def _cosine_window(coefficients, length):
+    # Periodic (FFT) sum-of-cosines window
+    phase = 2 * np.pi * np.arange(length) / length
+    return sum((-1) ** k * a * np.cos(k * phase) for k, a in enumerate(coefficients))
+
+
+def spectrum_window(window, length):
+    # Window samples for a SpectrumWindows value (or its int value) as a
+    # cached, read-only float32 array
+    window = getattr(window, 'value', window)
+    key = (window, length)
+    if key not in _windowCache:
+        if window == SpectrumWindows.SpectrumWindow_Kaiser.value:
+            w = np.kaiser(length + 1, 16.7)[:length]
+        elif window == SpectrumWindows.SpectrumWindow_BlackmanHarris.value:
+            w = _cosine_window((0.35875, 0.48829, 0.14128, 0.01168), length)
+        elif window == SpectrumWindows.SpectrumWindow_Rectangle.value:
+            w = np.ones(length)
+        elif window == SpectrumWindows.SpectrumWindow_FlatTop.value:
+            w = _cosine_window((0.21557895, 0.41663158, 0.277263158, 0.083578947,
+                                0.006947368), length)
+        elif window == SpectrumWindows.SpectrumWindow_Hann.value:
+            w = _cosine_window((0.5, 0.5), length)
+        else:
+            raise ValueError('Window {} is not available for client spectrograms'.format(
+                window))
+        w = w.astype(np.float32)
+        w.flags.writeable = False
+        _windowCache[key] = w
+    return _windowCache[key]
+
+
+class Spectrogram:
+    # fftLength points per line, lines hop = fftLength * (1 - overlap)
+    # samples apart. batchLines lines are transformed at a time per worker
+    # thread. workers=1 computes in the calling thread.
+    def __init__(self, fftLength, sampleRate, centerFreq=0, overlap=0.5, numLines=1000,
+                 window=SpectrumWindows.SpectrumWindow_Kaiser, workers=None, batchLines=256):
+        self.fftLength = fftLength
+        self.sampleRate = sampleRate
+        self.hop = max(1, int(round(fftLength * (1 - overlap))))
+        self.window = spectrum_window(window, fftLength)
+        self.freq = centerFreq + (np.arange(fftLength) - fftLength // 2) * sampleRate / fftLength
+        # 10 * log10(|FFT|^2 / sum(w)^2 / 100) + 30 for IQ in volts into 50 ohms
+        self.offset = np.float32(10 * np.log10(10 / np.sum(self.window, dtype=np.float64) ** 2))
+        self.waterfall = np.full((numLines, fftLength), -np.inf, dtype=np.float32)
+        self.numLines = numLines
+        self.lineCount = 0
+
+        self.workers = workers or os.cpu_count() or 1
+        self.batchLines = batchLines
+        self.executor = ThreadPoolExecutor(self.workers) if self.workers > 1 else None
+        self.scratch = [np.empty((batchLines, fftLength), dtype=np.complex64)
+                        for i in range(self.workers)]
+        # Samples not yet covered by a line are kept at the start of buf
+        self.buf = np.empty(fftLength, dtype=np.complex64)
+        self.pending = 0
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reset(self):
+        self.waterfall.fill(-np.inf)
+        self.lineCount = 0
+        self.pending = 0
+
+    def _transform(self, frames, lines, slot):
+        # Windowed FFT of frames into waterfall rows lines (a range), in dBm
+        N = self.fftLength
+        half = N // 2
+        scratch = self.scratch[slot]
+        for first in range(0, len(frames), self.batchLines):
+            x = scratch[:min(self.batchLines, len(frames) - first)]
+            np.multiply(frames[first:first + len(x)], self.window, out=x)
+            X = np.fft.fft(x, axis=1)
+            start = lines[0] + first
+            out = self.waterfall[start:start + len(x)]
+            # fftshift while taking |X|^2
+            for dest, src in ((out[:, :half], X[:, N - half:]), (out[:, half:], X[:, :N - half])):
+                np.multiply(src.real, src.real, out=dest, casting='unsafe')
+                dest += np.square(src.imag, dtype=np.float32, casting='unsafe')
+            np.log10(out, out=out)
+            out *= 10
+            out += self.offset
+
+    def _run(self, frames, row):
+        # Splits frames (all fitting below the end of the waterfall) over
+        # the workers, starting at waterfall row row
+        count = len(frames)
+        numParts = min(self.workers, -(-count // self.batchLines))
+        bounds = [count * i // numParts for i in range(numParts + 1)]
+        parts = [(frames[bounds[i]:bounds[i + 1]], range(row + bounds[i], row + bounds[i + 1]),
+                  i) for i in range(numParts)]
+        if self.executor is None or numParts == 1:
+            for part in parts:
+                self._transform(*part)
+        else:
+            for f in [self.executor.submit(self._transform, *part) for part in parts]:
+                f.result()
+
+    def process(self, iq):
+        # Adds IQ (complex, in volts) and computes every line it completes.
+        # Returns the number of new lines.
+        N = self.fftLength
+        hop = self.hop
+        total = self.pending + len(iq)
+        if total > len(self.buf):
+            buf = np.empty(max(total, 2 * len(self.buf)), dtype=np.complex64)
+            buf[:self.pending] = self.buf[:self.pending]
+            self.buf = buf
+        self.buf[self.pending:total] = iq
+        numFrames = (total - N) // hop + 1 if total >= N else 0
+        if numFrames:
+            frames = as_strided(self.buf, (numFrames, N), (hop * 8, 8), writeable=False)
+            done = 0
+            while done < numFrames:
+                row = (self.lineCount + done) % self.numLines
+                count = min(numFrames - done, self.numLines - row)
+                # Only the last numLines lines survive, skip the rest
+                if numFrames - done - count < self.numLines:
+                    self._run(frames[done:done + count], row)
+                done += count
+            self.lineCount += numFrames
+        consumed = numFrames * hop
+        self.pending = total - consumed
+        self.buf[:self.pending] = self.buf[consumed:total].copy()
+        return numFrames
+
+    def lines(self, count=None):
+        # The latest count lines (default all that were computed, up to
+        # numLines), oldest first. A copy if the waterfall has wrapped.
+        available = min(self.lineCount, self.numLines)
+        count = available if count is None else min(count, available)
+        end = self.lineCount % self.numLines
+        if count <= end:
+            return self.waterfall[end - count:end]
+        return np.concatenate((self.waterfall[self.numLines - (count - end):],
+                               self.waterfall[:end]))
+
+    def line_times(self, count=None):
+        # Time in seconds of the center of each line returned by lines(),
+        # from the first sample processed since reset()
+        available = min(self.lineCount, self.numLines)
+        count = available if count is None else min(count, available)
+        index = np.arange(self.lineCount - count, self.lineCount)
+        return (index * self.hop + self.fftLength / 2) / self.sampleRate
+
+
+def siq_spectrogram(filename, fftLength=1024, overlap=0.5,
+                    window=SpectrumWindows.SpectrumWindow_Kaiser, workers=None,
+                    chunkSize=1 << 20):
+    # Spectrogram of a whole SIQ recording, with one waterfall line per
+    # hop. Returns the Spectrogram; its lines() are the waterfall.
+    with SIQFile(filename) as siq:
+        hop = max(1, int(round(fftLength * (1 - overlap))))
+        numLines = max(1, (len(siq) - fftLength) // hop + 1)
+        sg = Spectrogram(fftLength, siq.sampleRate, siq.centerFreq, overlap, numLines, window,
+                         workers)
+        with sg:
+            for start, iq in siq.chunks(chunkSize):
+                sg.process(iq)
+    return sg
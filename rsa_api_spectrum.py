@@ -0,0 +1,202 @@
+"""
+Tektronix RSA_API Continuous Spectrum Acquisition
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Continuous spectrum acquisition for monitoring. The device is started once
+and SPECTRUM_AcquireTrace is re-armed for every trace, instead of the
+DEVICE_Run/DEVICE_Stop cycle acquire_spectrum() in rsa_api_full_example.py
+does per trace. Traces are written into a rotating set of preallocated
+float32 buffers and returned with their Spectrum_TraceInfo:
+
+    config_spectrum(cf=1e9, refLevel=0, span=40e6, rbw=300e3)
+    for trace, traceInfo in spectrum_stream(rsa, count=1000):
+        print(traceInfo.timestamp, np.amax(trace))
+
+A trace buffer and its Spectrum_TraceInfo are overwritten numBuffers traces
+after they were returned, so consumers must be done with them (or copy
+them) by then.
+
+TraceAccumulator replaces keeping every trace and averaging at the end. It
+keeps the power and log average, max and min hold, an exponential average
+and streaming quantile estimates of any number of dBm traces in fixed
+memory, updated in place:
+
+    acc = TraceAccumulator(traceLength, quantiles=(0.5, 0.9))
+    for trace, traceInfo in spectrum_stream(rsa, count=1000):
+        acc.update(trace)
+    snap = acc.snapshot()
+"""
+
+from collections import namedtuple
+from ctypes import *
+import numpy as np
+from RSA_API import *
+
+
+class SpectrumReader:
+    # Repeated trace acquisitions into numBuffers preallocated buffers.
+    # The device must already be running and the spectrum configured.
+    def __init__(self, rsa, traceLength=None, numBuffers=4,
+                 trace=SpectrumTraces.SpectrumTrace1, timeoutMsec=100):
+        self.rsa = rsa
+        if traceLength is None:
+            specSet = Spectrum_Settings()
+            err_check(rsa.SPECTRUM_GetSettings(byref(specSet)))
+            traceLength = specSet.traceLength
+        self.traceLength = int(traceLength)
+        self.numBuffers = numBuffers
+        self.data = np.empty((numBuffers, self.traceLength), dtype=np.float32)
+        self.traceInfo = [Spectrum_TraceInfo() for i in range(numBuffers)]
+        self.ptrs = [d.ctypes.data_as(POINTER(c_float)) for d in self.data]
+        self.trace = c_int(getattr(trace, 'value', trace))
+        self.timeout = c_int(timeoutMsec)
+        self.ready = c_bool(False)
+        self.outTracePoints = c_int(0)
+        self.maxTracePoints = c_int(self.traceLength)
+        self.index = 0
+        self.count = 0
+
+    def acquire(self):
+        # Returns (trace in a pool buffer, Spectrum_TraceInfo)
+        rsa = self.rsa
+        index = self.index
+        self.index = (index + 1) % self.numBuffers
+        self.ready.value = False
+        err_check(rsa.SPECTRUM_AcquireTrace())
+        while not self.ready.value:
+            err_check(rsa.SPECTRUM_WaitForTraceReady(self.timeout, byref(self.ready)))
+        err_check(rsa.SPECTRUM_GetTrace(self.trace, self.maxTracePoints, self.ptrs[index],
+                                        byref(self.outTracePoints)))
+        traceInfo = self.traceInfo[index]
+        err_check(rsa.SPECTRUM_GetTraceInfo(byref(traceInfo)))
+        self.count += 1
+        return self.data[index, :self.outTracePoints.value], traceInfo
+
+    def __iter__(self):
+        while True:
+            yield self.acquire()
+
+
+def spectrum_stream(rsa, count=None, traceLength=None, numBuffers=4,
+                    trace=SpectrumTraces.SpectrumTrace1, timeoutMsec=100):
+    # Starts the device, yields count (trace, Spectrum_TraceInfo) pairs, or
+    # runs until the generator is closed if count is None, then stops it.
+    reader = SpectrumReader(rsa, traceLength, numBuffers, trace, timeoutMsec)
+    err_check(rsa.DEVICE_Run())
+    try:
+        while count is None or reader.count < count:
+            yield reader.acquire()
+    finally:
+        err_check(rsa.DEVICE_Stop())
+
+
+"""################TRACE DETECTORS################"""
+# Detector traces in dBm, copied out of a TraceAccumulator
+TraceSnapshot = namedtuple('TraceSnapshot', ['count', 'average', 'logAverage', 'maxHold',
+                                             'minHold', 'expAverage', 'quantiles'])
+
+_DB_TO_LN = np.float32(np.log(10) / 10)
+
+
+class TraceAccumulator:
+    # Client-side detectors over any number of dBm traces in fixed memory.
+    # alpha is the weight of the newest trace in the exponential (power)
+    # average. quantiles are estimated per bin by stochastic approximation:
+    # each trace moves the estimate up or down by a step scaled to the
+    # bin's mean absolute deviation, shrinking as 1/sqrt(count) down to
+    # quantileFloor of it so the estimates keep tracking slow changes.
+    def __init__(self, traceLength, quantiles=(0.5,), alpha=0.1, quantileFloor=0.02):
+        self.traceLength = int(traceLength)
+        self.alpha = np.float32(alpha)
+        self.quantileFloor = quantileFloor
+        self.quantileLevels = np.array(quantiles, dtype=np.float32).reshape(-1, 1)
+        shape = (self.traceLength,)
+        self.powerMean = np.empty(shape, dtype=np.float32)
+        self.logMean = np.empty(shape, dtype=np.float32)
+        self.deviation = np.empty(shape, dtype=np.float32)
+        self.maxHold = np.empty(shape, dtype=np.float32)
+        self.minHold = np.empty(shape, dtype=np.float32)
+        self.expMean = np.empty(shape, dtype=np.float32)
+        self.quantiles = np.empty((len(self.quantileLevels),) + shape, dtype=np.float32)
+        # Scratch space reused by every update
+        self.power = np.empty(shape, dtype=np.float32)
+        self.diff = np.empty(shape, dtype=np.float32)
+        self.step = np.empty(shape, dtype=np.float32)
+        self.below = np.empty(self.quantiles.shape, dtype=bool)
+        self.move = np.empty(self.quantiles.shape, dtype=np.float32)
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+
+    def update(self, trace):
+        # Adds one dBm trace of traceLength points
+        if len(trace) != self.traceLength:
+            raise ValueError('Trace has {} points, expected {}'.format(
+                len(trace), self.traceLength))
+        power = self.power
+        diff = self.diff
+        np.multiply(trace, _DB_TO_LN, out=power)
+        np.exp(power, out=power)
+        self.count += 1
+        n = self.count
+        if n == 1:
+            for dest in (self.logMean, self.maxHold, self.minHold, self.quantiles):
+                dest[...] = trace
+            self.powerMean[:] = power
+            self.expMean[:] = power
+            self.deviation.fill(0)
+            return
+
+        np.maximum(self.maxHold, trace, out=self.maxHold)
+        np.minimum(self.minHold, trace, out=self.minHold)
+
+        # Running means: mean += (x - mean) / n
+        np.subtract(power, self.powerMean, out=diff)
+        diff *= np.float32(1 / n)
+        self.powerMean += diff
+        np.subtract(power, self.expMean, out=diff)
+        diff *= self.alpha
+        self.expMean += diff
+        np.subtract(trace, self.logMean, out=diff)
+        np.abs(diff, out=self.step)
+        diff *= np.float32(1 / n)
+        self.logMean += diff
+        np.subtract(self.step, self.deviation, out=self.step)
+        self.step *= np.float32(1 / n)
+        self.deviation += self.step
+
+        # Quantiles: up by step * q when above, down by step * (1 - q) below
+        np.multiply(self.deviation, np.float32(max(n ** -0.5, self.quantileFloor)),
+                    out=self.step)
+        np.less(trace, self.quantiles, out=self.below)
+        np.subtract(self.quantileLevels, self.below, out=self.move)
+        self.move *= self.step
+        self.quantiles += self.move
+
+    def snapshot(self):
+        # Copies of the detector traces, in dBm
+        if not self.count:
+            raise ValueError('No traces accumulated')
+        return TraceSnapshot(self.count, 10 * np.log10(self.powerMean), self.logMean.copy(),
+                             self.maxHold.copy(), self.minHold.copy(),
+                             10 * np.log10(self.expMean), self.quantiles.copy())
+
+
+def accumulate_spectrum(rsa, count, quantiles=(0.5,), alpha=0.1,
+                        trace=SpectrumTraces.SpectrumTrace1, timeoutMsec=100):
+    # Acquires count traces with the spectrum as configured (in dBm) and
+    # returns their TraceSnapshot
+    specSet = Spectrum_Settings()
+    err_check(rsa.SPECTRUM_GetSettings(byref(specSet)))
+    acc = TraceAccumulator(specSet.traceLength, quantiles, alpha)
+    for t, traceInfo in spectrum_stream(rsa, count, specSet.traceLength, 2, trace,
+                                        timeoutMsec):
+        acc.update(t)
+    return acc.snapshot()
@@ -0,0 +1,287 @@
+"""
+Tektronix RSA_API Cached Device State
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+CachedRSA wraps a device handle (RSA_API.dll or SimRSA) and keeps a shadow
+copy of the CONFIG_, SPECTRUM_, IQBLK_, DPX_ and TRIG_ settings:
+
+    rsa = CachedRSA(cdll.LoadLibrary("RSA_API.dll"))
+
+* A *_Set* call (or DPX_Configure) whose arguments match the known device
+  state returns noError without going over USB.
+* *_Get* settings calls are answered from a cache of earlier replies made
+  in the same device state, so reading back settings after returning to a
+  previous configuration costs nothing.
+* SPECTRUM_SetDefault is deferred once the defaults are known and the
+  trace types have not been changed since the last one. If it is followed
+  by SPECTRUM_SetSettings (as in config_spectrum()), only the settings
+  that end up different from the device are sent.
+* SPECTRUM_SetDefault and DPX_Reset forget the trace types they reset, so
+  the next SPECTRUM_SetTraceType or DPX_SetSpectrumTraceType is sent.
+* CONFIG_Preset, DEVICE_Connect, DEVICE_Disconnect and DEVICE_Reset clear
+  the shadow state. So does a failed *_Set* call, for its own setting,
+  and the cached replies are dropped whenever a setting becomes unknown.
+
+Every call to the device has to go through the CachedRSA, otherwise the
+shadow state goes stale; call invalidate() after talking to the device
+some other way.
+"""
+
+from ctypes import *
+from ctypes import _Pointer, _SimpleCData
+from RSA_API import *
+
+
+_CACHED_FAMILIES = ('CONFIG_', 'SPECTRUM_', 'IQBLK_', 'DPX_', 'TRIG_')
+
+# Getters that return acquired data or status rather than settings
+_UNCACHED_GETTERS = {'SPECTRUM_GetTrace', 'SPECTRUM_GetTraceInfo',
+                     'IQBLK_GetIQData', 'IQBLK_GetIQDataDeinterleaved',
+                     'IQBLK_GetIQDataCplx', 'IQBLK_GetIQAcqInfo',
+                     'DPX_GetFrameBuffer', 'DPX_GetFrameInfo',
+                     'DPX_GetSogramHiResLine', 'DPX_GetSogramHiResLineCountLatest',
+                     'DPX_GetSogramHiResLineTriggered', 'DPX_GetSogramHiResLineTimestamp',
+                     'TRIG_GetTriggerEvent'}
+
+# Calls after which the shadow state is unknown
+_RESETS = {'CONFIG_Preset', 'DEVICE_Connect', 'DEVICE_Disconnect', 'DEVICE_Reset'}
+
+# Settings calls without _Set in their name
+_OTHER_SETTERS = {'DPX_Configure'}
+
+# Setters with one shadow entry per value of their leading arguments
+_INDEXED_SETTERS = {'SPECTRUM_SetTraceType': 1, 'DPX_SetSpectrumTraceType': 1}
+
+# Shadow entries and cached getters that a call resets on the device
+_FORGETS = {'SPECTRUM_SetDefault': ('SPECTRUM_SetTraceType', 'SPECTRUM_GetTraceType'),
+            'DPX_Reset': ('DPX_SetSpectrumTraceType',)}
+
+# Setters that can make the device coerce another setting
+_COUPLED = {'IQBLK_SetIQBandwidth': ('IQBLK_SetIQRecordLength',),
+            'DPX_SetParameters': ('DPX_SetSogramParameters',)}
+
+# Number of Spectrum_Settings fields read by SPECTRUM_SetSettings, the rest
+# are outputs (actualStartFreq, ...)
+_SPECTRUM_INPUT_FIELDS = 7
+
+_DEFAULT = 'default'
+
+_CArgObject = type(byref(c_int()))
+
+
+def _is_output(arg):
+    return isinstance(arg, (_CArgObject, _Pointer, Array))
+
+
+def _target(arg):
+    # The object an output argument points to
+    if isinstance(arg, _Pointer):
+        return arg.contents
+    return getattr(arg, '_obj', arg)
+
+
+def _key(arg):
+    # A hashable value for an input argument, or None if it has none
+    if isinstance(arg, _SimpleCData):
+        arg = arg.value
+    elif isinstance(arg, Structure):
+        return tuple(_key(getattr(arg, name)) for name, _ in arg._fields_)
+    elif isinstance(arg, Array):
+        return tuple(arg)
+    try:
+        hash(arg)
+    except TypeError:
+        return None
+    return arg
+
+
+class CachedRSA:
+    def __init__(self, rsa):
+        self.rsa = rsa
+        self.calls = 0
+        self.skipped = 0
+        self.invalidate()
+
+    def invalidate(self):
+        self.state = {}
+        self.readback = {}
+        self.spectrumDefault = None
+        self.pendingDefault = None
+        # Whether the spectrum trace types are known to be the defaults
+        self.traceTypesDefault = False
+
+    def __getattr__(self, name):
+        func = getattr(self.rsa, name)
+        if name in _RESETS:
+            wrapper = self._reset_wrapper(name, func)
+        elif name == 'SPECTRUM_SetDefault':
+            wrapper = self.SPECTRUM_SetDefault
+        elif name == 'SPECTRUM_SetSettings':
+            wrapper = self.SPECTRUM_SetSettings
+        elif name == 'SPECTRUM_SetTraceType':
+            wrapper = self._trace_type_wrapper(self._setter_wrapper(name, func))
+        elif name in _FORGETS:
+            wrapper = self._forget_wrapper(name, func)
+        elif not name.startswith(_CACHED_FAMILIES):
+            wrapper = self._passthrough_wrapper(func)
+        elif '_Set' in name or name in _OTHER_SETTERS:
+            wrapper = self._setter_wrapper(name, func)
+        elif '_Get' in name and name not in _UNCACHED_GETTERS:
+            wrapper = self._getter_wrapper(name, func)
+        else:
+            wrapper = self._passthrough_wrapper(func)
+        # Cache the wrapper so __getattr__ only runs once per name
+        setattr(self, name, wrapper)
+        return wrapper
+
+    def _call(self, func, *args):
+        self.calls += 1
+        return func(*args)
+
+    def _snapshot(self):
+        return frozenset(self.state.items())
+
+    def _flush(self):
+        # Sends a deferred SPECTRUM_SetDefault
+        if self.pendingDefault is not None:
+            self.pendingDefault = None
+            err_check(self._call(self.rsa.SPECTRUM_SetDefault))
+
+    def _forget(self, name):
+        # Drops the shadow entries and cached replies that name resets
+        names = _FORGETS[name]
+        for k in [k for k in self.state if k[0] in names]:
+            del self.state[k]
+        for k in [k for k in self.readback if k[0] in names]:
+            del self.readback[k]
+
+    def _passthrough_wrapper(self, func):
+        def call(*args):
+            self._flush()
+            return self._call(func, *args)
+        return call
+
+    def _reset_wrapper(self, name, func):
+        def call(*args):
+            self.pendingDefault = None
+            rs = self._call(func, *args)
+            self.invalidate()
+            return rs
+        return call
+
+    def _forget_wrapper(self, name, func):
+        def call(*args):
+            self._flush()
+            self._forget(name)
+            return self._call(func, *args)
+        return call
+
+    def _trace_type_wrapper(self, setter):
+        # A deferred SetDefault has to reach the device first, and the trace
+        # types are no longer known to be the defaults
+        def call(*args):
+            self._flush()
+            self.traceTypesDefault = False
+            return setter(*args)
+        return call
+
+    def _set(self, stateKey, value, func, args, coupled=()):
+        # Issues a setter only if it changes the shadow state
+        if value is not None and self.state.get(stateKey) == value:
+            self.skipped += 1
+            return ReturnStatus.noError.value
+        rs = self._call(func, *args)
+        dropped = [k for k in self.state if k[0] in coupled]
+        if rs == ReturnStatus.noError.value and value is not None:
+            self.state[stateKey] = value
+        else:
+            dropped.append(stateKey)
+        if dropped:
+            # Unknown settings could take the snapshot back to an earlier
+            # one whose cached replies no longer hold
+            for k in dropped:
+                self.state.pop(k, None)
+            self.readback.clear()
+        return rs
+
+    def _setter_wrapper(self, name, func):
+        numIndex = _INDEXED_SETTERS.get(name, 0)
+        coupled = _COUPLED.get(name, ())
+
+        def call(*args):
+            keys = tuple(_key(a) for a in args)
+            value = None if None in keys else keys[numIndex:]
+            return self._set((name,) + keys[:numIndex], value, func, args, coupled)
+        return call
+
+    def _getter_wrapper(self, name, func):
+        def call(*args):
+            outputs = [i for i, a in enumerate(args) if _is_output(a)]
+            inputs = tuple(_key(a) for i, a in enumerate(args) if i not in outputs)
+            cacheKey = (name, inputs, self._snapshot())
+            if None not in inputs and cacheKey in self.readback:
+                for i, saved in zip(outputs, self.readback[cacheKey]):
+                    memmove(addressof(_target(args[i])), saved, len(saved))
+                self.skipped += 1
+                return ReturnStatus.noError.value
+            self._flush()
+            rs = self._call(func, *args)
+            if rs == ReturnStatus.noError.value and None not in inputs:
+                self._learn_default(name, args)
+                cacheKey = (name, inputs, self._snapshot())
+                self.readback[cacheKey] = [bytes(_target(args[i])) for i in outputs]
+                # Bound the cache for long retuning sessions
+                if len(self.readback) > 4096:
+                    self.readback.clear()
+            return rs
+        return call
+
+    def _learn_default(self, name, args):
+        # The first SPECTRUM_GetSettings after a SPECTRUM_SetDefault tells
+        # what the defaults are
+        if name == 'SPECTRUM_GetSettings' and self.state.get(
+                ('SPECTRUM_SetSettings',)) == _DEFAULT:
+            settings = _key(_target(args[0]))[:_SPECTRUM_INPUT_FIELDS]
+            self.spectrumDefault = settings
+            self.state[('SPECTRUM_SetSettings',)] = settings
+
+    """################SPECTRUM SETTINGS################"""
+    def SPECTRUM_SetDefault(self):
+        # Also resets the trace enables and detectors
+        self._forget('SPECTRUM_SetDefault')
+        stateKey = ('SPECTRUM_SetSettings',)
+        if not self.traceTypesDefault:
+            # Only sending it resets the trace types
+            self.state.pop(stateKey, None)
+        if self.spectrumDefault is None or not self.traceTypesDefault:
+            rs = self._set(stateKey, _DEFAULT, self.rsa.SPECTRUM_SetDefault, ())
+            self.traceTypesDefault = rs == ReturnStatus.noError.value
+            return rs
+        current = self.state.get(stateKey)
+        if current == self.spectrumDefault:
+            self.skipped += 1
+        elif self.pendingDefault is None:
+            # Remember what the device really has until the default is sent
+            self.pendingDefault = (current,)
+        self.state[stateKey] = self.spectrumDefault
+        return ReturnStatus.noError.value
+
+    def SPECTRUM_SetSettings(self, settings):
+        stateKey = ('SPECTRUM_SetSettings',)
+        value = _key(settings)
+        if value is not None:
+            value = value[:_SPECTRUM_INPUT_FIELDS]
+        if self.pendingDefault is not None:
+            # SetSettings overwrites every default, so the deferred
+            # SetDefault never has to be sent
+            self.state[stateKey] = self.pendingDefault[0]
+            if self.state[stateKey] is None:
+                del self.state[stateKey]
+            self.pendingDefault = None
+        return self._set(stateKey, value, self.rsa.SPECTRUM_SetSettings, (settings,))
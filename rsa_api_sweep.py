@@ -0,0 +1,185 @@
+"""
+Tektronix RSA_API Wideband Sweep
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Stitched sweeps over frequency ranges wider than one acquisition span, e.g.
+9 kHz to 6.2 GHz. The range is split into center frequency steps whose
+usable (center) portions tile the range exactly; the filter roll-off at the
+edges of every segment is trimmed off by the overlap. The acquisition is
+configured once, and each step only retunes with CONFIG_SetCenterFreq.
+The next segment is retuned and armed as soon as the current one has been
+retrieved, so it acquires while the current one is stitched into the
+preallocated wideband trace.
+
+SpectrumSweep uses the spectrum measurement (SPECTRUM_SetSettings), and
+IQSweep acquires block IQ at each step and computes the spectrum locally:
+
+    sweep = SpectrumSweep(rsa, 9e3, 6.2e9, rbw=300e3)
+    rsa.DEVICE_Run()
+    trace = sweep.sweep()
+    plt.plot(sweep.freq, trace)
+
+The returned trace is the sweep's own buffer and is overwritten by the
+next sweep() call.
+"""
+
+from ctypes import *
+import numpy as np
+from RSA_API import *
+from rsa_api_iqblock import IQBufferPool, get_iq_data_into
+
+
+def plan_sweep(startFreq, stopFreq, numPoints, stepSize, keepPoints, startOffset,
+               minCF=9e3, maxCF=6.2e9):
+    # Plans the segments of a sweep with numPoints per segment trace, of
+    # which the center keepPoints are kept. startOffset is the frequency of
+    # the first trace point relative to the center frequency.
+    # Returns the total number of points and a list of
+    # (centerFreq, first kept point, number of points, output offset)
+    totalPoints = int(np.floor((stopFreq - startFreq) / stepSize + 1e-9)) + 1
+    trim = (numPoints - keepPoints) // 2
+    segments = []
+    for dest in range(0, totalPoints, keepPoints):
+        count = min(keepPoints, totalPoints - dest)
+        firstFreq = startFreq + dest * stepSize
+        cf = firstFreq - startOffset - trim * stepSize
+        cf = min(max(cf, minCF), maxCF)
+        first = int(round((firstFreq - cf - startOffset) / stepSize))
+        if first < 0 or first + count > numPoints:
+            raise ValueError('{:.6g} Hz to {:.6g} Hz cannot be covered with center '
+                             'frequencies between {:.6g} Hz and {:.6g} Hz'.format(
+                                 startFreq, stopFreq, minCF, maxCF))
+        segments.append((cf, first, count, dest))
+    return totalPoints, segments
+
+
+class _Sweep:
+    # Common planning and stitching. Subclasses configure the acquisition
+    # and implement _arm() and _retrieve(slot).
+    def __init__(self, rsa, startFreq, stopFreq, numPoints, stepSize, keepPoints,
+                 startOffset):
+        self.rsa = rsa
+        self.startFreq = startFreq
+        self.stopFreq = stopFreq
+        self.stepSize = stepSize
+        minCF = c_double(0)
+        maxCF = c_double(0)
+        err_check(rsa.CONFIG_GetMinCenterFreq(byref(minCF)))
+        err_check(rsa.CONFIG_GetMaxCenterFreq(byref(maxCF)))
+        self.numPoints, self.segments = plan_sweep(
+            startFreq, stopFreq, numPoints, stepSize, keepPoints, startOffset,
+            minCF.value, maxCF.value)
+        self.centerFreqs = np.array([s[0] for s in self.segments])
+        self.freq = startFreq + np.arange(self.numPoints) * stepSize
+        self.trace = np.empty(self.numPoints, dtype=np.float32)
+
+    def _retune(self, index):
+        err_check(self.rsa.CONFIG_SetCenterFreq(c_double(self.segments[index][0])))
+        self._arm()
+
+    def sweep(self):
+        # Sweeps the whole range once and returns the stitched trace in dBm.
+        # The device must already be running.
+        numSegments = len(self.segments)
+        self._retune(0)
+        for i in range(numSegments):
+            segment = self._retrieve(i % 2)
+            if i + 1 < numSegments:
+                self._retune(i + 1)
+            cf, first, count, dest = self.segments[i]
+            self._stitch(segment, first, count, self.trace[dest:dest + count])
+        return self.trace
+
+    def _stitch(self, segment, first, count, out):
+        out[:] = segment[first:first + count]
+
+
+class SpectrumSweep(_Sweep):
+    def __init__(self, rsa, startFreq, stopFreq, rbw=300e3, refLevel=0, span=40e6,
+                 overlap=0.1, timeoutMsec=100):
+        err_check(rsa.SPECTRUM_SetEnable(c_bool(True)))
+        err_check(rsa.CONFIG_SetReferenceLevel(c_double(refLevel)))
+        err_check(rsa.SPECTRUM_SetDefault())
+        specSet = Spectrum_Settings()
+        err_check(rsa.SPECTRUM_GetSettings(byref(specSet)))
+        specSet.window = SpectrumWindows.SpectrumWindow_Kaiser
+        specSet.verticalUnit = SpectrumVerticalUnits.SpectrumVerticalUnit_dBm
+        specSet.span = span
+        specSet.rbw = rbw
+        err_check(rsa.SPECTRUM_SetSettings(specSet))
+        err_check(rsa.SPECTRUM_GetSettings(byref(specSet)))
+        cf = c_double(0)
+        err_check(rsa.CONFIG_GetCenterFreq(byref(cf)))
+        self.specSet = specSet
+
+        traceLength = specSet.traceLength
+        keepPoints = max(1, int(traceLength * (1 - overlap)))
+        super().__init__(rsa, startFreq, stopFreq, traceLength, specSet.actualFreqStepSize,
+                         keepPoints, specSet.actualStartFreq - cf.value)
+
+        self.scratch = np.empty((2, traceLength), dtype=np.float32)
+        self.ptrs = [s.ctypes.data_as(POINTER(c_float)) for s in self.scratch]
+        self.timeout = c_int(timeoutMsec)
+        self.ready = c_bool(False)
+        self.maxTracePoints = c_int(traceLength)
+        self.outTracePoints = c_int(0)
+
+    def _arm(self):
+        err_check(self.rsa.SPECTRUM_AcquireTrace())
+
+    def _retrieve(self, slot):
+        rsa = self.rsa
+        self.ready.value = False
+        while not self.ready.value:
+            err_check(rsa.SPECTRUM_WaitForTraceReady(self.timeout, byref(self.ready)))
+        err_check(rsa.SPECTRUM_GetTrace(SpectrumTraces.SpectrumTrace1, self.maxTracePoints,
+                                        self.ptrs[slot], byref(self.outTracePoints)))
+        return self.scratch[slot]
+
+
+class IQSweep(_Sweep):
+    # Each segment is one block IQ record of fftLength samples, windowed and
+    # transformed locally. The bin spacing is sampleRate / fftLength.
+    def __init__(self, rsa, startFreq, stopFreq, iqBw=40e6, refLevel=0, fftLength=4096,
+                 overlap=0.1, window=np.hanning, timeoutMsec=100):
+        err_check(rsa.CONFIG_SetReferenceLevel(c_double(refLevel)))
+        err_check(rsa.IQBLK_SetIQBandwidth(c_double(iqBw)))
+        err_check(rsa.IQBLK_SetIQRecordLength(c_int(fftLength)))
+        sampleRate = c_double(0)
+        err_check(rsa.IQBLK_GetIQSampleRate(byref(sampleRate)))
+        self.sampleRate = sampleRate.value
+        self.fftLength = fftLength
+
+        # Only the IQ bandwidth is usable, not the whole sample rate
+        stepSize = self.sampleRate / fftLength
+        keepPoints = max(1, int(iqBw * (1 - overlap) / stepSize))
+        super().__init__(rsa, startFreq, stopFreq, fftLength, stepSize, keepPoints,
+                         -(fftLength // 2) * stepSize)
+
+        self.window = window(fftLength).astype(np.float32)
+        # Scales |FFT|^2 of IQ in volts to mW into 50 ohms
+        self.scale = 1000 / 100 / np.sum(self.window) ** 2
+        self.pool = IQBufferPool(fftLength, 2)
+        self.timeout = c_int(timeoutMsec)
+        self.ready = c_bool(False)
+
+    def _arm(self):
+        err_check(self.rsa.IQBLK_AcquireIQData())
+
+    def _retrieve(self, slot):
+        rsa = self.rsa
+        self.ready.value = False
+        while not self.ready.value:
+            err_check(rsa.IQBLK_WaitForIQDataReady(self.timeout, byref(self.ready)))
+        return get_iq_data_into(rsa, self.pool.buffers[slot])
+
+    def _stitch(self, segment, first, count, out):
+        spectrum = np.fft.fftshift(np.fft.fft(segment * self.window))[first:first + count]
+        np.log10(np.abs(spectrum) ** 2 * self.scale, out=out, casting='unsafe')
+        out *= 10
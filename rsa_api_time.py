@@ -0,0 +1,133 @@
+"""
+Tektronix RSA_API Timestamp Conversion
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Converts device timestamps (Spectrum_TraceInfo.timestamp,
+IQBLK_ACQINFO.sample0Timestamp, IQSTRM_ACQINFO timestamps...) to wall-clock
+time without a REFTIME_GetTimeFromTimestamp call per value. TimeBase reads
+the timestamp rate and reference time once and converts whole arrays of
+timestamps with integer NumPy arithmetic that gives the same (sec, nsec) as
+the API:
+
+    timeBase = TimeBase(rsa)
+    sec, nsec = timeBase.to_time(timestamps)
+    when = timeBase.to_datetime64(timestamps)
+
+The cached values are refreshed by set_reference_time(), and by check(),
+which compares one REFTIME_GetCurrentTime against the cache. Conversions
+run check() at most once per checkInterval seconds (None to disable).
+With the Cython binding, pass the values in with set_reference():
+
+    timeBase = TimeBase()
+    timeBase.set_reference(REFTIME_GetTimestampRate_py(), *REFTIME_GetReferenceTime_py())
+"""
+
+from ctypes import *
+from time import monotonic
+import numpy as np
+from RSA_API import *
+
+
+_NSEC = 1000000000
+
+
+class TimeBase:
+    def __init__(self, rsa=None, checkInterval=1.0, toleranceNsec=1000):
+        self.rsa = rsa
+        self.checkInterval = checkInterval
+        self.toleranceNsec = toleranceNsec
+        self.lastCheck = monotonic()
+        if rsa is not None:
+            self.refresh()
+
+    def set_reference(self, rate, refSec, refNsec, refTimestamp):
+        # Timestamp rate in Hz and the (sec, nsec) at refTimestamp
+        self.rate = int(rate)
+        self.refSec = int(refSec)
+        self.refNsec = int(refNsec)
+        self.refTimestamp = int(refTimestamp)
+
+    def refresh(self):
+        # Reads the timestamp rate and reference time from the device
+        rsa = self.rsa
+        rate = c_uint64(0)
+        refSec = c_int64(0)
+        refNsec = c_uint64(0)
+        refTimestamp = c_uint64(0)
+        err_check(rsa.REFTIME_GetTimestampRate(byref(rate)))
+        err_check(rsa.REFTIME_GetReferenceTime(byref(refSec), byref(refNsec),
+                                               byref(refTimestamp)))
+        self.set_reference(rate.value, refSec.value, refNsec.value, refTimestamp.value)
+        self.lastCheck = monotonic()
+
+    def set_reference_time(self, refSec, refNsec, refTimestamp):
+        # REFTIME_SetReferenceTime, keeping the cache in step
+        err_check(self.rsa.REFTIME_SetReferenceTime(c_int64(refSec), c_uint64(refNsec),
+                                                    c_uint64(refTimestamp)))
+        self.refresh()
+
+    def check(self):
+        # Converts the device's current timestamp and compares it with the
+        # time the device reports. Refreshes the cache and returns True if
+        # they differ by more than toleranceNsec.
+        rsa = self.rsa
+        self.lastCheck = monotonic()
+        timeSec = c_int64(0)
+        timeNsec = c_uint64(0)
+        timestamp = c_uint64(0)
+        err_check(rsa.REFTIME_GetCurrentTime(byref(timeSec), byref(timeNsec),
+                                             byref(timestamp)))
+        sec, nsec = self._convert(np.array(timestamp.value, dtype=np.uint64))
+        error = (int(sec) - timeSec.value) * _NSEC + int(nsec) - timeNsec.value
+        if abs(error) > self.toleranceNsec:
+            self.refresh()
+            return True
+        return False
+
+    def _auto_check(self):
+        if (self.rsa is not None and self.checkInterval is not None
+                and monotonic() - self.lastCheck >= self.checkInterval):
+            self.check()
+
+    def _convert(self, timestamps):
+        # Exact nsec = refNsec + (timestamp - refTimestamp) * 1e9 // rate,
+        # split so the product cannot overflow 64 bits
+        delta = timestamps.astype(np.int64) - np.int64(self.refTimestamp)
+        whole, part = np.divmod(delta, np.int64(self.rate))
+        nsec = whole * _NSEC + part * _NSEC // self.rate + self.refNsec
+        sec, nsec = np.divmod(nsec, np.int64(_NSEC))
+        sec += self.refSec
+        return sec, nsec
+
+    def to_time(self, timestamps):
+        # (sec, nsec) int64 arrays, as REFTIME_GetTimeFromTimestamp returns
+        self._auto_check()
+        sec, nsec = self._convert(np.asarray(timestamps, dtype=np.uint64))
+        return sec[()], nsec[()]
+
+    def to_datetime64(self, timestamps):
+        # datetime64[ns] UTC array
+        sec, nsec = self.to_time(timestamps)
+        return (np.asarray(sec) * _NSEC + nsec).astype('datetime64[ns]')
+
+    def to_seconds(self, timestamps):
+        # float64 seconds since the epoch (sub-microsecond resolution is
+        # lost for current dates, use to_time for exact values)
+        sec, nsec = self.to_time(timestamps)
+        return sec + nsec * 1e-9
+
+    def to_timestamp(self, sec, nsec=0):
+        # Inverse of to_time, as REFTIME_GetTimestampFromTime returns
+        self._auto_check()
+        sec = np.asarray(sec, dtype=np.int64)
+        nsec = np.asarray(nsec, dtype=np.int64)
+        delta = (sec - self.refSec) * _NSEC + nsec - self.refNsec
+        whole, part = np.divmod(delta, np.int64(_NSEC))
+        timestamps = whole * self.rate + part * self.rate // _NSEC + self.refTimestamp
+        return timestamps.astype(np.uint64)[()]
@@ -0,0 +1,318 @@
+"""
+Tektronix RSA_API Typed ctypes Bindings
+Author: Morgan Allison
+Date created: 10/26
+Date edited: 10/26
+Windows 7 64-bit
+RSA API version 3.9.0029
+Python 3.6.1 64-bit (Anaconda 4.3.0)
+NumPy 1.11.3
+
+Declares argtypes, restype and errcheck once for every function exported
+by RSA_API.dll, from the C prototypes in RSA_API.h below. Bound functions
+take plain Python values (ctypes converts them without c_double() etc.),
+and every call is error checked; a failed call raises RSAError with the
+ReturnStatus name, a successful one returns straight away:
+
+    rsa = load_rsa()
+    rsa.CONFIG_SetCenterFreq(2.4e9)
+    rsa.IQBLK_SetIQRecordLength(1024)
+
+Calls written for the untyped DLL (c_double(cf), err_check(rs)) keep
+working as long as pointer arguments have the declared type: pass a
+c_float array or a NumPy ctypes.data_as(POINTER(c_float)) pointer for a
+float*, not byref(array). bind() also accepts the simulated device in
+rsa_api_sim.py, which takes plain values already, and wraps it with the
+same error checking. The arguments of every simulated call are checked
+against the prototypes too, so a call the DLL would reject fails in the
+simulator the same way.
+"""
+
+from ctypes import *
+import re
+from RSA_API import *
+
+
+# Prototypes from RSA_API.h. Enum arguments are passed as int.
+PROTOTYPES = """
+const char* DEVICE_GetErrorString(ReturnStatus status)
+ReturnStatus DEVICE_Search(int* numDevicesFound, int deviceIDs[], void* deviceSerial, void* deviceType)
+ReturnStatus DEVICE_Connect(int deviceID)
+ReturnStatus DEVICE_Reset(int deviceID)
+ReturnStatus DEVICE_Disconnect()
+ReturnStatus DEVICE_GetNomenclature(char* nomenclature)
+ReturnStatus DEVICE_GetSerialNumber(char* serialNum)
+ReturnStatus DEVICE_GetAPIVersion(char* apiVersion)
+ReturnStatus DEVICE_GetFWVersion(char* fwVersion)
+ReturnStatus DEVICE_GetFPGAVersion(char* fpgaVersion)
+ReturnStatus DEVICE_GetHWVersion(char* hwVersion)
+ReturnStatus DEVICE_GetInfo(DEVICE_INFO* devInfo)
+ReturnStatus DEVICE_GetOverTemperatureStatus(bool* overTemperature)
+ReturnStatus DEVICE_GetEnable(bool* enable)
+ReturnStatus DEVICE_Run()
+ReturnStatus DEVICE_Stop()
+ReturnStatus DEVICE_PrepareForRun()
+ReturnStatus DEVICE_StartFrameTransfer()
+ReturnStatus DEVICE_GetEventStatus(int eventID, bool* eventOccurred, uint64_t* eventTimestamp)
+
+ReturnStatus CONFIG_Preset()
+ReturnStatus CONFIG_SetReferenceLevel(double refLevel)
+ReturnStatus CONFIG_GetReferenceLevel(double* refLevel)
+ReturnStatus CONFIG_GetMaxCenterFreq(double* maxCF)
+ReturnStatus CONFIG_GetMinCenterFreq(double* minCF)
+ReturnStatus CONFIG_SetCenterFreq(double cf)
+ReturnStatus CONFIG_GetCenterFreq(double* cf)
+ReturnStatus CONFIG_SetExternalRefEnable(bool exRefEn)
+ReturnStatus CONFIG_GetExternalRefEnable(bool* exRefEn)
+ReturnStatus CONFIG_GetExternalRefFrequency(double* extFreq)
+ReturnStatus CONFIG_GetAutoAttenuationEnable(bool* enable)
+ReturnStatus CONFIG_SetAutoAttenuationEnable(bool enable)
+ReturnStatus CONFIG_GetRFPreampEnable(bool* enable)
+ReturnStatus CONFIG_SetRFPreampEnable(bool enable)
+ReturnStatus CONFIG_GetRFAttenuator(double* value)
+ReturnStatus CONFIG_SetRFAttenuator(double value)
+
+ReturnStatus TRIG_SetTriggerMode(int mode)
+ReturnStatus TRIG_GetTriggerMode(int* mode)
+ReturnStatus TRIG_SetTriggerSource(int source)
+ReturnStatus TRIG_GetTriggerSource(int* source)
+ReturnStatus TRIG_SetTriggerTransition(int transition)
+ReturnStatus TRIG_GetTriggerTransition(int* transition)
+ReturnStatus TRIG_SetIFPowerTriggerLevel(double level)
+ReturnStatus TRIG_GetIFPowerTriggerLevel(double* level)
+ReturnStatus TRIG_SetTriggerPositionPercent(double trigPosPercent)
+ReturnStatus TRIG_GetTriggerPositionPercent(double* trigPosPercent)
+ReturnStatus TRIG_ForceTrigger()
+
+ReturnStatus ALIGN_GetWarmupStatus(bool* warmedUp)
+ReturnStatus ALIGN_GetAlignmentNeeded(bool* needed)
+ReturnStatus ALIGN_RunAlignment()
+
+ReturnStatus REFTIME_GetTimestampRate(uint64_t* o_refTimestampRate)
+ReturnStatus REFTIME_GetCurrentTime(time_t* o_timeSec, uint64_t* o_timeNsec, uint64_t* o_timestamp)
+ReturnStatus REFTIME_GetTimeFromTimestamp(uint64_t i_timestamp, time_t* o_timeSec, uint64_t* o_timeNsec)
+ReturnStatus REFTIME_GetTimestampFromTime(time_t i_timeSec, uint64_t i_timeNsec, uint64_t* o_timestamp)
+ReturnStatus REFTIME_GetIntervalSinceRefTimeSet(double* sec)
+ReturnStatus REFTIME_SetReferenceTime(time_t refTimeSec, uint64_t refTimeNsec, uint64_t refTimestamp)
+ReturnStatus REFTIME_GetReferenceTime(time_t* refTimeSec, uint64_t* refTimeNsec, uint64_t* refTimestamp)
+
+ReturnStatus IQBLK_GetMaxIQBandwidth(double* maxBandwidth)
+ReturnStatus IQBLK_GetMinIQBandwidth(double* minBandwidth)
+ReturnStatus IQBLK_GetMaxIQRecordLength(int* maxSamples)
+ReturnStatus IQBLK_SetIQBandwidth(double iqBandwidth)
+ReturnStatus IQBLK_GetIQBandwidth(double* iqBandwidth)
+ReturnStatus IQBLK_GetIQSampleRate(double* iqSampleRate)
+ReturnStatus IQBLK_SetIQRecordLength(int recordLength)
+ReturnStatus IQBLK_GetIQRecordLength(int* recordLength)
+ReturnStatus IQBLK_AcquireIQData()
+ReturnStatus IQBLK_WaitForIQDataReady(int timeoutMsec, bool* ready)
+ReturnStatus IQBLK_GetIQData(float* iqData, int* outLength, int reqLength)
+ReturnStatus IQBLK_GetIQDataDeinterleaved(float* iData, float* qData, int* outLength, int reqLength)
+ReturnStatus IQBLK_GetIQDataCplx(Cplx32* iqData, int* outLength, int reqLength)
+ReturnStatus IQBLK_GetIQAcqInfo(IQBLK_ACQINFO* acqInfo)
+
+ReturnStatus SPECTRUM_SetEnable(bool enable)
+ReturnStatus SPECTRUM_GetEnable(bool* enable)
+ReturnStatus SPECTRUM_SetDefault()
+ReturnStatus SPECTRUM_SetSettings(Spectrum_Settings settings)
+ReturnStatus SPECTRUM_GetSettings(Spectrum_Settings* settings)
+ReturnStatus SPECTRUM_SetTraceType(int trace, bool enable, int detector)
+ReturnStatus SPECTRUM_GetTraceType(int trace, bool* enable, int* detector)
+ReturnStatus SPECTRUM_GetLimits(Spectrum_Limits* limits)
+ReturnStatus SPECTRUM_AcquireTrace()
+ReturnStatus SPECTRUM_WaitForTraceReady(int timeoutMsec, bool* ready)
+ReturnStatus SPECTRUM_GetTrace(int trace, int maxTracePoints, float* traceData, int* outTracePoints)
+ReturnStatus SPECTRUM_GetTraceInfo(Spectrum_TraceInfo* traceInfo)
+
+ReturnStatus DPX_GetEnable(bool* enable)
+ReturnStatus DPX_SetEnable(bool enable)
+ReturnStatus DPX_SetParameters(double fspan, double rbw, int32_t bitmapWidth, int32_t tracePtsPerPixel, int yUnit, double yTop, double yBottom, bool infinitePersistence, double persistenceTimeSec, bool showOnlyTrigFrame)
+ReturnStatus DPX_Configure(bool enableSpectrum, bool enableSpectrogram)
+ReturnStatus DPX_GetSettings(DPX_SettingStruct* pSettings)
+ReturnStatus DPX_SetSpectrumTraceType(int32_t traceIndex, int type)
+ReturnStatus DPX_GetRBWRange(double fspan, double* minRBW, double* maxRBW)
+ReturnStatus DPX_Reset()
+ReturnStatus DPX_WaitForDataReady(int timeoutMsec, bool* ready)
+ReturnStatus DPX_GetFrameInfo(int64_t* frameCount, int64_t* fftCount)
+ReturnStatus DPX_SetSogramParameters(double timePerBitmapLine, double timeResolution, double maxPower, double minPower)
+ReturnStatus DPX_SetSogramTraceType(int traceType)
+ReturnStatus DPX_GetSogramSettings(DPX_SogramSettingStruct* pSettings)
+ReturnStatus DPX_GetSogramHiResLineCountLatest(int32_t* lineCount)
+ReturnStatus DPX_GetSogramHiResLineTriggered(bool* triggered, int32_t lineIndex)
+ReturnStatus DPX_GetSogramHiResLineTimestamp(double* timestamp, int32_t lineIndex)
+ReturnStatus DPX_GetSogramHiResLine(int16_t* vData, int32_t* vDataSize, int32_t lineIndex, double* dataSF, int32_t tracePoints, int32_t firstValidPoint)
+ReturnStatus DPX_GetFrameBuffer(DPX_FrameBuffer* frameBuffer)
+ReturnStatus DPX_FinishFrameBuffer()
+ReturnStatus DPX_IsFrameBufferAvailable(bool* frameAvailable)
+
+ReturnStatus AUDIO_SetMode(int mode)
+ReturnStatus AUDIO_GetMode(int* mode)
+ReturnStatus AUDIO_SetVolume(float volume)
+ReturnStatus AUDIO_GetVolume(float* _volume)
+ReturnStatus AUDIO_SetMute(bool mute)
+ReturnStatus AUDIO_GetMute(bool* _mute)
+ReturnStatus AUDIO_SetFrequencyOffset(double freqOffsetHz)
+ReturnStatus AUDIO_GetFrequencyOffset(double* freqOffsetHz)
+ReturnStatus AUDIO_Start()
+ReturnStatus AUDIO_Stop()
+ReturnStatus AUDIO_GetEnable(bool* enable)
+ReturnStatus AUDIO_GetData(int16_t* data, uint16_t inSize, uint16_t* outSize)
+
+ReturnStatus IFSTREAM_SetEnable(bool enable)
+ReturnStatus IFSTREAM_GetActiveStatus(bool* active)
+ReturnStatus IFSTREAM_SetDiskFileMode(int mode)
+ReturnStatus IFSTREAM_SetDiskFilePath(const char* path)
+ReturnStatus IFSTREAM_SetDiskFilenameBase(const char* base)
+ReturnStatus IFSTREAM_SetDiskFilenameSuffix(int suffixCtl)
+ReturnStatus IFSTREAM_SetDiskFileLength(long msec)
+ReturnStatus IFSTREAM_SetDiskFileCount(int count)
+
+ReturnStatus IQSTREAM_GetMaxAcqBandwidth(double* maxBandwidthHz)
+ReturnStatus IQSTREAM_GetMinAcqBandwidth(double* minBandwidthHz)
+ReturnStatus IQSTREAM_SetAcqBandwidth(double bwHz_req)
+ReturnStatus IQSTREAM_GetAcqParameters(double* bwHz_act, double* srSps)
+ReturnStatus IQSTREAM_SetOutputConfiguration(int dest, int dtype)
+ReturnStatus IQSTREAM_SetIQDataBufferSize(int reqSize)
+ReturnStatus IQSTREAM_GetIQDataBufferSize(int* maxSize)
+ReturnStatus IQSTREAM_SetDiskFilenameBase(const char* filenameBase)
+ReturnStatus IQSTREAM_SetDiskFilenameSuffix(int suffixCtl)
+ReturnStatus IQSTREAM_SetDiskFileLength(int msec)
+ReturnStatus IQSTREAM_Start()
+ReturnStatus IQSTREAM_Stop()
+ReturnStatus IQSTREAM_GetEnable(bool* enable)
+ReturnStatus IQSTREAM_GetIQData(void* iqdata, int* iqlen, IQSTRMIQINFO* iqinfo)
+ReturnStatus IQSTREAM_GetDiskFileWriteStatus(bool* isComplete, bool* isWriting)
+ReturnStatus IQSTREAM_GetDiskFileInfo(IQSTREAM_File_Info* fileinfo)
+void IQSTREAM_ClearAcqStatus()
+
+ReturnStatus TRKGEN_GetHwInstalled(bool* installed)
+ReturnStatus TRKGEN_SetEnable(bool enable)
+ReturnStatus TRKGEN_GetEnable(bool* enable)
+ReturnStatus TRKGEN_SetOutputLevel(double leveldBm)
+ReturnStatus TRKGEN_GetOutputLevel(double* leveldBm)
+
+ReturnStatus GNSS_GetHwInstalled(bool* installed)
+ReturnStatus GNSS_SetEnable(bool enable)
+ReturnStatus GNSS_GetEnable(bool* enable)
+ReturnStatus GNSS_SetSatSystem(int satSystem)
+ReturnStatus GNSS_GetSatSystem(int* satSystem)
+ReturnStatus GNSS_SetAntennaPower(bool powered)
+ReturnStatus GNSS_GetAntennaPower(bool* powered)
+ReturnStatus GNSS_GetNavMessageData(int* msgLen, const char** message)
+ReturnStatus GNSS_ClearNavMessageData()
+ReturnStatus GNSS_Get1PPSTimestamp(bool* isValid, uint64_t* timestamp1PPS)
+
+ReturnStatus POWER_GetStatus(POWER_INFO* powerInfo)
+"""
+
+_C_TYPES = {'void': None, 'bool': c_bool, 'char': c_char, 'int': c_int, 'long': c_long,
+            'float': c_float, 'double': c_double, 'time_t': c_int64,
+            'int16_t': c_int16, 'uint16_t': c_uint16, 'int32_t': c_int32,
+            'int64_t': c_int64, 'uint64_t': c_uint64, 'ReturnStatus': c_int}
+
+_PROTOTYPE = re.compile(r'^(.+?)\s*\b(\w+)\((.*)\)$')
+
+
+def _c_type(decl):
+    # ctypes type of a C type declaration such as 'const char*' or
+    # 'int deviceIDs[]' (the parameter name is dropped)
+    decl = decl.replace('const ', '').strip()
+    numPointers = decl.count('*') + decl.count('[]')
+    name = decl.replace('*', ' ').replace('[]', ' ').split()[0]
+    if name == 'char' and numPointers:
+        ctype, numPointers = c_char_p, numPointers - 1
+    elif name == 'void' and numPointers:
+        ctype, numPointers = c_void_p, numPointers - 1
+    elif name in _C_TYPES:
+        ctype = _C_TYPES[name]
+    else:
+        # Structures defined in RSA_API.py
+        ctype = globals()[name]
+    for i in range(numPointers):
+        ctype = POINTER(ctype)
+    return ctype
+
+
+def parse_prototypes(text=PROTOTYPES):
+    # Returns {function name: (restype, [argtypes])}
+    functions = {}
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        restype, name, params = _PROTOTYPE.match(line).groups()
+        argtypes = [_c_type(p) for p in params.split(',') if p.strip()]
+        functions[name] = (_c_type(restype), argtypes)
+    return functions
+
+
+def _status_errcheck(rs, func, args):
+    if rs:
+        raise RSAError(STATUS_NAMES.get(rs, 'ReturnStatus {}'.format(rs)))
+    return rs
+
+
+def bind(lib):
+    # Binds every prototype the library exports and returns it. A ctypes
+    # library is typed in place; anything else (SimRSA) is wrapped in a
+    # CheckedRSA.
+    prototypes = parse_prototypes()
+    if not isinstance(lib, CDLL):
+        return CheckedRSA(lib, prototypes)
+    for name, (restype, argtypes) in prototypes.items():
+        try:
+            func = getattr(lib, name)
+        except AttributeError:
+            # Not exported by this version of the API
+            continue
+        func.restype = restype
+        func.argtypes = argtypes
+        if restype is c_int:
+            func.errcheck = _status_errcheck
+    return lib
+
+
+def load_rsa(dllPath='RSA_API.dll'):
+    return bind(cdll.LoadLibrary(dllPath))
+
+
+class CheckedRSA:
+    # Raises RSAError for failed calls to a device object that returns
+    # ReturnStatus values but has no ctypes prototypes (e.g. SimRSA).
+    # Arguments of the functions in prototypes are converted with their
+    # argtypes first, as a typed DLL call would, and a mismatch raises
+    # ctypes.ArgumentError; the device still gets the arguments as passed.
+    def __init__(self, rsa, prototypes=None):
+        self.rsa = rsa
+        self.prototypes = parse_prototypes() if prototypes is None else prototypes
+
+    def __getattr__(self, name):
+        func = getattr(self.rsa, name)
+        if not callable(func) or name == 'DEVICE_GetErrorString':
+            return func
+        argtypes = self.prototypes.get(name, (None, None))[1]
+
+        def call(*args):
+            if argtypes is not None:
+                _check_args(name, argtypes, args)
+            rs = func(*args)
+            if rs:
+                raise RSAError(STATUS_NAMES.get(rs, 'ReturnStatus {}'.format(rs)))
+            return rs
+        # Cache the wrapper so __getattr__ only runs once per name
+        setattr(self, name, call)
+        return call
+
+
+def _check_args(name, argtypes, args):
+    # Raises ArgumentError (or TypeError for a wrong count) where ctypes
+    # would refuse args for a function declared with argtypes
+    if len(args) != len(argtypes):
+        raise TypeError('{} takes {} arguments ({} given)'.format(
+            name, len(argtypes), len(args)))
+    for i, (argtype, arg) in enumerate(zip(argtypes, args)):
+        try:
+            argtype.from_param(arg)
+        except Exception as e:
+            raise ArgumentError('argument {}: {}: {}'.format(
+                i + 1, type(e).__name__, e)) from None